@@ -1,35 +1,858 @@
-from flask import Flask, render_template, request, redirect, url_for, jsonify, send_file, session, flash
+from flask import Flask, abort, render_template, request, redirect, url_for, jsonify, send_file, session, flash, g, has_app_context, has_request_context
+import atexit
+import base64
+import csv
+import gzip
+import hashlib
+import hmac
+import json
+import math
+import mimetypes
 import os
+import queue
+import re
 import sqlite3
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from datetime import datetime, timedelta
+from io import BytesIO
 from werkzeug.security import generate_password_hash, check_password_hash
+from catalog_import import CatalogImporter, guess_format, open_records
 from functools import wraps
+from itertools import combinations
 try:
     from reportlab.lib.pagesizes import letter
     from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
     from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
     from reportlab.lib.units import inch
     from reportlab.lib import colors
+    from reportlab.lib.colors import HexColor
+    from reportlab import rl_config
     REPORTLAB_AVAILABLE = True
 except ImportError:
     REPORTLAB_AVAILABLE = False
+# Optional: a faster JSON encoder for catalog responses, and Brotli next to gzip
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Flask settings per environment, applied by create_app(). The tuning
+# constants further down are read from the environment once per process.
+DEFAULT_SECRET_KEY = 'eece_components_secret_key_2025'
+
+class Config:
+    # Every setting a subclass changes is defined here too, so applying
+    # another config class resets it
+    DEBUG = False
+    TESTING = False
+    SECRET_KEY = os.environ.get('SECRET_KEY', DEFAULT_SECRET_KEY)
+    DATABASE = os.environ.get('DATABASE', 'practical_management.db')
+    SESSION_COOKIE_SAMESITE = None
+    SESSION_COOKIE_SECURE = False
+    BACKGROUND_SERVICES = True  # Run the reservation sweeper; see start_background_services()
+
+class DevelopmentConfig(Config):
+    DEBUG = True
+
+class ProductionConfig(Config):
+    SESSION_COOKIE_SAMESITE = 'Lax'
+    SESSION_COOKIE_SECURE = os.environ.get('SESSION_COOKIE_SECURE', '0') == '1'  # Set when served over HTTPS
+
+class TestingConfig(Config):
+    TESTING = True
+    BACKGROUND_SERVICES = False
+
+CONFIGS = {'development': DevelopmentConfig, 'production': ProductionConfig, 'testing': TestingConfig}
+
+app = Flask(__name__, template_folder='Templates')
+app.config.from_object(Config)
+
+# Request metrics, served at /metrics in Prometheus text format. Each thread
+# records into its own shard without taking a lock; a scrape sums the shards,
+# so the instrumentation is cheap enough to leave on permanently.
+METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)  # Seconds
+METRICS_SQL_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100)  # Statements per request
+METRICS_PDF_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)  # Seconds
+
+def new_histogram(buckets):
+    """Per-bucket counts (the last bucket is +Inf) followed by the sum"""
+    return [0] * (len(buckets) + 2)
+
+def observe(histogram, buckets, value):
+    histogram[bisect_left(buckets, value)] += 1
+    histogram[-1] += value
+
+class MetricsShard:
+    """Counters written by a single thread"""
+
+    def __init__(self):
+        self.thread = threading.current_thread()
+        self.requests = {}  # (endpoint, method, status) -> count
+        self.latency = {}  # endpoint -> histogram
+        self.in_flight = {}  # endpoint -> requests started minus finished
+        self.sql = {}  # endpoint -> [statements, seconds]
+        self.sql_per_request = {}  # endpoint -> histogram
+        self.sql_statements = 0  # Running totals, for the per-request deltas
+        self.sql_seconds = 0.0
+        self.statements = {}  # SQL text -> [calls, seconds, rows, slowest call in seconds]
+        self.pdf_render = new_histogram(METRICS_PDF_BUCKETS)
+        self.pdf_export = new_histogram(METRICS_PDF_BUCKETS)
+
+    def merge(self, other):
+        """Add another shard's counters into this one"""
+        for name in ('requests', 'in_flight'):
+            totals = getattr(self, name)
+            for key, value in dict(getattr(other, name)).items():
+                totals[key] = totals.get(key, 0) + value
+        for name in ('latency', 'sql', 'sql_per_request'):
+            totals = getattr(self, name)
+            for key, values in dict(getattr(other, name)).items():
+                if key in totals:
+                    totals[key] = [a + b for a, b in zip(totals[key], values)]
+                else:
+                    totals[key] = list(values)
+        for sql, (calls, seconds, rows, slowest) in dict(other.statements).items():
+            totals = self.statements.setdefault(sql, [0, 0.0, 0, 0.0])
+            totals[0] += calls
+            totals[1] += seconds
+            totals[2] += rows
+            totals[3] = max(totals[3], slowest)
+        self.pdf_render = [a + b for a, b in zip(self.pdf_render, other.pdf_render)]
+        self.pdf_export = [a + b for a, b in zip(self.pdf_export, other.pdf_export)]
+
+class Metrics:
+    """Per-thread metric shards; shards of finished threads are folded into one"""
+
+    def __init__(self):
+        self.local = threading.local()
+        self.shards = []
+        self.retired = MetricsShard()
+        self.lock = threading.Lock()  # Only for the shard list, never per request
+        self.compact_at = 64
+
+    def shard(self):
+        try:
+            return self.local.shard
+        except AttributeError:
+            shard = self.local.shard = MetricsShard()
+            with self.lock:
+                self.shards.append(shard)
+                # The dev server starts a thread per connection, so fold away
+                # the shards of threads that are gone before the list grows
+                if len(self.shards) >= self.compact_at:
+                    self._compact()
+                    self.compact_at = max(64, 2 * len(self.shards))
+            return shard
+
+    def _compact(self):
+        alive = []
+        for shard in self.shards:
+            if shard.thread.is_alive():
+                alive.append(shard)
+            else:
+                self.retired.merge(shard)
+        self.shards = alive
+
+    def snapshot(self):
+        """Totals across all threads"""
+        total = MetricsShard()
+        with self.lock:
+            self._compact()
+            total.merge(self.retired)
+            for shard in self.shards:
+                total.merge(shard)
+        return total
+
+    def record_sql(self, seconds, statements=1):
+        """Count SQL work done for the current request"""
+        shard = self.shard()
+        shard.sql_statements += statements
+        shard.sql_seconds += seconds
+
+    def record_statement(self, sql, seconds, rows):
+        """Add one completed statement (execute plus first fetch) to its totals"""
+        shard = self.shard()
+        totals = shard.statements.get(sql)
+        if totals is None:
+            totals = shard.statements[sql] = [0, 0.0, 0, 0.0]
+        totals[0] += 1
+        totals[1] += seconds
+        totals[2] += rows
+        if seconds > totals[3]:
+            totals[3] = seconds
+
+    def record_pdf(self, render_seconds, export_seconds):
+        shard = self.shard()
+        observe(shard.pdf_render, METRICS_PDF_BUCKETS, render_seconds)
+        observe(shard.pdf_export, METRICS_PDF_BUCKETS, export_seconds)
+
+metrics = Metrics()
+
+# Slow-query log. Statement totals live in the metrics shards; statements
+# slower than SLOW_QUERY_MS are also logged with their query plan, so a join
+# that degrades as the catalog grows shows up with the plan that caused it.
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 50))  # Execute plus fetch time
+SLOW_QUERY_LOG_SIZE = 200  # Most recent slow statements kept for /admin/sql_profile
+
+SQL_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+SQL_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+SQL_PLACEHOLDER_LIST = re.compile(r'\?(?:\s*,\s*\?)+')
+
+def normalize_sql(sql):
+    """Statement text with literals and placeholder lists folded, for grouping"""
+    sql = ' '.join(sql.split())
+    sql = SQL_STRING_LITERAL.sub('?', sql)
+    sql = SQL_NUMBER_LITERAL.sub('?', sql)
+    return SQL_PLACEHOLDER_LIST.sub('?, ...', sql)
+
+def parameters_shape(parameters, many=False):
+    """Parameter types without their values, which may be personal data"""
+    if many:
+        rows = parameters if isinstance(parameters, list) else []
+        return f'{len(rows)} x {parameters_shape(rows[0])}' if rows else '0 rows'
+    if isinstance(parameters, dict):
+        return '{' + ', '.join(f'{name}: {type(value).__name__}' for name, value in parameters.items()) + '}'
+    return '(' + ', '.join(type(value).__name__ for value in parameters) + ')'
+
+class SqlProfiler:
+    """Statement timing hook called by PooledConnection and ProfiledCursor"""
+
+    def __init__(self, threshold_ms, log_size):
+        self.threshold = threshold_ms / 1000
+        self.slow = deque(maxlen=log_size)  # Appends are atomic, no lock needed
+
+    def finish(self, conn, sql, parameters, seconds, rows, many=False):
+        metrics.record_statement(sql, seconds, rows)
+        if seconds >= self.threshold:
+            self._log_slow(conn, sql, parameters, seconds, rows, many)
+
+    def _log_slow(self, conn, sql, parameters, seconds, rows, many):
+        plan_parameters = (parameters[0] if parameters else ()) if many else parameters
+        try:
+            plan = [row[3] for row in sqlite3.Connection.execute(conn, 'EXPLAIN QUERY PLAN ' + sql, plan_parameters)]
+        except sqlite3.Error:
+            plan = []  # BEGIN, PRAGMA and the like have no plan
+        entry = {
+            'at': datetime.now().isoformat(timespec='seconds'),
+            'endpoint': request.endpoint if has_request_context() else None,
+            'sql': normalize_sql(sql),
+            'parameters': parameters_shape(parameters, many),
+            'rows': rows,
+            'ms': round(seconds * 1000, 2),
+            'plan': plan
+        }
+        self.slow.append(entry)
+        app.logger.warning('Slow query (%s ms, %s rows, %s): %s%s', entry['ms'], rows, entry['parameters'],
+                           entry['sql'], ''.join(f'\n    {step}' for step in plan))
+
+sql_profiler = SqlProfiler(SLOW_QUERY_MS, SLOW_QUERY_LOG_SIZE)
+
+@app.before_request
+def start_request_metrics():
+    shard = metrics.shard()
+    endpoint = request.endpoint or '(unmatched)'  # Unknown paths share one label
+    shard.in_flight[endpoint] = shard.in_flight.get(endpoint, 0) + 1
+    g.request_metrics = (endpoint, time.perf_counter(), shard.sql_statements, shard.sql_seconds)
+
+def finish_request_metrics(endpoint):
+    shard = metrics.shard()
+    shard.in_flight[endpoint] = shard.in_flight.get(endpoint, 0) - 1
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop('request_metrics', None)
+    if started is None:
+        return response
+    endpoint, start, sql_statements, sql_seconds = started
+    shard = metrics.shard()
+    # A streamed body (SSE, PDF export) is still being sent after this hook
+    # returns, so the request stays in flight until the server closes it
+    response.call_on_close(lambda: finish_request_metrics(endpoint))
+
+    key = (endpoint, request.method, response.status_code)
+    shard.requests[key] = shard.requests.get(key, 0) + 1
+    if endpoint not in shard.latency:
+        shard.latency[endpoint] = new_histogram(METRICS_LATENCY_BUCKETS)
+        shard.sql[endpoint] = [0, 0.0]
+        shard.sql_per_request[endpoint] = new_histogram(METRICS_SQL_BUCKETS)
+    observe(shard.latency[endpoint], METRICS_LATENCY_BUCKETS, time.perf_counter() - start)
+
+    statements = shard.sql_statements - sql_statements
+    shard.sql[endpoint][0] += statements
+    shard.sql[endpoint][1] += shard.sql_seconds - sql_seconds
+    observe(shard.sql_per_request[endpoint], METRICS_SQL_BUCKETS, statements)
+    return response
+
+# Connection pool configuration
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 16))  # Idle connections kept open
+DB_BUSY_TIMEOUT_MS = 5000
+DB_STATEMENT_CACHE_SIZE = 64  # Comfortably larger than the app's fixed query set
+DB_PRAGMAS = (
+    'PRAGMA journal_mode = WAL',      # Readers never block the writer (and vice versa)
+    'PRAGMA synchronous = NORMAL',    # Safe with WAL, avoids an fsync per commit
+    f'PRAGMA busy_timeout = {DB_BUSY_TIMEOUT_MS}',
+    'PRAGMA mmap_size = 268435456',   # 256 MB memory-mapped reads
+    'PRAGMA cache_size = -32000',     # 32 MB page cache per connection
+    'PRAGMA temp_store = MEMORY',
+)
+
+class PooledConnection(sqlite3.Connection):
+    """SQLite connection that goes back to its pool when closed"""
+    pool = None
+    checked_out = False
+    lease = 0  # Counts checkouts, so a stale holder can tell it no longer has the connection
+
+    def close(self):
+        """Return the connection to the pool instead of closing it"""
+        if self.pool is None:
+            super().close()
+        elif self.checked_out:
+            self.pool.release(self)
+
+    def close_for_good(self):
+        """Actually close the underlying SQLite connection"""
+        super().close()
+
+    def execute(self, sql, parameters=()):
+        cursor = self.cursor(ProfiledCursor)
+        start = time.perf_counter()
+        try:
+            cursor.execute(sql, parameters)
+        finally:
+            seconds = time.perf_counter() - start
+            metrics.record_sql(seconds)
+        if cursor.description is None:
+            # No result rows to fetch, so the statement is complete
+            sql_profiler.finish(self, sql, parameters, seconds, max(cursor.rowcount, 0))
+        else:
+            cursor.profile = (sql, parameters, seconds)
+        return cursor
+
+    def executemany(self, sql, parameters):
+        parameters = parameters if isinstance(parameters, list) else list(parameters)
+        start = time.perf_counter()
+        try:
+            cursor = super().executemany(sql, parameters)
+        finally:
+            seconds = time.perf_counter() - start
+            metrics.record_sql(seconds)
+        sql_profiler.finish(self, sql, parameters, seconds, max(cursor.rowcount, 0), many=True)
+        return cursor
+
+class ProfiledCursor(sqlite3.Cursor):
+    """Cursor that charges its first fetch to the statement that produced it.
+
+    SQLite does much of a query's work while rows are stepped through, so a
+    statement is only reported, with its row count, once it has been fetched.
+    """
+    profile = None  # (sql, parameters, execute seconds) until reported
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(time.perf_counter() - start, len(rows))
+        return rows
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(time.perf_counter() - start, 0 if row is None else 1)
+        return row
+
+    def _fetched(self, seconds, rows):
+        metrics.record_sql(seconds, statements=0)
+        if self.profile is not None:
+            sql, parameters, execute_seconds = self.profile
+            self.profile = None
+            sql_profiler.finish(self.connection, sql, parameters, execute_seconds + seconds, rows)
+
+class ConnectionPool:
+    """Pool of long-lived SQLite connections shared by all request threads"""
+
+    def __init__(self, database, size):
+        self.database = database
+        self.size = size
+        self._idle = queue.LifoQueue()  # LIFO keeps the warmest connections in use
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.database,
+            factory=PooledConnection,
+            timeout=DB_BUSY_TIMEOUT_MS / 1000,
+            cached_statements=DB_STATEMENT_CACHE_SIZE,
+            check_same_thread=False  # Connections move between threads, one user at a time
+        )
+        conn.row_factory = sqlite3.Row  # This enables column access by name
+        for pragma in DB_PRAGMAS:
+            conn.execute(pragma)
+        conn.pool = self
+        return conn
+
+    def acquire(self):
+        """Check out an idle connection, opening a new one if none are free"""
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        conn.checked_out = True
+        conn.lease += 1
+        return conn
+
+    def open(self):
+        """A configured connection outside the pool, for a thread that keeps it for its lifetime.
 
-app = Flask(__name__)
-app.secret_key = 'eece_components_secret_key_2025'  
+        It is not registered with the request, so teardown never takes it
+        back; close() really closes it.
+        """
+        conn = self._connect()
+        conn.pool = None
+        return conn
 
-# Database configuration
-DATABASE = 'practical_management.db'
+    def release(self, conn):
+        """Put a connection back, discarding any uncommitted work"""
+        conn.checked_out = False
+        if conn.in_transaction:
+            conn.rollback()
+        if self._idle.qsize() < self.size:
+            self._idle.put(conn)
+        else:
+            conn.close_for_good()
+
+    def use_database(self, database):
+        """Point the pool at another database file, closing idle connections to the old one"""
+        self.database = database
+        while True:
+            try:
+                self._idle.get_nowait().close_for_good()
+            except queue.Empty:
+                break
+
+    def after_fork(self):
+        """Abandon connections inherited from the parent process; SQLite handles must not cross fork()"""
+        self._idle = queue.LifoQueue()
+
+db_pool = ConnectionPool(app.config['DATABASE'], DB_POOL_SIZE)
+if hasattr(os, 'register_at_fork'):  # Not on Windows, which has no fork()
+    os.register_at_fork(after_in_child=db_pool.after_fork)
 
 def get_db_connection():
-    """Get database connection"""
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row  # This enables column access by name
+    """Get a pooled database connection; call close() to hand it back"""
+    conn = db_pool.acquire()
+    if has_app_context():
+        # Remember it so teardown can recover it if a route never closes it
+        g.setdefault('db_connections', []).append((conn, conn.lease))
     return conn
 
+@app.teardown_appcontext
+def release_db_connections(exception=None):
+    """Return any connection a request forgot to close to the pool"""
+    for conn, lease in g.pop('db_connections', []):
+        # A connection that was closed may already be checked out by another thread
+        if conn.checked_out and conn.lease == lease:
+            conn.close()
+
+# Threads of this process queue here before a write transaction (BEGIN
+# IMMEDIATE). Left to SQLite's busy handler, blocked writers back off with
+# sleeps and the tail latency of a write burst grows to seconds. Held by the
+# write queue's thread for each batch and by catalog imports for each chunk.
+db_write_lock = threading.Lock()
+
+# Write queue. Requests hand their writes to one writer thread per process,
+# which runs whatever has queued up meanwhile in a single transaction (group
+# commit): one BEGIN IMMEDIATE and one commit per batch instead of per write.
+# A lone write is committed straight away; batches only form while the
+# previous commit is in progress, so nothing waits for a batch to fill. Each
+# write runs in its own SAVEPOINT, so one that raises is rolled back alone
+# and the exception is raised in the request that submitted it.
+DB_WRITE_QUEUE_SIZE = int(os.environ.get('DB_WRITE_QUEUE_SIZE', 1000))  # Pending writes before new ones are refused
+DB_WRITE_BATCH_SIZE = int(os.environ.get('DB_WRITE_BATCH_SIZE', 100))  # Writes per transaction at most
+DB_WRITE_TIMEOUT = 10  # Seconds a request waits for its write to commit
+METRICS_WRITE_BATCH_BUCKETS = (1, 2, 5, 10, 25, 50, 100)  # Writes per commit
+
+class WriteQueueBusy(Exception):
+    """Raised when the write queue is full or a write was not started in time"""
+
+class DatabaseWriter:
+    """Thread that commits queued writes in batches, one transaction per batch.
+
+    A write is a function called as fn(conn, *args) inside the transaction;
+    it must not commit or roll back itself. Its return value, or exception,
+    is delivered through a Future once the batch has committed.
+    """
+
+    def __init__(self, batch_size, maxsize, timeout):
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.queue = queue.Queue(maxsize)
+        self.thread = None
+        self.start_lock = threading.Lock()
+        self.refused = 0  # Submissions turned away by a full queue
+        # Written by the writer thread only
+        self.committed = 0
+        self.failed = 0  # Writes that raised, or whose batch could not commit
+        self.batch_sizes = new_histogram(METRICS_WRITE_BATCH_BUCKETS)
+        self.wait = new_histogram(METRICS_LATENCY_BUCKETS)  # Seconds from submit to commit
+
+    def start(self):
+        """Start the writer thread, once per process (again in a forked child)"""
+        with self.start_lock:
+            if self.thread is None or not self.thread.is_alive():
+                if self.thread is None:
+                    atexit.register(self.close)
+                self.thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+                self.thread.start()
+
+    def submit(self, fn, *args):
+        """Queue fn(conn, *args); returns a Future. Raises WriteQueueBusy if the queue is full"""
+        self.start()
+        future = Future()
+        try:
+            self.queue.put_nowait((future, fn, args, time.monotonic()))
+        except queue.Full:
+            self.refused += 1
+            raise WriteQueueBusy()
+        return future
+
+    def run(self, fn, *args):
+        """Queue fn(conn, *args) and wait for it to commit; returns its result"""
+        future = self.submit(fn, *args)
+        try:
+            return future.result(self.timeout)
+        except FutureTimeoutError:
+            if future.cancel():
+                raise WriteQueueBusy()
+            # Already in a transaction, so its outcome is moments away
+            return future.result()
+
+    def close(self, timeout=5):
+        """Commit everything queued so far and stop the writer"""
+        if self.thread is not None and self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join(timeout)
+
+    def _run(self):
+        while True:
+            write = self.queue.get()
+            batch = []
+            while write is not None:
+                batch.append(write)
+                if len(batch) == self.batch_size:
+                    break
+                try:
+                    write = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._commit(batch)
+            if write is None:
+                return
+
+    def _commit(self, batch):
+        # Writes cancelled by a request that stopped waiting are dropped here
+        batch = [write for write in batch if write[0].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        outcomes = []
+        conn = db_pool.acquire()
+        try:
+            with db_write_lock:
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    for _, fn, args, _ in batch:
+                        conn.execute('SAVEPOINT queued_write')
+                        try:
+                            outcomes.append((fn(conn, *args), None))
+                        except Exception as e:
+                            conn.execute('ROLLBACK TO queued_write')
+                            outcomes.append((None, e))
+                        conn.execute('RELEASE queued_write')
+                    conn.commit()
+                except BaseException:
+                    conn.rollback()
+                    raise
+        except Exception as e:
+            # Most likely another process held the write lock for the whole busy timeout
+            outcomes = [(None, e)] * len(batch)
+        finally:
+            conn.close()
+
+        now = time.monotonic()
+        observe(self.batch_sizes, METRICS_WRITE_BATCH_BUCKETS, len(batch))
+        for (future, _, _, queued), (result, error) in zip(batch, outcomes):
+            observe(self.wait, METRICS_LATENCY_BUCKETS, now - queued)
+            if error is None:
+                self.committed += 1
+                future.set_result(result)
+            else:
+                self.failed += 1
+                future.set_exception(error)
+
+db_writer = DatabaseWriter(DB_WRITE_BATCH_SIZE, DB_WRITE_QUEUE_SIZE, DB_WRITE_TIMEOUT)
+
+def write_statement(conn, sql, parameters=()):
+    """Queued write running a single statement; returns the number of rows it changed"""
+    return conn.execute(sql, parameters).rowcount
+
+# Catalog cache configuration
+CATALOG_CACHE_SIZE = int(os.environ.get('CATALOG_CACHE_SIZE', 512))  # Cached responses
+
+class CatalogCache:
+    """Bounded LRU cache of serialized catalog responses.
+
+    Entries are stamped with the write generation they were loaded under.
+    Bumping the generation (after an in-process write, or when SQLite's
+    data_version shows another connection committed) makes every older
+    entry a miss without having to walk the cache.
+
+    data_version is read on one watch connection of the cache's own. It never
+    writes, so the version moves on every commit made anywhere else: pooled
+    connections, the database writer, other worker processes.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._watch = None
+        self._watch_database = None
+        self._watch_lock = threading.Lock()
+        self._data_version = None
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != self.generation:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value, generation):
+        with self._lock:
+            if generation != self.generation:
+                return  # Loaded before a write landed, don't keep it
+            self._entries[key] = (generation, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self):
+        """Drop everything cached so far, e.g. after a stock or price update"""
+        with self._lock:
+            self.generation += 1
+            self.invalidations += 1
+            self._entries.clear()
+
+    def check_data_version(self):
+        """Invalidate if anything has committed to the database since the last check"""
+        with self._watch_lock:
+            if self._watch is None or self._watch_database != db_pool.database:
+                if self._watch is not None:
+                    self._watch.close()
+                # Nothing tells what changed before the watch connection opened
+                self._watch = db_pool.open()
+                self._watch_database = db_pool.database
+                self._data_version = None
+            data_version = self._watch.execute('PRAGMA data_version').fetchone()[0]
+            changed = data_version != self._data_version
+            self._data_version = data_version
+        if changed:
+            self.invalidate()
+
+    def after_fork(self):
+        """Abandon the watch connection inherited from the parent process"""
+        self._watch = None
+        self._watch_lock = threading.Lock()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'generation': self.generation,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+catalog_cache = CatalogCache(CATALOG_CACHE_SIZE)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=catalog_cache.after_fork)
+
+# Catalog responses are cached already encoded; a compressed copy is made on
+# the first request that accepts it and cached alongside
+COMPRESS_MIN_SIZE = 1024  # Bytes; smaller bodies gain too little to be worth compressing
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # Smaller than gzip -6 at similar speed; 11 is far too slow per miss
+
+def encode_json(payload):
+    """Encode a response body; orjson is several times faster than the json module"""
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+    return app.json.dumps(payload).encode('utf-8')
+
+def response_encoding(size):
+    """Content-Encoding to send a body of size bytes with, or None"""
+    if size < COMPRESS_MIN_SIZE:
+        return None
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, GZIP_LEVEL, mtime=0)
+
+def cached_json(key, loader, paged=False, columnar=None):
+    """Serve a JSON response from the catalog cache, calling loader(conn) on a miss.
+
+    Paged loaders return (payload, next_cursor); the cursor is sent in the
+    X-Next-Cursor header so list responses keep their shape. columnar, when
+    the client asked for that format, converts the payload before encoding.
+    """
+    if columnar is not None:
+        key = (*key, 'columnar')
+    conn = get_db_connection()
+    try:
+        catalog_cache.check_data_version()
+        entry = catalog_cache.get(key)
+        if entry is None:
+            generation = catalog_cache.generation
+            payload, next_cursor = loader(conn) if paged else (loader(conn), None)
+            if columnar is not None:
+                payload = columnar(payload)
+            entry = (encode_json(payload), next_cursor, {})
+            catalog_cache.put(key, entry, generation)
+    finally:
+        conn.close()
+
+    body, next_cursor, compressed = entry
+    encoding = response_encoding(len(body))
+    if encoding:
+        # Two threads may both compress a fresh entry; either result is fine
+        if encoding not in compressed:
+            compressed[encoding] = compress(body, encoding)
+        body = compressed[encoding]
+    response = app.response_class(body, mimetype=app.json.mimetype)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.update(('Accept', 'Accept-Encoding'))
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+# Static assets. The CSS and JavaScript under static/ are served under
+# content-hashed names (/assets/js/main.3f9c2a1b7d4e.js) with a year-long
+# immutable lifetime: browsers never revalidate them, and an edited file just
+# gets a new URL. Files are hashed and compressed once per process.
+ASSET_HASH_LENGTH = 12  # Hex digits of the SHA-256 kept in fingerprinted names
+ASSET_MAX_AGE = 365 * 24 * 3600  # Seconds
+ASSET_GZIP_LEVEL = 9  # Compressed once at startup, so the slowest settings are affordable
+ASSET_BROTLI_QUALITY = 11
+
+class StaticAssets:
+    """Fingerprinted, precompressed copies of every file under a directory"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._names = {}  # 'js/main.js' -> 'js/main.3f9c2a1b7d4e.js'
+        self._files = {}  # 'js/main.3f9c2a1b7d4e.js' -> (body, mimetype, {encoding: body})
+        self._stamps = {}  # 'js/main.js' -> (mtime, size) it was last built from
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def refresh(self):
+        """Fingerprint files that are new or changed since the last refresh"""
+        with self._lock:
+            for root, _, filenames in os.walk(self.directory):
+                for filename in filenames:
+                    path = os.path.join(root, filename)
+                    name = os.path.relpath(path, self.directory).replace(os.sep, '/')
+                    stat = os.stat(path)
+                    stamp = (stat.st_mtime_ns, stat.st_size)
+                    if self._stamps.get(name) != stamp:
+                        self._build(name, path)
+                        self._stamps[name] = stamp
+
+    def _build(self, name, path):
+        with open(path, 'rb') as f:
+            body = f.read()
+        stem, extension = os.path.splitext(name)
+        fingerprinted = f'{stem}.{hashlib.sha256(body).hexdigest()[:ASSET_HASH_LENGTH]}{extension}'
+        encoded = {'gzip': gzip.compress(body, ASSET_GZIP_LEVEL, mtime=0)}
+        if brotli is not None:
+            encoded['br'] = brotli.compress(body, quality=ASSET_BROTLI_QUALITY)
+        # Older versions stay servable, for pages rendered before the file changed
+        self._files[fingerprinted] = (
+            body,
+            mimetypes.guess_type(name)[0] or 'application/octet-stream',
+            {encoding: data for encoding, data in encoded.items() if len(data) < len(body)}
+        )
+        self._names[name] = fingerprinted
+
+    def fingerprinted(self, name):
+        """Content-hashed name of an asset, raising KeyError for unknown files"""
+        return self._names[name]
+
+    def get(self, fingerprinted):
+        """(body, mimetype, {encoding: body}) for a fingerprinted name, or None"""
+        return self._files.get(fingerprinted)
+
+static_assets = StaticAssets(app.static_folder)
+
+@app.template_global()
+def asset_url(name):
+    """Fingerprinted URL of a static asset, e.g. asset_url('js/main.js')"""
+    if app.debug:
+        static_assets.refresh()  # Pick up edits without restarting the dev server
+    return url_for('static_asset', filename=static_assets.fingerprinted(name))
+
+@app.route('/assets/<path:filename>')
+def static_asset(filename):
+    """Serve a fingerprinted asset, precompressed when the client accepts it"""
+    asset = static_assets.get(filename)
+    if asset is None:
+        abort(404)
+    body, mimetype, encoded = asset
+    encoding = response_encoding(len(body))
+    if encoding not in encoded:
+        encoding = None
+    response = app.response_class(encoded[encoding] if encoding else body, mimetype=mimetype)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.max_age = ASSET_MAX_AGE
+    response.cache_control.immutable = True
+    return response
+
 def init_db():
     """Initialize database if it doesn't exist"""
-    if not os.path.exists(DATABASE):
-        print(f"Database {DATABASE} not found. Please run init_db.py first.")
+    if not os.path.exists(db_pool.database):
+        print(f"Database {db_pool.database} not found. Please run init_db.py first.")
         return False
     return True
 
@@ -43,22 +866,655 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+# Queries used by the routes. They live here so check_query_plans() can
+# verify that every one of them is served by an index.
+STUDENT_BY_EMAIL_SQL = 'SELECT * FROM Student WHERE email_address = ?'
+
+# Only replaces the hash that was verified, so a concurrent password change wins
+UPDATE_PASSWORD_HASH_SQL = 'UPDATE Student SET password_hash = ? WHERE student_id = ? AND password_hash = ?'
+
+INSERT_STUDENT_SQL = 'INSERT INTO Student (full_name, email_address, password_hash) VALUES (?, ?, ?)'
+
+PRACTICALS_SQL = 'SELECT * FROM Practical ORDER BY prac_number'
+
+PRACTICAL_NUMBERS_SQL = 'SELECT prac_number FROM Practical ORDER BY prac_number'
+
+SUPPLIERS_SQL = 'SELECT * FROM Supplier ORDER BY supplier_name'
+
+PRACTICAL_COMPONENTS_SQL = """
+    SELECT 
+        pc.quantity,
+        c.component_id,
+        c.component_name,
+        pc.alt_component_id,
+        ac.alt_component_name
+    FROM Practical_component pc
+    JOIN Components c ON pc.component_id = c.component_id
+    LEFT JOIN Alt_components ac ON pc.alt_component_id = ac.alt_component_id
+    WHERE pc.practical_number = ?
+    ORDER BY c.component_name
+"""
+
+# Offer columns, read from the Offer view (see init_db.py) in OFFER_FIELDS
+# order. Stock status and level are classified by the view; only the price
+# needs converting, because DECIMAL columns hand back whole prices as integers.
+# The raw price follows as sort_price: SQLite only pushes ORDER BY o.price
+# into the view's index scans when o.price itself is a result column.
+OFFER_FIELDS = ('supplier_id', 'supplier_name', 'supplier_location', 'store_type', 'quantity_in_stock',
+                'price', 'component_name', 'stock_status', 'stock_level')
+OFFER_COLUMNS = """
+        o.supplier_id,
+        o.supplier_name,
+        o.supplier_location,
+        o.store_type,
+        o.quantity_in_stock,
+        IFNULL(o.price + 0.0, 0.0) AS price,
+        o.part_name AS offer_name,
+        o.stock_status,
+        o.stock_level,
+        o.price AS sort_price"""
+NO_OFFER_COLUMNS = ', NULL' * (len(OFFER_FIELDS) + 1)
+
+# Supplier offers for one component or alternative (part_type, part_id)
+OFFERS_SQL = f"""
+    SELECT{OFFER_COLUMNS}
+    FROM Offer o
+    WHERE o.part_type = ? AND o.part_id = ?{{filters}}
+    ORDER BY {{order}}{{limit}}
+"""
+
+# The page CTE picks the components (optionally one keyset page of them),
+# then regular offers and alternative offers are unioned so the whole
+# catalog comes back from a single round trip instead of one query per
+# component. Components with no matching offers get one row of NULL offer
+# columns from the NOT EXISTS arm, so they are still listed; a LEFT JOIN
+# would make SQLite materialize the whole Offer view. Each arm reads the
+# view for its own part type (see init_db.py), and CROSS JOIN keeps page as
+# the outer loop: depending on table sizes the planner otherwise scans an
+# offer table and probes page through an automatic index.
+CATALOG_SQL = f"""
+    WITH page AS (
+        SELECT
+            pc.practical_number,
+            pc.quantity,
+            pc.component_id,
+            c.component_name,
+            pc.alt_component_id,
+            ac.alt_component_name
+        FROM Practical_component pc
+        JOIN Components c ON pc.component_id = c.component_id
+        LEFT JOIN Alt_components ac ON pc.alt_component_id = ac.alt_component_id
+        WHERE pc.practical_number IN ({{placeholders}}){{after}}{{limit}}
+    )
+    SELECT page.*, 0 AS is_alternative,{OFFER_COLUMNS}
+    FROM page
+    CROSS JOIN Component_offer o ON o.part_id = page.component_id{{filters}}
+    UNION ALL
+    SELECT page.*, 0{NO_OFFER_COLUMNS}
+    FROM page
+    WHERE NOT EXISTS (
+        SELECT 1 FROM Component_offer o
+        WHERE o.part_id = page.component_id{{filters}}
+    )
+    UNION ALL
+    SELECT page.*, 1,{OFFER_COLUMNS}
+    FROM page
+    CROSS JOIN Alt_component_offer o ON o.part_id = page.alt_component_id{{filters}}
+    ORDER BY 1, 4, 3, 7, {{order}}
+"""
+CATALOG_OFFER_START = 7  # Index of the first offer column in a catalog row
+
+# Offer sort orders: sort name -> (column, direction). Ties are broken by
+# supplier_id in the same direction so keyset cursors stay unambiguous.
+OFFER_SORTS = {
+    'price': ('price', 'ASC'),
+    '-price': ('price', 'DESC'),
+    '-stock': ('stock', 'DESC')
+}
+MAX_PAGE_SIZE = 200
+# Value types of a keyset cursor: (sort value, supplier_id) for offer pages,
+# (practical_number, component_name, component_id) for catalog pages
+OFFER_CURSOR_TYPES = ((int, float), int)
+CATALOG_CURSOR_TYPES = (int, str, int)
+
+def no_offer_filters():
+    """Offer filters that match everything, in the shape parse_offer_filters() returns"""
+    return {
+        'min_price': None,
+        'max_price': None,
+        'store_type': None,
+        'in_stock_only': False,
+        'sort': 'price',
+        'cursor': None,
+        'limit': None
+    }
+
+def encode_cursor(values):
+    """Opaque keyset cursor for the last row of a page"""
+    return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor, types):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, UnicodeError):
+        raise ValueError('invalid cursor')
+    if not isinstance(values, list) or len(values) != len(types):
+        raise ValueError('invalid cursor')
+    for value, value_type in zip(values, types):
+        if isinstance(value, bool) or not isinstance(value, value_type):
+            raise ValueError('invalid cursor')
+    return values
+
+def parse_offer_filters(args, cursor_types=OFFER_CURSOR_TYPES):
+    """Read offer filters from the query string, raising ValueError on bad input"""
+    filters = no_offer_filters()
+
+    for name in ('min_price', 'max_price'):
+        if args.get(name, '') != '':
+            try:
+                filters[name] = float(args[name])
+            except ValueError:
+                raise ValueError(f'{name} must be a number')
+            if not math.isfinite(filters[name]) or filters[name] < 0:
+                raise ValueError(f'{name} must be a non-negative number')
+
+    store_type = args.get('store_type', 'all').lower()
+    if store_type not in ('all', 'online', 'physical'):
+        raise ValueError('store_type must be online, physical or all')
+    filters['store_type'] = None if store_type == 'all' else store_type
+
+    filters['in_stock_only'] = args.get('in_stock_only', '').lower() in ('1', 'true', 'yes')
+
+    filters['sort'] = args.get('sort', 'price')
+    if filters['sort'] not in OFFER_SORTS:
+        raise ValueError(f"sort must be one of {', '.join(OFFER_SORTS)}")
+
+    if args.get('limit', '') != '':
+        try:
+            filters['limit'] = int(args['limit'])
+        except ValueError:
+            raise ValueError('limit must be a whole number')
+        if not 1 <= filters['limit'] <= MAX_PAGE_SIZE:
+            raise ValueError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+
+    if args.get('cursor'):
+        filters['cursor'] = tuple(decode_cursor(args['cursor'], cursor_types))
+    return filters
+
+def offer_filter_sql(filters):
+    """SQL conditions (each starting with AND) and parameters for the offer filters on the Offer view"""
+    clauses, params = [], []
+    if filters['min_price'] is not None:
+        clauses.append('o.price >= ?')
+        params.append(filters['min_price'])
+    if filters['max_price'] is not None:
+        clauses.append('o.price <= ?')
+        params.append(filters['max_price'])
+    if filters['store_type']:
+        clauses.append('o.store_type = ?')
+        params.append(filters['store_type'])
+    if filters['in_stock_only']:
+        clauses.append('o.quantity_in_stock > 0')
+    return ''.join(f'\n        AND {clause}' for clause in clauses), params
+
+def offers_sql(filters):
+    """Build the supplier offer query with filters, sort order and keyset page"""
+    conditions, params = offer_filter_sql(filters)
+    column, direction = OFFER_SORTS[filters['sort']]
+    column = 'o.price' if column == 'price' else 'o.quantity_in_stock'
+
+    if filters['cursor']:
+        last_value, last_supplier = filters['cursor']
+        comparison = '>' if direction == 'ASC' else '<'
+        conditions += f'\n        AND ({column}, o.supplier_id) {comparison} (?, ?)'
+        params += [last_value, last_supplier]
+
+    limit = ''
+    if filters['limit']:
+        limit = '\n    LIMIT ?'
+        params.append(filters['limit'] + 1)  # One extra row tells us whether there is a next page
+
+    sql = OFFERS_SQL.format(
+        filters=conditions,
+        order=f'{column} {direction}, o.supplier_id {direction}',
+        limit=limit
+    )
+    return sql, params
+
+def catalog_sql(practical_count, filters=None):
+    """Catalog query and its parameters (after the practical numbers) for the given filters"""
+    filters = filters or no_offer_filters()
+    params = []
+
+    after = ''
+    if filters['cursor']:
+        after = '\n            AND (pc.practical_number, c.component_name, pc.component_id) > (?, ?, ?)'
+        params += filters['cursor']
+
+    limit = ''
+    if filters['limit']:
+        limit = '\n        ORDER BY pc.practical_number, c.component_name, pc.component_id\n        LIMIT ?'
+        params.append(filters['limit'] + 1)
+
+    # The same offer filters apply in all three arms of the union
+    conditions, offer_params = offer_filter_sql(filters)
+
+    column, direction = OFFER_SORTS[filters['sort']]
+    column = 13 if column == 'price' else 12  # Positions of price / stock in the result
+
+    sql = CATALOG_SQL.format(
+        placeholders=','.join('?' * practical_count),
+        after=after,
+        limit=limit,
+        filters=conditions,
+        order=f'{column} {direction}, 8 {direction}'
+    )
+    return sql, params + offer_params * 3
+
+# Full-text part search. Part_search rowids are component ids, or negated
+# alternative ids, so the cheapest in-stock offer for each hit can be looked
+# up through the covering price indexes (first in-stock row in price order).
+# Only the first SEARCH_CANDIDATES matches are scored: bm25 over every match
+# of a short prefix costs far more than the rest of the query.
+SEARCH_SQL = """
+    WITH candidates AS (
+        SELECT rowid AS search_id, part_name, rank
+        FROM Part_search
+        WHERE Part_search MATCH ?
+        LIMIT ?
+    ),
+    hits AS (
+        SELECT * FROM candidates
+        ORDER BY rank
+        LIMIT ?
+    ),
+    best AS MATERIALIZED (
+        SELECT
+            hits.*,
+            CASE WHEN search_id > 0 THEN (
+                SELECT sc.supplier_id
+                FROM Supplier_components sc
+                WHERE sc.component_id = search_id AND sc.quantity_in_stock > 0
+                ORDER BY sc.price_component_per_supplier, sc.supplier_id
+                LIMIT 1
+            ) ELSE (
+                SELECT sac.supplier_id
+                FROM Supplier_alt_components sac
+                WHERE sac.alt_component_id = -search_id AND sac.alt_quantity_in_stock > 0
+                ORDER BY sac.alt_price_component_per_supplier, sac.supplier_id
+                LIMIT 1
+            ) END AS best_supplier_id
+        FROM hits
+    )
+    SELECT
+        best.search_id,
+        best.part_name,
+        s.supplier_id,
+        s.supplier_name,
+        s.supplier_location,
+        s.store_type,
+        COALESCE(sc.quantity_in_stock, sac.alt_quantity_in_stock) AS quantity_in_stock,
+        COALESCE(sc.price_component_per_supplier, sac.alt_price_component_per_supplier) AS price
+    FROM best
+    LEFT JOIN Supplier s ON s.supplier_id = best.best_supplier_id
+    LEFT JOIN Supplier_components sc
+        ON best.search_id > 0 AND sc.component_id = best.search_id AND sc.supplier_id = best.best_supplier_id
+    LEFT JOIN Supplier_alt_components sac
+        ON best.search_id < 0 AND sac.alt_component_id = -best.search_id AND sac.supplier_id = best.best_supplier_id
+    ORDER BY best.rank
+"""
+SEARCH_DEFAULT_LIMIT = 10
+SEARCH_MAX_LIMIT = 50
+SEARCH_CANDIDATES = 500
+
+def search_match_expression(text):
+    """FTS5 query matching every word of text as a prefix, e.g. '74hc dec' -> "74hc"* "dec"*"""
+    words = re.findall(r'\w+', text.lower())
+    return ' '.join(f'"{word}"*' for word in words)
+
+# Reservations. Stock is taken with one conditional UPDATE per item inside a
+# single queued write (see DatabaseWriter), so an offer's last unit can only
+# go to one reservation and a cart is reserved either completely or not at all.
+RESERVE_STOCK_SQL = {
+    'component': """
+        UPDATE Supplier_components
+        SET quantity_in_stock = quantity_in_stock - ?, updated_at = CURRENT_TIMESTAMP
+        WHERE component_id = ? AND supplier_id = ? AND quantity_in_stock >= ?
+        RETURNING price_component_per_supplier AS price
+    """,
+    'alternative': """
+        UPDATE Supplier_alt_components
+        SET alt_quantity_in_stock = alt_quantity_in_stock - ?, updated_at = CURRENT_TIMESTAMP
+        WHERE alt_component_id = ? AND supplier_id = ? AND alt_quantity_in_stock >= ?
+        RETURNING alt_price_component_per_supplier AS price
+    """
+}
+
+RETURN_STOCK_SQL = {
+    'component': """
+        UPDATE Supplier_components
+        SET quantity_in_stock = quantity_in_stock + ?, updated_at = CURRENT_TIMESTAMP
+        WHERE component_id = ? AND supplier_id = ?
+    """,
+    'alternative': """
+        UPDATE Supplier_alt_components
+        SET alt_quantity_in_stock = alt_quantity_in_stock + ?, updated_at = CURRENT_TIMESTAMP
+        WHERE alt_component_id = ? AND supplier_id = ?
+    """
+}
+
+STOCK_SQL = {
+    'component': 'SELECT quantity_in_stock FROM Supplier_components WHERE component_id = ? AND supplier_id = ?',
+    'alternative': 'SELECT alt_quantity_in_stock FROM Supplier_alt_components WHERE alt_component_id = ? AND supplier_id = ?'
+}
+
+# Offer change feed. Catalog_change logs a version per offer change (see
+# init_db.py); the offer's current state is joined in from the Offer view, and
+# an offer that no longer exists comes from the NOT EXISTS arm as deleted.
+CHANGES_SQL = f"""
+    SELECT ch.version, ch.part_type, ch.part_id, 0 AS deleted,{OFFER_COLUMNS}
+    FROM Catalog_change ch
+    JOIN Offer o ON o.part_type = ch.part_type AND o.part_id = ch.part_id AND o.supplier_id = ch.supplier_id
+    WHERE ch.version > ?1
+    UNION ALL
+    SELECT ch.version, ch.part_type, ch.part_id, 1, ch.supplier_id{', NULL' * len(OFFER_FIELDS)}
+    FROM Catalog_change ch
+    WHERE ch.version > ?1 AND NOT EXISTS (
+        SELECT 1 FROM Offer o
+        WHERE o.part_type = ch.part_type AND o.part_id = ch.part_id AND o.supplier_id = ch.supplier_id
+    )
+    ORDER BY 1
+    LIMIT ?2
+"""
+
+# Two subqueries, because MIN and MAX together would scan the log
+CHANGE_LOG_RANGE_SQL = """
+    SELECT (SELECT MIN(version) FROM Catalog_change) AS oldest,
+           IFNULL((SELECT MAX(version) FROM Catalog_change), 0) AS current
+"""
+
+PRUNE_CHANGES_SQL = 'DELETE FROM Catalog_change WHERE version <= ?'
+
+# Practicals listing changed parts, for routing live updates to the streams
+# that show them
+CHANGE_PRACTICALS_SQL = """
+    SELECT practical_number, 'component' AS part_type, component_id AS part_id FROM Practical_component
+    WHERE component_id IN (SELECT value FROM json_each(?))
+    UNION ALL
+    SELECT practical_number, 'alternative', alt_component_id FROM Practical_component
+    WHERE alt_component_id IN (SELECT value FROM json_each(?))
+"""
+
+CHANGES_DEFAULT_LIMIT = 500
+CHANGES_MAX_LIMIT = 5000
+CHANGE_LOG_KEEP = int(os.environ.get('CHANGE_LOG_KEEP', 200000))  # Newest changes kept; older clients reload
+CHANGE_LOG_PRUNE_BATCH = 10000  # Changes deleted per queued write
+
+INSERT_RESERVATION_SQL = """
+    INSERT INTO Reservation (student_id, practical_number, expires_at, idempotency_key)
+    VALUES (?, ?, datetime('now', ?), ?)
+"""
+
+RESERVATION_BY_IDEMPOTENCY_KEY_SQL = """
+    SELECT reservation_id FROM Reservation WHERE student_id = ? AND idempotency_key = ?
+"""
+
+INSERT_RESERVATION_ITEM_SQL = """
+    INSERT INTO Reservation_item (reservation_id, supplier_id, component_id, alt_component_id, quantity, unit_price)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+RELEASE_RESERVATION_SQL = """
+    UPDATE Reservation SET status = ?, updated_at = CURRENT_TIMESTAMP
+    WHERE reservation_id = ? AND status = 'active'
+"""
+
+# Oldest expired reservations first, straight off the partial expiry index
+EXPIRED_RESERVATIONS_SQL = """
+    SELECT reservation_id FROM Reservation
+    WHERE status = 'active' AND expires_at <= CURRENT_TIMESTAMP
+    ORDER BY expires_at
+    LIMIT ?
+"""
+
+RESERVATION_SQL = 'SELECT * FROM Reservation WHERE reservation_id = ? AND student_id = ?'
+
+# Items of one reservation, or of every reservation a student has made
+RESERVATION_ITEMS_SQL = """
+    SELECT
+        r.reservation_id, r.practical_number, r.status, r.created_at,
+        ri.supplier_id, ri.component_id, ri.alt_component_id, ri.quantity, ri.unit_price,
+        s.supplier_name,
+        COALESCE(c.component_name, a.alt_component_name) AS part_name
+    FROM Reservation r
+    JOIN Reservation_item ri ON ri.reservation_id = r.reservation_id
+    JOIN Supplier s ON s.supplier_id = ri.supplier_id
+    LEFT JOIN Components c ON c.component_id = ri.component_id
+    LEFT JOIN Alt_components a ON a.alt_component_id = ri.alt_component_id
+    WHERE {where}
+    ORDER BY r.reservation_id DESC
+"""
+RESERVATION_ITEMS_BY_ID_SQL = RESERVATION_ITEMS_SQL.format(where='r.reservation_id = ?')
+RESERVATION_ITEMS_BY_STUDENT_SQL = RESERVATION_ITEMS_SQL.format(where='r.student_id = ?')
+
+RESERVATION_MAX_QUANTITY = 100  # Per item, so a typo cannot empty a supplier's stock
+RESERVATION_HOLD_DAYS = 3  # Uncollected reservations go back to stock after this
+IDEMPOTENCY_KEY_MAX_LENGTH = 64
+
+INSERT_FEEDBACK_SQL = 'INSERT INTO Feedback (student_id, rating, feedback, created_at) VALUES (?, ?, ?, ?)'
+
+FEEDBACK_RATING_COUNTS_SQL = 'SELECT rating, submissions FROM Feedback_rating_count ORDER BY rating'
+
+def _plan_check_filters(**overrides):
+    filters = no_offer_filters()
+    filters.update(overrides)
+    return filters
+
+# Every query above with sample parameters and the plan steps it is allowed
+# to use (matched as prefixes). Any other full-table SCAN or temp B-tree sort
+# is a regression.
+QUERY_PLAN_CHECKS = [
+    ('student_by_email', STUDENT_BY_EMAIL_SQL, ('student@example.com',), ()),
+    ('update_password_hash', UPDATE_PASSWORD_HASH_SQL, ('', 1, ''), ()),
+    # Listing queries read the whole (small) table by design
+    ('practicals', PRACTICALS_SQL, (), ('SCAN Practical',)),
+    ('practical_numbers', PRACTICAL_NUMBERS_SQL, (), ('SCAN Practical',)),
+    # idx_supplier_identity leads with supplier_name too; ANALYZEd databases may pick it
+    ('suppliers', SUPPLIERS_SQL, (), ('SCAN Supplier USING INDEX idx_supplier_name',
+                                      'SCAN Supplier USING INDEX idx_supplier_identity')),
+    # Sorting by component name needs the join, but only sorts one practical's rows
+    ('practical_components', PRACTICAL_COMPONENTS_SQL, (1,), ('USE TEMP B-TREE FOR ORDER BY',)),
+]
+for _name, _filters in [
+    ('', no_offer_filters()),
+    ('_filtered_page', _plan_check_filters(min_price=1, max_price=10, store_type='online', in_stock_only=True,
+                                           cursor=(2.5, 1), limit=20)),
+    ('_price_desc', _plan_check_filters(sort='-price')),
+]:
+    for _part_type in ('component', 'alternative'):
+        _sql, _params = offers_sql(_filters)
+        QUERY_PLAN_CHECKS.append((f'{_part_type}_offers' + _name, _sql, (_part_type, 1, *_params), ()))
+# The final catalog sort only orders one page of components' offers
+for _name, _count, _filters in [
+    ('catalog', 1, no_offer_filters()),
+    ('catalog_many', 3, no_offer_filters()),
+    ('catalog_filtered_page', 3, _plan_check_filters(min_price=1, store_type='physical',
+                                                     cursor=(1, 'A', 1), limit=20)),
+]:
+    _sql, _params = catalog_sql(_count, _filters)
+    QUERY_PLAN_CHECKS.append((_name, _sql, (*range(1, _count + 1), *_params),
+                              ('SCAN page', 'USE TEMP B-TREE FOR ORDER BY',
+                               'USE TEMP B-TREE FOR RIGHT PART OF ORDER BY')))
+# The FTS5 lookup itself is reported as a virtual table scan; the final sort
+# only orders the limited set of hits
+QUERY_PLAN_CHECKS.append(('search', SEARCH_SQL,
+                          ('"74hc"*', SEARCH_CANDIDATES, SEARCH_DEFAULT_LIMIT),
+                          ('SCAN Part_search VIRTUAL TABLE', 'SCAN candidates', 'SCAN hits', 'SCAN best',
+                           'USE TEMP B-TREE FOR ORDER BY')))
+
+# Stock updates go straight to the offer's primary key
+for _part_type in RESERVE_STOCK_SQL:
+    QUERY_PLAN_CHECKS.append((f'reserve_{_part_type}', RESERVE_STOCK_SQL[_part_type], (1, 1, 1, 1), ()))
+    QUERY_PLAN_CHECKS.append((f'return_{_part_type}', RETURN_STOCK_SQL[_part_type], (1, 1, 1), ()))
+QUERY_PLAN_CHECKS.append(('release_reservation', RELEASE_RESERVATION_SQL, ('released', 1), ()))
+QUERY_PLAN_CHECKS.append(('expired_reservations', EXPIRED_RESERVATIONS_SQL, (100,), ()))
+# Five rows, one per rating
+QUERY_PLAN_CHECKS.append(('feedback_rating_counts', FEEDBACK_RATING_COUNTS_SQL, (), ('SCAN Feedback_rating_count',)))
+# The change feed reads the log by version and each offer by primary key
+QUERY_PLAN_CHECKS.append(('changes', CHANGES_SQL, (0, CHANGES_DEFAULT_LIMIT), ()))
+QUERY_PLAN_CHECKS.append(('change_log_range', CHANGE_LOG_RANGE_SQL, (), ('SCAN CONSTANT ROW',)))
+QUERY_PLAN_CHECKS.append(('prune_changes', PRUNE_CHANGES_SQL, (1,), ()))
+# json_each() lists the changed ids; each is then looked up by index
+QUERY_PLAN_CHECKS.append(('change_practicals', CHANGE_PRACTICALS_SQL, ('[1]', '[1]'),
+                          ('SCAN json_each VIRTUAL TABLE',)))
+QUERY_PLAN_CHECKS.append(('reservation_by_idempotency_key', RESERVATION_BY_IDEMPOTENCY_KEY_SQL, (1, 'key'), ()))
+QUERY_PLAN_CHECKS.append(('reservation_items_by_id', RESERVATION_ITEMS_BY_ID_SQL, (1,), ()))
+QUERY_PLAN_CHECKS.append(('reservation_items_by_student', RESERVATION_ITEMS_BY_STUDENT_SQL, (1,), ()))
+
+def check_query_plans(conn):
+    """Run EXPLAIN QUERY PLAN on every checked query and report regressions"""
+    results = []
+    for name, sql, params, allowed in QUERY_PLAN_CHECKS:
+        plan = [row['detail'] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params).fetchall()]
+        problems = [
+            step for step in plan
+            if (step.startswith('SCAN') or 'TEMP B-TREE' in step)
+            and not any(step.startswith(prefix) for prefix in allowed)
+        ]
+        results.append({'query': name, 'plan': plan, 'problems': problems})
+    return results
+
 @app.route('/')
 def home():
     return render_template('home.html')
 
+# Password hashing. scrypt/pbkdf2 dominate the cost of a login, so hashes run
+# on a small dedicated pool: a login storm at the start of a lab queues behind
+# PASSWORD_HASH_WORKERS hashes instead of occupying every request thread the
+# catalog API needs. hashlib releases the GIL while hashing, so threads suffice.
+PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')  # werkzeug method string
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))  # Concurrent hashes
+PASSWORD_HASH_QUEUE_LIMIT = int(os.environ.get('PASSWORD_HASH_QUEUE_LIMIT', 64))  # Queued plus running hashes
+PASSWORD_HASH_TIMEOUT = 10  # Seconds a request waits for its hash
+
+# Stored hashes whose method/parameters differ from this prefix are upgraded
+# on the next successful login. Hashing once here also rejects a bad method.
+PASSWORD_HASH_PREFIX = generate_password_hash('', PASSWORD_HASH_METHOD).split('$', 1)[0]
+
+# Login admission control: token buckets per client IP and per email address,
+# checked before any database lookup or hash. A lab's machines may share one
+# NAT address, so the IP bucket allows a whole class logging in together.
+LOGIN_IP_BURST = int(os.environ.get('LOGIN_IP_BURST', 100))  # Attempts at once per IP
+LOGIN_IP_RATE = float(os.environ.get('LOGIN_IP_RATE', 5))  # Attempts per second per IP, sustained
+LOGIN_EMAIL_BURST = int(os.environ.get('LOGIN_EMAIL_BURST', 5))  # Attempts at once per email
+LOGIN_EMAIL_RATE = float(os.environ.get('LOGIN_EMAIL_RATE', 1 / 30))  # Attempts per second per email, sustained
+LOGIN_LIMITER_KEYS = 10000  # Buckets kept per limiter, least recently used dropped first
+
+class HashPoolBusy(Exception):
+    """Raised when the hash pool is full or a hash did not finish in time"""
+
+class HashPool:
+    """Bounded thread pool that request threads hand password hashes to"""
+
+    def __init__(self, workers, limit, timeout):
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix='password-hash')
+        self.slots = threading.BoundedSemaphore(limit)
+        self.timeout = timeout
+
+    def run(self, fn, *args):
+        """Run fn(*args) on the pool and wait for its result"""
+        if not self.slots.acquire(blocking=False):
+            raise HashPoolBusy()
+        future = self.executor.submit(fn, *args)
+        future.add_done_callback(lambda f: self.slots.release())
+        try:
+            return future.result(self.timeout)
+        except FutureTimeoutError:
+            # Nobody is waiting for it any more; a hash still queued is dropped
+            future.cancel()
+            raise HashPoolBusy()
+
+class RateLimiter:
+    """Token bucket per key: burst attempts at once, refilled at rate per second"""
+
+    def __init__(self, burst, rate, max_keys):
+        self.burst = burst
+        self.rate = rate
+        self.max_keys = max_keys
+        self.buckets = OrderedDict()  # key -> (tokens, last update)
+        self.lock = threading.Lock()
+
+    def acquire(self, key):
+        """Take a token for key; returns 0 if admitted, else seconds until one is available"""
+        now = time.monotonic()
+        with self.lock:
+            tokens, updated = self.buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            wait = 0 if tokens >= 1 else (1 - tokens) / self.rate
+            if not wait:
+                tokens -= 1
+            self.buckets[key] = (tokens, now)
+            if len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+        return wait
+
+hash_pool = HashPool(PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_LIMIT, PASSWORD_HASH_TIMEOUT)
+login_ip_limiter = RateLimiter(LOGIN_IP_BURST, LOGIN_IP_RATE, LOGIN_LIMITER_KEYS)
+login_email_limiter = RateLimiter(LOGIN_EMAIL_BURST, LOGIN_EMAIL_RATE, LOGIN_LIMITER_KEYS)
+
+def hash_password(password):
+    return hash_pool.run(generate_password_hash, password, PASSWORD_HASH_METHOD)
+
+def verify_password(password_hash, password):
+    return hash_pool.run(check_password_hash, password_hash, password)
+
+def needs_rehash(password_hash):
+    return password_hash.split('$', 1)[0] != PASSWORD_HASH_PREFIX
+
+def admit_login(email):
+    """Seconds the client must wait before another attempt, 0 if admitted"""
+    return login_ip_limiter.acquire(request.remote_addr) or login_email_limiter.acquire(email.strip().lower())
+
+def auth_refused(template, message, status, retry_after):
+    """Re-render a login/signup form with a flash message and a Retry-After status"""
+    flash(message, 'error')
+    response = app.make_response((render_template(template), status))
+    response.headers['Retry-After'] = str(max(1, int(retry_after + 0.999)))
+    return response
+
 @app.route('/login', methods=['POST'])
 def login():
     email = request.form['email']
     password = request.form['password']
-    
+
+    wait = admit_login(email)
+    if wait:
+        return auth_refused('home.html', 'Too many login attempts. Please wait a moment and try again.', 429, wait)
+
     conn = get_db_connection()
-    user = conn.execute(
-        'SELECT * FROM Student WHERE email_address = ?', (email,)
-    ).fetchone()
+    user = conn.execute(STUDENT_BY_EMAIL_SQL, (email,)).fetchone()
     conn.close()
-    
-    if user and check_password_hash(user['password_hash'], password):
+
+    try:
+        valid = user is not None and verify_password(user['password_hash'], password)
+    except HashPoolBusy:
+        return auth_refused('home.html', 'The server is busy. Please try again in a few seconds.', 503, 2)
+
+    if valid:
+        if needs_rehash(user['password_hash']):
+            # Parameters changed since this hash was stored; upgrading is best
+            # effort, so a busy pool just leaves it for the next login
+            try:
+                new_hash = hash_password(password)
+            except HashPoolBusy:
+                new_hash = None
+            if new_hash:
+                try:
+                    db_writer.run(write_statement, UPDATE_PASSWORD_HASH_SQL,
+                                  (new_hash, user['student_id'], user['password_hash']))
+                except (WriteQueueBusy, sqlite3.Error):
+                    pass
+
         # Login successful
         session['user_id'] = user['student_id']
         session['user_email'] = user['email_address']
@@ -70,6 +1526,10 @@ def login():
         flash('Invalid email or password. Please try again.', 'error')
         return redirect(url_for('home'))
 
+def insert_student(conn, fullname, email, password_hash):
+    """Queued write adding a student; returns the new student_id"""
+    return conn.execute(INSERT_STUDENT_SQL, (fullname, email, password_hash)).lastrowid
+
 @app.route('/signup')
 def signup():
     return render_template('signup.html')
@@ -88,45 +1548,41 @@ def signup_post():
     if len(password) < 6:
         flash('Password must be at least 6 characters long.', 'error')
         return redirect(url_for('signup'))
-    
+
+    wait = login_ip_limiter.acquire(request.remote_addr)
+    if wait:
+        return auth_refused('signup.html', 'Too many attempts. Please wait a moment and try again.', 429, wait)
+
     conn = get_db_connection()
     
     # Check if user already exists
-    existing_user = conn.execute(
-        'SELECT * FROM Student WHERE email_address = ?', (email,)
-    ).fetchone()
+    existing_user = conn.execute(STUDENT_BY_EMAIL_SQL, (email,)).fetchone()
     
     if existing_user:
         flash('An account with this email already exists. Please login instead.', 'error')
         conn.close()
         return redirect(url_for('signup'))
     
+    conn.close()
+
     # Create new user
     try:
-        password_hash = generate_password_hash(password)
-        conn.execute(
-            'INSERT INTO Student (full_name, email_address, password_hash) VALUES (?, ?, ?)',
-            (fullname, email, password_hash)
-        )
-        conn.commit()
-        
-        # Get the new user's ID
-        new_user = conn.execute(
-            'SELECT * FROM Student WHERE email_address = ?', (email,)
-        ).fetchone()
+        password_hash = hash_password(password)
+        student_id = db_writer.run(insert_student, fullname, email, password_hash)
         
         # Log the user in automatically
-        session['user_id'] = new_user['student_id']
-        session['user_email'] = new_user['email_address']
-        session['user_fullname'] = new_user['full_name']
+        session['user_id'] = student_id
+        session['user_email'] = email
+        session['user_fullname'] = fullname
         
         flash(f'Account created successfully! Welcome, {fullname}!', 'success')
-        conn.close()
         return redirect(url_for('main'))
-        
+
+    except (HashPoolBusy, WriteQueueBusy):
+        return auth_refused('signup.html', 'The server is busy. Please try again in a few seconds.', 503, 2)
+
     except Exception as e:
         flash('An error occurred while creating your account. Please try again.', 'error')
-        conn.close()
         return redirect(url_for('signup'))
 
 @app.route('/logout')
@@ -144,14 +1600,14 @@ def main():
 @login_required
 def get_practicals():
     """Get all practicals from database"""
-    conn = get_db_connection()
-    practicals = conn.execute('SELECT * FROM Practical ORDER BY prac_number').fetchall()
-    conn.close()
-    
-    return jsonify([{
-        'prac_number': p['prac_number'],
-        'prac_name': p['prac_name']
-    } for p in practicals])
+    def load(conn):
+        practicals = conn.execute(PRACTICALS_SQL).fetchall()
+        return [{
+            'prac_number': p['prac_number'],
+            'prac_name': p['prac_name']
+        } for p in practicals]
+
+    return cached_json(('practicals',), load)
 
 @app.route('/api/practical/<int:prac_number>/components')
 @login_required
@@ -160,19 +1616,7 @@ def get_practical_components(prac_number):
     conn = get_db_connection()
     
     # Get practical components with details
-    components = conn.execute("""
-        SELECT 
-            pc.quantity,
-            c.component_id,
-            c.component_name,
-            pc.alt_component_id,
-            ac.alt_component_name
-        FROM Practical_component pc
-        JOIN Components c ON pc.component_id = c.component_id
-        LEFT JOIN Alt_components ac ON pc.alt_component_id = ac.alt_component_id
-        WHERE pc.practical_number = ?
-        ORDER BY c.component_name
-    """, (prac_number,)).fetchall()
+    components = conn.execute(PRACTICAL_COMPONENTS_SQL, (prac_number,)).fetchall()
     
     conn.close()
     
@@ -184,87 +1628,1067 @@ def get_practical_components(prac_number):
         'alt_component_name': comp['alt_component_name']
     } for comp in components])
 
+def offer_rows(conn, sql, params):
+    """Fetch rows as plain tuples for serialize_offer(), skipping sqlite3.Row"""
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    return cursor.execute(sql, params).fetchall()
+
+def serialize_offer(values):
+    """Supplier JSON used by the frontend, from OFFER_COLUMNS values (zip drops sort_price)"""
+    return dict(zip(OFFER_FIELDS, values))
+
+def load_offers(conn, part_type, part_id, filters):
+    """One filtered, sorted page of offers for a part; returns (offers, next_cursor)"""
+    sql, params = offers_sql(filters)
+    offers = [serialize_offer(row) for row in offer_rows(conn, sql, (part_type, part_id, *params))]
+    sort_field = 'quantity_in_stock' if filters['sort'] == '-stock' else 'price'
+    return split_page(offers, filters, lambda offer: [offer[sort_field], offer['supplier_id']])
+
 @app.route('/api/component/<int:component_id>/suppliers')
 @login_required
 def get_component_suppliers(component_id):
-    """Get suppliers and pricing for a specific component"""
-    conn = get_db_connection()
-    
-    suppliers = conn.execute("""
-        SELECT 
-            s.supplier_id,
-            s.supplier_name,
-            s.supplier_location,
-            sc.quantity_in_stock,
-            sc.price_component_per_supplier,
-            c.component_name
-        FROM Supplier_components sc
-        JOIN Supplier s ON sc.supplier_id = s.supplier_id
-        JOIN Components c ON sc.component_id = c.component_id
-        WHERE sc.component_id = ?
-        ORDER BY sc.price_component_per_supplier
-    """, (component_id,)).fetchall()
-    
-    conn.close()
-    
-    return jsonify([{
-        'supplier_id': sup['supplier_id'],
-        'supplier_name': sup['supplier_name'],
-        'supplier_location': sup['supplier_location'],
-        'quantity_in_stock': sup['quantity_in_stock'],
-        'price': float(sup['price_component_per_supplier']) if sup['price_component_per_supplier'] else 0,
-        'component_name': sup['component_name'],
-        'stock_status': 'In Stock' if sup['quantity_in_stock'] > 10 else f"{sup['quantity_in_stock']} left" if sup['quantity_in_stock'] > 0 else 'Out of Stock',
-        'stock_level': 'high' if sup['quantity_in_stock'] > 10 else 'low' if sup['quantity_in_stock'] > 0 else 'out'
-    } for sup in suppliers])
+    """Get suppliers and pricing for a specific component, filtered and sorted in SQL"""
+    try:
+        filters = parse_offer_filters(request.args)
+        columnar = wants_columnar(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return cached_json(('component_suppliers', component_id, *filters.values()),
+                       lambda conn: load_offers(conn, 'component', component_id, filters), paged=True,
+                       columnar=columnar_offers if columnar else None)
 
 @app.route('/api/alt-component/<int:alt_component_id>/suppliers')
 @login_required
 def get_alt_component_suppliers(alt_component_id):
-    """Get suppliers and pricing for alternative components"""
-    conn = get_db_connection()
-    
-    suppliers = conn.execute("""
-        SELECT 
-            s.supplier_id,
-            s.supplier_name,
-            s.supplier_location,
-            sac.alt_quantity_in_stock,
-            sac.alt_price_component_per_supplier,
-            ac.alt_component_name
-        FROM Supplier_alt_components sac
-        JOIN Supplier s ON sac.supplier_id = s.supplier_id
-        JOIN Alt_components ac ON sac.alt_component_id = ac.alt_component_id
-        WHERE sac.alt_component_id = ?
-        ORDER BY sac.alt_price_component_per_supplier
-    """, (alt_component_id,)).fetchall()
-    
-    conn.close()
-    
-    return jsonify([{
-        'supplier_id': sup['supplier_id'],
-        'supplier_name': sup['supplier_name'],
-        'supplier_location': sup['supplier_location'],
-        'quantity_in_stock': sup['alt_quantity_in_stock'],
-        'price': float(sup['alt_price_component_per_supplier']) if sup['alt_price_component_per_supplier'] else 0,
-        'component_name': sup['alt_component_name'],
-        'stock_status': 'In Stock' if sup['alt_quantity_in_stock'] > 10 else f"{sup['alt_quantity_in_stock']} left" if sup['alt_quantity_in_stock'] > 0 else 'Out of Stock',
-        'stock_level': 'high' if sup['alt_quantity_in_stock'] > 10 else 'low' if sup['alt_quantity_in_stock'] > 0 else 'out'
-    } for sup in suppliers])
+    """Get suppliers and pricing for alternative components, filtered and sorted in SQL"""
+    try:
+        filters = parse_offer_filters(request.args)
+        columnar = wants_columnar(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return cached_json(('alt_component_suppliers', alt_component_id, *filters.values()),
+                       lambda conn: load_offers(conn, 'alternative', alt_component_id, filters), paged=True,
+                       columnar=columnar_offers if columnar else None)
+
+# Columnar format (?format=columnar, or Accept: application/json; format=columnar).
+# Suppliers are sent once in a dictionary and offers refer to them by index;
+# offer fields are parallel arrays and stock levels are indexes into
+# stock_levels. stock_status is left out: it is 'In Stock' for 'high',
+# '<quantity_in_stock> left' for 'low' and 'Out of Stock' for 'out'.
+COLUMNAR_ACCEPT = re.compile(r'application/json\s*;[^,]*\bformat\s*=\s*"?columnar', re.IGNORECASE)
+STOCK_LEVELS = ('high', 'low', 'out')
+STOCK_LEVEL_CODES = {level: code for code, level in enumerate(STOCK_LEVELS)}
+
+def wants_columnar(args):
+    """True if the request asks for the columnar format, raising ValueError on an unknown format"""
+    fmt = args.get('format')
+    if fmt not in (None, '', 'rows', 'columnar'):
+        raise ValueError('format must be rows or columnar')
+    return fmt == 'columnar' or (not fmt and COLUMNAR_ACCEPT.search(request.headers.get('Accept', '')) is not None)
+
+class SupplierTable:
+    """The suppliers dictionary of a columnar response"""
+
+    def __init__(self):
+        self.positions = {}
+        self.columns = {'supplier_id': [], 'supplier_name': [], 'supplier_location': [], 'store_type': []}
+
+    def position(self, offer):
+        """Index of the offer's supplier, adding the supplier on first sight"""
+        position = self.positions.get(offer['supplier_id'])
+        if position is None:
+            position = self.positions[offer['supplier_id']] = len(self.positions)
+            for name, column in self.columns.items():
+                column.append(offer[name])
+        return position
+
+def new_offer_columns(*extra):
+    return {name: [] for name in (*extra, 'supplier', 'price', 'quantity_in_stock', 'stock_level')}
+
+def append_offer(columns, offer, suppliers):
+    columns['supplier'].append(suppliers.position(offer))
+    columns['price'].append(offer['price'])
+    columns['quantity_in_stock'].append(offer['quantity_in_stock'])
+    columns['stock_level'].append(STOCK_LEVEL_CODES[offer['stock_level']])
+
+def columnar_offers(offers):
+    """Columnar form of one part's offer list; the part name is sent once"""
+    suppliers = SupplierTable()
+    columns = new_offer_columns()
+    for offer in offers:
+        append_offer(columns, offer, suppliers)
+    return {
+        'format': 'columnar',
+        'component_name': offers[0]['component_name'] if offers else None,
+        'stock_levels': STOCK_LEVELS,
+        'suppliers': suppliers.columns,
+        'offers': columns
+    }
+
+def columnar_components(components, suppliers):
+    """One practical's catalog components as parallel arrays.
+
+    All their offers share one set of arrays; 'component' is the index of
+    the offer's component and 'alternative' is 1 for an offer of its
+    alternative part.
+    """
+    columns = {name: [] for name in ('component_id', 'component_name', 'quantity', 'alt_component_id',
+                                     'alt_component_name')}
+    offers = new_offer_columns('component', 'alternative')
+    for position, component in enumerate(components):
+        for name, column in columns.items():
+            column.append(component[name])
+        for alternative, offer_list in ((0, component['suppliers']), (1, component['alt_suppliers'])):
+            for offer in offer_list:
+                offers['component'].append(position)
+                offers['alternative'].append(alternative)
+                append_offer(offers, offer, suppliers)
+    columns['offers'] = offers
+    return columns
+
+def columnar_catalog(components):
+    """Columnar form of /api/practical/<n>/catalog"""
+    suppliers = SupplierTable()
+    columns = columnar_components(components, suppliers)
+    return {'format': 'columnar', 'stock_levels': STOCK_LEVELS, 'suppliers': suppliers.columns, 'components': columns}
+
+def columnar_practicals(catalog):
+    """Columnar form of /api/catalog, with one suppliers dictionary for every practical"""
+    suppliers = SupplierTable()
+    practicals = {number: columnar_components(components, suppliers) for number, components in catalog.items()}
+    return {'format': 'columnar', 'stock_levels': STOCK_LEVELS, 'suppliers': suppliers.columns,
+            'practicals': practicals}
+
+def split_page(rows, filters, cursor_values):
+    """Drop the look-ahead row of a keyset page and build the cursor for the next page"""
+    if not filters['limit'] or len(rows) <= filters['limit']:
+        return rows, None
+    rows = rows[:filters['limit']]
+    return rows, encode_cursor(cursor_values(rows[-1]))
+
+def load_catalog(conn, prac_numbers, filters=None):
+    """Load components, supplier offers and alternative offers for practicals in one query.
+
+    Returns (catalog, next_cursor); the cursor is only set when filters
+    ask for a limited page of components and more remain.
+    """
+    filters = filters or no_offer_filters()
+    sql, params = catalog_sql(len(prac_numbers), filters)
+    rows = offer_rows(conn, sql, (*prac_numbers, *params))
+
+    # A paged catalog only lists the practicals that appear on the page
+    catalog = {} if filters['limit'] else {prac_number: [] for prac_number in prac_numbers}
+    current = None
+    page_size = 0
+    next_cursor = None
+    for row in rows:
+        practical_number, quantity, component_id, component_name, alt_component_id, alt_component_name, \
+            is_alternative, supplier_id = row[:CATALOG_OFFER_START + 1]
+        key = (practical_number, component_id)
+        if current is None or current[0] != key:
+            if filters['limit'] and page_size == filters['limit']:
+                # Rows for the look-ahead component only mean there is another page
+                last = current[1]
+                next_cursor = encode_cursor([current[0][0], last['component_name'], last['component_id']])
+                break
+            page_size += 1
+            component = {
+                'component_id': component_id,
+                'component_name': component_name,
+                'quantity': quantity,
+                'alt_component_id': alt_component_id,
+                'alt_component_name': alt_component_name,
+                'suppliers': [],
+                'alt_suppliers': []
+            }
+            catalog.setdefault(practical_number, []).append(component)
+            current = (key, component)
+
+        # Components without any supplier still appear, with an empty offer list
+        if supplier_id is None:
+            continue
+        offers = current[1]['alt_suppliers' if is_alternative else 'suppliers']
+        offers.append(serialize_offer(row[CATALOG_OFFER_START:]))
+
+    return catalog, next_cursor
+
+@app.route('/api/practical/<int:prac_number>/catalog')
+@login_required
+def get_practical_catalog(prac_number):
+    """Get components with their supplier and alternative offers for one practical"""
+    try:
+        filters = parse_offer_filters(request.args, cursor_types=CATALOG_CURSOR_TYPES)
+        columnar = wants_columnar(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    def load(conn):
+        catalog, next_cursor = load_catalog(conn, [prac_number], filters)
+        return catalog.get(prac_number, []), next_cursor
+
+    return cached_json(('catalog', prac_number, *filters.values()), load, paged=True,
+                       columnar=columnar_catalog if columnar else None)
+
+@app.route('/api/catalog')
+@login_required
+def get_catalog():
+    """Get the catalog for several practicals at once, e.g. /api/catalog?practicals=1,2,3"""
+    requested = request.args.get('practicals', '')
+    try:
+        prac_numbers = sorted({int(p) for p in requested.split(',') if p.strip()})
+    except ValueError:
+        return jsonify({'error': 'practicals must be a comma separated list of numbers'}), 400
+    try:
+        filters = parse_offer_filters(request.args, cursor_types=CATALOG_CURSOR_TYPES)
+        columnar = wants_columnar(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    def load(conn):
+        numbers = prac_numbers
+        # Default to every practical when none are requested
+        if not numbers:
+            numbers = [p['prac_number'] for p in conn.execute(PRACTICAL_NUMBERS_SQL).fetchall()]
+
+        catalog, next_cursor = load_catalog(conn, numbers, filters) if numbers else ({}, None)
+        return {str(prac_number): components for prac_number, components in catalog.items()}, next_cursor
+
+    return cached_json(('catalog_many', tuple(prac_numbers), *filters.values()), load, paged=True,
+                       columnar=columnar_practicals if columnar else None)
+
+# Basket optimizer. An alternative only makes up the quantity that no
+# supplier has of the original component, so each part's split between the
+# two is fixed up front. Given a set of stores the cheapest way to buy a part
+# is then to fill each share from its cheapest offers first, and the search
+# is only over which stores to visit.
+BASKET_EXACT_EVALUATIONS = 5000  # Store subsets tried before settling for the heuristic
+
+def basket_parts(components):
+    """Turn catalog components into parts with their offers in fill order"""
+    parts = []
+    for component in components:
+        offers = []
+        shares = {}
+        remaining = component['quantity']
+        for part_type, part_id, part_offers in (
+                ('component', component['component_id'], component['suppliers']),
+                ('alternative', component['alt_component_id'], component['alt_suppliers'])):
+            in_stock = [o for o in part_offers if o['quantity_in_stock'] and o['quantity_in_stock'] > 0]
+            in_stock.sort(key=lambda o: (o['price'], o['supplier_id']))
+            offers.extend((o['supplier_id'], o['quantity_in_stock'], o['price'], part_type, part_id, o)
+                          for o in in_stock)
+            shares[part_type] = min(remaining, sum(o['quantity_in_stock'] for o in in_stock))
+            remaining -= shares[part_type]
+        parts.append({'component': component, 'offers': offers, 'shares': shares, 'shortfall': remaining})
+    return parts
+
+def fill_part(part, stores=None):
+    """Cheapest allocation of a part's quantity within stores (every store when None)
+
+    Returns (cost, quantity covered, allocations).
+    """
+    remaining = dict(part['shares'])
+    target = part['component']['quantity'] - part['shortfall']
+    cost = 0
+    covered = 0
+    allocations = []
+    for offer in part['offers']:
+        if covered == target:
+            break
+        if stores is not None and offer[0] not in stores:
+            continue
+        take = min(offer[1], remaining[offer[3]])
+        if take:
+            cost += take * offer[2]
+            covered += take
+            remaining[offer[3]] -= take
+            allocations.append((offer, take))
+    return cost, covered, allocations
+
+def fill_basket(parts, stores, required):
+    """Fill every part within stores; None if some part loses coverage"""
+    fills = []
+    for part, needed in zip(parts, required):
+        fill = fill_part(part, stores)
+        if fill[1] < needed:
+            return None
+        fills.append(fill)
+    return fills
+
+def basket_objective(fills, store_penalty):
+    """Cost of a basket plus the penalty for every store it visits"""
+    stores = {offer[0] for fill in fills for offer, _ in fill[2]}
+    return sum(fill[0] for fill in fills) + store_penalty * len(stores)
+
+def drop_stores(parts, fills, required, store_penalty):
+    """Greedily close the store whose removal saves the most until none saves anything
+
+    Closing a store only changes parts it sells, so only the stores those
+    parts are bought from need their saving worked out again.
+    """
+    stores = {offer[0] for fill in fills for offer, _ in fill[2]}
+    sellers = {}
+    for i, part in enumerate(parts):
+        for offer in part['offers']:
+            sellers.setdefault(offer[0], set()).add(i)
+
+    def closing(store):
+        """(saving lost, refilled parts) for closing store, or None if a part would run short"""
+        remaining = stores - {store}
+        delta = -store_penalty
+        refills = {}
+        for i in sellers[store]:
+            if not any(offer[0] == store for offer, _ in fills[i][2]):
+                continue
+            refill = fill_part(parts[i], remaining)
+            if refill[1] < required[i]:
+                return None
+            delta += refill[0] - fills[i][0]
+            refills[i] = refill
+        return delta, refills
+
+    closings = {store: closing(store) for store in stores}
+    while len(stores) > 1:
+        options = [(result[0], store) for store, result in closings.items() if result is not None]
+        if not options:
+            break
+        delta, store = min(options)
+        if delta >= 0:
+            break
+        stores.discard(store)
+        refills = closings.pop(store)[1]
+        affected = {offer[0] for i in sellers[store] for offer, _ in fills[i][2]}
+        for i, refill in refills.items():
+            fills[i] = refill
+        affected.update(offer[0] for i in sellers[store] for offer, _ in fills[i][2])
+        for other in affected & stores:
+            closings[other] = closing(other)
+    return fills
+
+def optimize_basket(components, store_penalty=0):
+    """Choose suppliers for a practical's components at minimum cost plus store penalty
+
+    Without a penalty every part is simply filled from its cheapest offers.
+    With one, the greedy store-closing result is improved by trying small
+    store sets in order of size while they can still beat it; the search is
+    exact when it finishes within BASKET_EXACT_EVALUATIONS subsets, and the
+    returned lower bound says how far off the answer can be when it does not.
+    """
+    parts = basket_parts(components)
+    fills = [fill_part(part) for part in parts]
+    required = [fill[1] for fill in fills]
+    min_cost = sum(fill[0] for fill in fills)
+    if not store_penalty or not any(required):
+        objective = basket_objective(fills, store_penalty)
+        return parts, fills, objective, objective, True
+
+    candidates = sorted({offer[0] for part in parts for offer in part['offers']})
+    fills = drop_stores(parts, fills, required, store_penalty)
+    objective = basket_objective(fills, store_penalty)
+
+    evaluations = 0
+    size = 1
+    exact = True
+    while size <= len(candidates) and min_cost + store_penalty * size < objective:
+        for stores in combinations(candidates, size):
+            evaluations += 1
+            if evaluations > BASKET_EXACT_EVALUATIONS:
+                exact = False
+                break
+            trial = fill_basket(parts, set(stores), required)
+            if trial is not None:
+                trial_objective = basket_objective(trial, store_penalty)
+                if trial_objective < objective:
+                    fills, objective = trial, trial_objective
+        if not exact:
+            break
+        size += 1
+
+    # Every store set smaller than `size` was tried, so no basket beats this
+    lower_bound = objective if exact else min(objective, min_cost + store_penalty * size)
+    return parts, fills, objective, lower_bound, exact
+
+@app.route('/api/practical/<int:prac_number>/optimal-basket')
+@login_required
+def get_optimal_basket(prac_number):
+    """Cheapest way to buy every component of a practical, e.g. ?store_penalty=50 to favour fewer stores"""
+    try:
+        store_penalty = float(request.args.get('store_penalty', 0))
+    except ValueError:
+        return jsonify({'error': 'store_penalty must be a number'}), 400
+    if not 0 <= store_penalty < float('inf'):
+        return jsonify({'error': 'store_penalty must be zero or more'}), 400
+
+    def load(conn):
+        catalog, _ = load_catalog(conn, [prac_number])
+        parts, fills, objective, lower_bound, exact = optimize_basket(catalog[prac_number], store_penalty)
+
+        stores = {}
+        items = []
+        for part, (cost, covered, allocations) in zip(parts, fills):
+            component = part['component']
+            lines = []
+            for (supplier_id, _, price, part_type, part_id, offer), quantity in allocations:
+                store = stores.setdefault(supplier_id, {
+                    'supplier_id': supplier_id,
+                    'supplier_name': offer['supplier_name'],
+                    'supplier_location': offer['supplier_location'],
+                    'store_type': offer['store_type'],
+                    'subtotal': 0
+                })
+                store['subtotal'] += quantity * price
+                lines.append({
+                    'supplier_id': supplier_id,
+                    'part_type': part_type,
+                    'part_id': part_id,
+                    'part_name': offer['component_name'],
+                    'quantity': quantity,
+                    'unit_price': price,
+                    'line_total': round(quantity * price, 2)
+                })
+            items.append({
+                'component_id': component['component_id'],
+                'component_name': component['component_name'],
+                'quantity': component['quantity'],
+                'allocations': lines,
+                'shortfall': component['quantity'] - covered
+            })
+
+        for store in stores.values():
+            store['subtotal'] = round(store['subtotal'], 2)
+        return {
+            'practical_number': prac_number,
+            'store_penalty': store_penalty,
+            'total_cost': round(sum(fill[0] for fill in fills), 2),
+            'store_count': len(stores),
+            'objective': round(objective, 2),
+            'lower_bound': round(lower_bound, 2),
+            'exact': exact,
+            'stores': sorted(stores.values(), key=lambda s: s['supplier_name']),
+            'items': items
+        }
+
+    return cached_json(('basket', prac_number, store_penalty), load)
+
+@app.route('/api/search')
+@login_required
+def search_parts():
+    """Type-ahead search over components and alternatives with each hit's cheapest in-stock offer"""
+    match = search_match_expression(request.args.get('q', ''))
+    try:
+        limit = int(request.args.get('limit', SEARCH_DEFAULT_LIMIT))
+    except ValueError:
+        return jsonify({'error': 'limit must be a whole number'}), 400
+    limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+
+    if not match:
+        return jsonify([])
+
+    def load(conn):
+        hits = conn.execute(SEARCH_SQL, (match, SEARCH_CANDIDATES, limit)).fetchall()
+        return [{
+            'part_type': 'component' if hit['search_id'] > 0 else 'alternative',
+            'part_id': abs(hit['search_id']),
+            'name': hit['part_name'],
+            'cheapest_offer': {
+                'supplier_id': hit['supplier_id'],
+                'supplier_name': hit['supplier_name'],
+                'supplier_location': hit['supplier_location'],
+                'store_type': hit['store_type'],
+                'quantity_in_stock': hit['quantity_in_stock'],
+                'price': float(hit['price']) if hit['price'] else 0
+            } if hit['supplier_id'] is not None else None
+        } for hit in hits]
+
+    return cached_json(('search', match, limit), load)
 
 @app.route('/api/suppliers')
 @login_required
 def get_suppliers():
     """Get all suppliers"""
+    def load(conn):
+        suppliers = conn.execute(SUPPLIERS_SQL).fetchall()
+        return [{
+            'supplier_id': s['supplier_id'],
+            'supplier_name': s['supplier_name'],
+            'supplier_location': s['supplier_location'],
+            'store_type': s['store_type']
+        } for s in suppliers]
+
+    return cached_json(('suppliers',), load)
+
+@app.route('/api/changes')
+@login_required
+def get_changes():
+    """Offers whose price or stock changed after version ?since=, oldest first.
+
+    Without since, only the current version is returned: read it before
+    loading the catalog, then poll with since=<version> and apply the changes.
+    Each offer appears at most once per response, with its current state;
+    keep polling with the returned version while has_more is set. reset means
+    the changes after since are no longer all logged (pruned, or the database
+    was recreated), so the catalog must be reloaded.
+    """
+    try:
+        since = int(request.args['since']) if 'since' in request.args else None
+        limit = int(request.args.get('limit', CHANGES_DEFAULT_LIMIT))
+    except ValueError:
+        return jsonify({'error': 'since and limit must be whole numbers'}), 400
+    if since is not None and since < 0:
+        return jsonify({'error': 'since must not be negative'}), 400
+    limit = max(1, min(limit, CHANGES_MAX_LIMIT))
+
+    def load(conn):
+        if since is None:
+            return {'version': conn.execute(CHANGE_LOG_RANGE_SQL).fetchone()['current'], 'has_more': False,
+                    'reset': False, 'changes': []}
+        version, has_more, reset, changes = read_changes(conn, since, limit)
+        return {'version': version, 'has_more': has_more, 'reset': reset, 'changes': changes}
+
+    return cached_json(('changes', since, limit), load)
+
+def read_changes(conn, since, limit):
+    """Offers changed after version since, oldest first, at most limit log rows.
+
+    Returns (version, has_more, reset, changes). Each offer appears once with
+    its current state; reset means the changes after since are no longer all
+    logged (pruned, or the database was recreated).
+    """
+    oldest, current = conn.execute(CHANGE_LOG_RANGE_SQL).fetchone()
+    # Versions never go backwards, and pruned ones can't be replayed
+    missed = since > current or oldest is not None and since < oldest - 1
+    if since >= current or missed:
+        return current, False, missed, []
+
+    # Later rows for the same offer carry the same current state, so only the last is kept
+    rows = offer_rows(conn, CHANGES_SQL, (since, limit))
+    latest = {(part_type, part_id, offer[0]): (version, part_type, part_id, deleted, offer)
+              for version, part_type, part_id, deleted, *offer in rows}
+    changes = []
+    for version, part_type, part_id, deleted, offer in sorted(latest.values()):
+        change = {'version': version, 'part_type': part_type, 'part_id': part_id, 'deleted': bool(deleted)}
+        change.update({'supplier_id': offer[0]} if deleted else serialize_offer(offer))
+        changes.append(change)
+    return rows[-1][0], rows[-1][0] < current, False, changes
+
+# Live stock and price updates for main.html over Server-Sent Events. One
+# notifier thread watches the change log for the whole process (a data_version
+# check per interval while nothing changes) and routes each batch of changes
+# to the streams showing a practical that uses the part. An idle stream costs
+# a blocked request thread and an empty deque, not a database poll of its own.
+SSE_POLL_INTERVAL = float(os.environ.get('SSE_POLL_INTERVAL', 1))  # Seconds between change log checks
+SSE_HEARTBEAT = 15  # Seconds between keep-alives, so proxies don't drop idle streams
+SSE_MAX_SUBSCRIBERS = int(os.environ.get('SSE_MAX_SUBSCRIBERS', 5000))  # Open streams per process; serve.py sets it below --threads
+SSE_MAX_CHANGES = 2000  # Log rows pushed in one go; past that, clients are told to reload
+SSE_QUEUE_LIMIT = 50  # Undelivered events per stream before it is told to reload instead
+SSE_RETRY_MS = 5000  # Browser reconnect delay after a dropped stream
+
+def sse_event(event, data, event_id=None):
+    """Format one Server-Sent Event"""
+    head = f'id: {event_id}\n' if event_id is not None else ''
+    return f'{head}event: {event}\ndata: {app.json.dumps(data)}\n\n'
+
+class StreamSubscriber:
+    """One open event stream: the practicals it shows (None for all) and its undelivered events"""
+
+    def __init__(self, practicals):
+        self.practicals = practicals
+        self.events = deque()
+        self.wakeup = threading.Event()
+
+    def push(self, event):
+        if len(self.events) >= SSE_QUEUE_LIMIT:
+            # A stream this far behind reloads rather than replaying its backlog
+            self.events.clear()
+            event = sse_event('reset', {})
+        self.events.append(event)
+        self.wakeup.set()
+
+class ChangeNotifier:
+    """Background thread that fans changes from Catalog_change out to every open stream"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.version = None  # Log version pushed to the streams so far
+        self.subscribers = set()
+        self.lock = threading.Lock()
+        self.conn = None  # The notifier's own connection, outside the pool
+        self.database = None
+        self.conn_lock = threading.Lock()  # Held while self.conn is in use
+        self.thread = None
+        self.stopped = threading.Event()
+        self.batches = 0
+        self.resets = 0
+        self.last_error = None
+
+    def start(self):
+        """Start watching on the first stream; the version is known once this returns"""
+        with self.conn_lock:
+            if self.database != db_pool.database:
+                self._open()
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='change-notifier', daemon=True)
+                self.thread.start()
+
+    def _open(self):
+        """Watch the pool's current database; call with conn_lock held.
+
+        The connection is the notifier's own: a pooled one would go back to
+        the pool with the request that opened it, and a writer sharing it
+        would commit without moving its data_version.
+        """
+        reopened = self.conn is not None
+        if reopened:
+            self.conn.close()
+        self.conn = db_pool.open()
+        self.database = db_pool.database
+        self.version = self.conn.execute(CHANGE_LOG_RANGE_SQL).fetchone()['current']
+        self.data_version = self.conn.execute('PRAGMA data_version').fetchone()[0]
+        if reopened:
+            # Streams of the old database have nothing to catch up from
+            with self.lock:
+                subscribers = list(self.subscribers)
+            for subscriber in subscribers:
+                subscriber.push(sse_event('reset', {}, self.version))
+
+    def subscribe(self, practicals):
+        """Register a stream; returns (subscriber, version) or None when at SSE_MAX_SUBSCRIBERS"""
+        self.start()
+        with self.lock:
+            if len(self.subscribers) >= SSE_MAX_SUBSCRIBERS:
+                return None
+            subscriber = StreamSubscriber(practicals)
+            self.subscribers.add(subscriber)
+            return subscriber, self.version
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.poll()
+                self.last_error = None
+            except sqlite3.Error as e:
+                # Most likely a locked database; the next interval retries
+                self.last_error = str(e)
+
+    def poll(self):
+        """Push the changes logged since the last poll, if any"""
+        with self.conn_lock:
+            if self.database != db_pool.database:
+                self._open()
+            else:
+                self._poll()
+
+    def _poll(self):
+        data_version = self.conn.execute('PRAGMA data_version').fetchone()[0]
+        if data_version == self.data_version:
+            return
+        self.data_version = data_version
+
+        with self.lock:
+            subscribers = list(self.subscribers)
+        if not subscribers:
+            self.version = self.conn.execute(CHANGE_LOG_RANGE_SQL).fetchone()['current']
+            return
+
+        version, has_more, reset, changes = read_changes(self.conn, self.version, SSE_MAX_CHANGES)
+        if reset or has_more:
+            # A bulk import or a recreated database: reloading beats streaming it
+            version = self.conn.execute(CHANGE_LOG_RANGE_SQL).fetchone()['current']
+            event = sse_event('reset', {}, version)
+            for subscriber in subscribers:
+                subscriber.push(event)
+            self.resets += 1
+        elif changes:
+            # Streams showing the same practicals share one encoded event
+            practicals = change_practicals(self.conn, changes)
+            encoded = {}
+            for subscriber in subscribers:
+                if subscriber.practicals not in encoded:
+                    encoded[subscriber.practicals] = offers_event(changes, practicals, subscriber.practicals, version)
+                if encoded[subscriber.practicals]:
+                    subscriber.push(encoded[subscriber.practicals])
+            self.batches += 1
+        # Pushed before the version moves on, so a keep-alive never skips past an undelivered event
+        self.version = version
+
+    def stats(self):
+        with self.lock:
+            return {'subscribers': len(self.subscribers), 'version': self.version, 'batches': self.batches,
+                    'resets': self.resets, 'last_error': self.last_error}
+
+change_notifier = ChangeNotifier(SSE_POLL_INTERVAL)
+
+def change_practicals(conn, changes):
+    """Map each changed (part_type, part_id) to the set of practicals that list it"""
+    ids = {'component': set(), 'alternative': set()}
+    for change in changes:
+        ids[change['part_type']].add(change['part_id'])
+    practicals = {}
+    for practical_number, part_type, part_id in conn.execute(CHANGE_PRACTICALS_SQL, (
+            json.dumps(list(ids['component'])), json.dumps(list(ids['alternative'])))).fetchall():
+        practicals.setdefault((part_type, part_id), set()).add(practical_number)
+    return practicals
+
+def offers_event(changes, practicals, shown, version):
+    """The 'offers' event for a stream showing practicals shown (None for all), or None if nothing applies"""
+    selected = [change for change in changes
+                if (change['part_type'], change['part_id']) in practicals
+                and (shown is None or practicals[change['part_type'], change['part_id']] & shown)]
+    return sse_event('offers', {'version': version, 'changes': selected}, version) if selected else None
+
+@app.route('/api/stream')
+@login_required
+def stream_changes():
+    """Server-Sent Events with price and stock changes for ?practicals=1,2 (default: all).
+
+    Pass ?since=<version> (from /api/changes, read before loading the
+    catalog) to also receive changes made since; reconnecting browsers send
+    Last-Event-ID, which takes precedence. 'offers' events carry changes in
+    the /api/changes format, and 'reset' means the catalog must be reloaded.
+    """
+    requested = request.args.get('practicals', '')
+    try:
+        shown = frozenset(int(p) for p in requested.split(',') if p.strip()) or None
+        since = request.headers.get('Last-Event-ID') or request.args.get('since')
+        since = int(since) if since else None
+    except ValueError:
+        return jsonify({'error': 'practicals must be a comma separated list of numbers, since a version'}), 400
+
+    subscription = change_notifier.subscribe(shown)
+    if subscription is None:
+        response = jsonify({'error': 'Too many open update streams, try again later'})
+        response.headers['Retry-After'] = str(math.ceil(SSE_HEARTBEAT))
+        return response, 503
+    subscriber, version = subscription
+
+    # Catch up from the client's version to where the live events begin. A
+    # version ahead of the notifier's is checked too: the database may have
+    # been recreated since.
+    replay = None
+    if since is not None and since != version:
+        conn = get_db_connection()
+        try:
+            last, has_more, reset, changes = read_changes(conn, since, SSE_MAX_CHANGES)
+            changes = [change for change in changes if change['version'] <= version]
+            if reset or has_more and last < version:
+                replay = sse_event('reset', {}, version)
+            elif changes:
+                replay = offers_event(changes, change_practicals(conn, changes), shown, version)
+        except BaseException:
+            change_notifier.unsubscribe(subscriber)
+            raise
+        finally:
+            conn.close()
+
+    def stream():
+        try:
+            yield f'retry: {SSE_RETRY_MS}\n\n'
+            if replay:
+                yield replay
+            while True:
+                if not subscriber.wakeup.wait(SSE_HEARTBEAT):
+                    # A bare id moves the browser's Last-Event-ID on without firing an event
+                    yield f'id: {change_notifier.version}\n\n'
+                    continue
+                subscriber.wakeup.clear()
+                while subscriber.events:
+                    yield subscriber.events.popleft()
+        finally:
+            # Runs when the server closes the response after the client goes away
+            change_notifier.unsubscribe(subscriber)
+
+    response = app.response_class(stream(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Don't let a proxy buffer the stream
+    return response
+
+@app.route('/api/stream/stats')
+@login_required
+def get_stream_stats():
+    """Open streams and notifier counters"""
+    return jsonify(change_notifier.stats())
+
+@app.route('/api/cache/stats')
+@login_required
+def get_cache_stats():
+    """Hit, miss and eviction counters for sizing the catalog cache"""
+    return jsonify(catalog_cache.stats())
+
+class OutOfStock(Exception):
+    """Raised when a reservation asks for more of an offer than is in stock"""
+
+    def __init__(self, part_type, part_id, supplier_id, requested, available):
+        super().__init__(f'Only {available} in stock for {part_type} {part_id} '
+                         f'at supplier {supplier_id} ({requested} requested)')
+        self.item = {'part_type': part_type, 'part_id': part_id, 'supplier_id': supplier_id, 'quantity': requested}
+        self.available = available
+
+def parse_reservation_items(items):
+    """Validate cart items, merging repeats of the same offer; raises ValueError on bad input
+
+    Returns a list of (part_type, part_id, supplier_id, quantity).
+    """
+    if not isinstance(items, list) or not items:
+        raise ValueError('items must be a non-empty list')
+
+    merged = {}
+    for item in items:
+        if not isinstance(item, dict) or item.get('part_type') not in RESERVE_STOCK_SQL:
+            raise ValueError("each item needs a part_type of 'component' or 'alternative'")
+        try:
+            key = (item['part_type'], int(item['part_id']), int(item['supplier_id']))
+            quantity = int(item.get('quantity', 1))
+        except (KeyError, TypeError, ValueError):
+            raise ValueError('each item needs whole number part_id, supplier_id and quantity')
+        if quantity < 1:
+            raise ValueError('quantity must be at least 1')
+        merged[key] = merged.get(key, 0) + quantity
+
+    for key, quantity in merged.items():
+        if quantity > RESERVATION_MAX_QUANTITY:
+            raise ValueError(f'at most {RESERVATION_MAX_QUANTITY} of one item can be reserved')
+    return [(*key, quantity) for key, quantity in merged.items()]
+
+def parse_practical_number(value):
+    """Optional practical number from a JSON body; raises ValueError if it is not a whole number"""
+    if value is not None and (isinstance(value, bool) or not isinstance(value, int)):
+        raise ValueError('practical_number must be a whole number')
+    return value
+
+def parse_idempotency_key(value):
+    """Optional Idempotency-Key header; raises ValueError if it is empty or too long"""
+    if value is not None and not 0 < len(value) <= IDEMPOTENCY_KEY_MAX_LENGTH:
+        raise ValueError(f'Idempotency-Key must be 1 to {IDEMPOTENCY_KEY_MAX_LENGTH} characters')
+    return value
+
+def reserve_items(conn, student_id, practical_number, items, idempotency_key=None):
+    """Queued write reserving every item together; returns (reservation id, whether it is new).
+
+    A request repeating an idempotency key the student already used gets
+    that reservation back, with nothing reserved again. Write transactions
+    run one at a time, in every worker, so two copies of a request cannot
+    both miss the lookup.
+    Raises OutOfStock, with nothing reserved, if any item is short.
+    """
+    if idempotency_key is not None:
+        existing = conn.execute(RESERVATION_BY_IDEMPOTENCY_KEY_SQL, (student_id, idempotency_key)).fetchone()
+        if existing is not None:
+            return existing['reservation_id'], False
+    reservation_id = conn.execute(INSERT_RESERVATION_SQL, (student_id, practical_number,
+                                                           f'+{RESERVATION_HOLD_DAYS} days',
+                                                           idempotency_key)).lastrowid
+    for part_type, part_id, supplier_id, quantity in items:
+        taken = conn.execute(RESERVE_STOCK_SQL[part_type], (quantity, part_id, supplier_id, quantity)).fetchall()
+        if not taken:
+            stock = conn.execute(STOCK_SQL[part_type], (part_id, supplier_id)).fetchone()
+            raise OutOfStock(part_type, part_id, supplier_id, quantity, stock[0] if stock else 0)
+        conn.execute(INSERT_RESERVATION_ITEM_SQL, (
+            reservation_id, supplier_id,
+            part_id if part_type == 'component' else None,
+            part_id if part_type == 'alternative' else None,
+            quantity, taken[0]['price']
+        ))
+    return reservation_id, True
+
+def release_reservations(conn, reservation_ids, status='released'):
+    """Queued write returning the stock of whichever of the reservations are still active and marking them status.
+
+    Returns the ids released. It is one short transaction (or part of one),
+    so callers keep the list small (the expiry sweeper works in batches).
+    """
+    released = [reservation_id for reservation_id in reservation_ids
+                if conn.execute(RELEASE_RESERVATION_SQL, (status, reservation_id)).rowcount]
+    for reservation_id in released:
+        for item in conn.execute(RESERVATION_ITEMS_BY_ID_SQL, (reservation_id,)).fetchall():
+            if item['component_id'] is not None:
+                conn.execute(RETURN_STOCK_SQL['component'],
+                             (item['quantity'], item['component_id'], item['supplier_id']))
+            else:
+                conn.execute(RETURN_STOCK_SQL['alternative'],
+                             (item['quantity'], item['alt_component_id'], item['supplier_id']))
+    return released
+
+# Reservation expiry. The sweeper releases expired reservations a batch at a
+# time, each batch its own short queued write with a pause in between,
+# so a large backlog never holds the write lock for long. Catalog reads are
+# unaffected either way: in WAL mode readers do not wait for writers.
+RESERVATION_SWEEP_INTERVAL = int(os.environ.get('RESERVATION_SWEEP_INTERVAL', 60))  # Seconds between sweeps
+RESERVATION_SWEEP_BATCH = 100  # Reservations released per write transaction
+RESERVATION_SWEEP_PAUSE = 0.05  # Seconds between batches, letting other writers in
+
+def sweep_expired_reservations(conn, batch_size=RESERVATION_SWEEP_BATCH, pause=RESERVATION_SWEEP_PAUSE):
+    """Release every expired reservation back to stock; returns how many were released"""
+    total = 0
+    while True:
+        expired = [row['reservation_id'] for row in conn.execute(EXPIRED_RESERVATIONS_SQL, (batch_size,)).fetchall()]
+        if not expired:
+            return total
+        released = db_writer.run(release_reservations, expired, 'expired')
+        if released:
+            catalog_cache.invalidate()
+        total += len(released)
+        if len(expired) < batch_size:
+            return total
+        time.sleep(pause)
+
+def prune_change_log(conn, keep=CHANGE_LOG_KEEP, batch_size=CHANGE_LOG_PRUNE_BATCH, pause=RESERVATION_SWEEP_PAUSE):
+    """Delete all but the newest keep changes, a batch at a time; returns how many were deleted"""
+    oldest, current = conn.execute(CHANGE_LOG_RANGE_SQL).fetchone()
+    cutoff = current - keep
+    total = 0
+    while oldest is not None and oldest <= cutoff:
+        upto = min(cutoff, oldest + batch_size - 1)
+        total += db_writer.run(write_statement, PRUNE_CHANGES_SQL, (upto,))
+        oldest = upto + 1
+        if oldest <= cutoff:
+            time.sleep(pause)
+    return total
+
+class ReservationSweeper:
+    """Daemon thread that runs sweep_expired_reservations() and prune_change_log() every interval seconds"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.thread = None
+        self.stopped = threading.Event()
+        self.sweeps = 0
+        self.released = 0
+        self.pruned = 0
+        self.last_error = None
+
+    def start(self):
+        """Start sweeping, once per process"""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name='reservation-sweeper', daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            conn = get_db_connection()
+            try:
+                self.released += sweep_expired_reservations(conn)
+                self.pruned += prune_change_log(conn)
+                self.sweeps += 1
+                self.last_error = None
+            except (sqlite3.Error, WriteQueueBusy) as e:
+                # Most likely the write lock stayed busy; the next sweep retries
+                self.last_error = str(e)
+            finally:
+                conn.close()
+
+reservation_sweeper = ReservationSweeper(RESERVATION_SWEEP_INTERVAL)
+
+@app.before_request
+def start_background_services():
+    """Start the sweeper in the process serving this request (a no-op once running).
+
+    Not done in create_app(): under a preloading server that runs in the
+    master, which only forks workers, and threads do not survive fork().
+    """
+    if app.config['BACKGROUND_SERVICES']:
+        reservation_sweeper.start()
+
+def reservations_json(rows):
+    """Group reservation item rows (newest reservation first) into reservation JSON"""
+    reservations = []
+    for row in rows:
+        if not reservations or reservations[-1]['reservation_id'] != row['reservation_id']:
+            reservations.append({
+                'reservation_id': row['reservation_id'],
+                'practical_number': row['practical_number'],
+                'status': row['status'],
+                'created_at': row['created_at'],
+                'total': 0,
+                'items': []
+            })
+        unit_price = float(row['unit_price']) if row['unit_price'] else 0
+        reservation = reservations[-1]
+        reservation['items'].append({
+            'part_type': 'component' if row['component_id'] is not None else 'alternative',
+            'part_id': row['component_id'] if row['component_id'] is not None else row['alt_component_id'],
+            'part_name': row['part_name'],
+            'supplier_id': row['supplier_id'],
+            'supplier_name': row['supplier_name'],
+            'quantity': row['quantity'],
+            'unit_price': unit_price
+        })
+        reservation['total'] = round(reservation['total'] + unit_price * row['quantity'], 2)
+    return reservations
+
+def create_reservation(student_id, practical_number, items, idempotency_key=None):
+    """Reserve parsed items for a student and build the API response: 201, or 200 for a repeated request"""
     conn = get_db_connection()
-    suppliers = conn.execute('SELECT * FROM Supplier ORDER BY supplier_name').fetchall()
+    try:
+        reservation_id, created = db_writer.run(reserve_items, student_id, practical_number, items, idempotency_key)
+        if created:
+            catalog_cache.invalidate()
+        reservation = reservations_json(conn.execute(RESERVATION_ITEMS_BY_ID_SQL, (reservation_id,)).fetchall())[0]
+    except OutOfStock as e:
+        return jsonify({'success': False, 'message': str(e), 'item': e.item, 'available': e.available}), 409
+    except (sqlite3.OperationalError, WriteQueueBusy) as e:
+        # Only a full write queue, or a writer stuck behind another process for the whole busy timeout
+        return jsonify({'success': False, 'message': f'Reservations are busy, please try again ({e})'}), 503
+    finally:
+        conn.close()
+    return jsonify({'success': True, 'reservation': reservation}), 201 if created else 200
+
+@app.route('/api/reservations', methods=['POST'])
+@login_required
+def post_reservation():
+    """Reserve a whole cart: {"practical_number": 1, "items": [{"part_type", "part_id", "supplier_id", "quantity"}]}
+
+    Send an Idempotency-Key header to make retries safe: a key already used
+    returns its reservation (200) instead of reserving again.
+    """
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({'success': False, 'message': 'Expected a JSON object'}), 400
+    try:
+        items = parse_reservation_items(data.get('items'))
+        practical_number = parse_practical_number(data.get('practical_number'))
+        idempotency_key = parse_idempotency_key(request.headers.get('Idempotency-Key'))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    return create_reservation(session['user_id'], practical_number, items, idempotency_key)
+
+@app.route('/api/reservations')
+@login_required
+def get_reservations():
+    """The logged in student's reservations, newest first"""
+    conn = get_db_connection()
+    rows = conn.execute(RESERVATION_ITEMS_BY_STUDENT_SQL, (session['user_id'],)).fetchall()
     conn.close()
-    
-    return jsonify([{
-        'supplier_id': s['supplier_id'],
-        'supplier_name': s['supplier_name'],
-        'supplier_location': s['supplier_location']
-    } for s in suppliers])
+    return jsonify(reservations_json(rows))
+
+@app.route('/api/reservations/<int:reservation_id>', methods=['DELETE'])
+@login_required
+def cancel_reservation(reservation_id):
+    """Cancel one of the student's reservations and return its stock"""
+    conn = get_db_connection()
+    try:
+        if conn.execute(RESERVATION_SQL, (reservation_id, session['user_id'])).fetchone() is None:
+            return jsonify({'success': False, 'message': 'Reservation not found'}), 404
+    finally:
+        conn.close()
+    try:
+        released = db_writer.run(release_reservations, [reservation_id])
+    except (sqlite3.OperationalError, WriteQueueBusy) as e:
+        return jsonify({'success': False, 'message': f'Reservations are busy, please try again ({e})'}), 503
+    if not released:
+        return jsonify({'success': False, 'message': 'Reservation was already released'}), 409
+    catalog_cache.invalidate()
+    return jsonify({'success': True})
 
 @app.route('/exit')
 @login_required
@@ -277,8 +2701,22 @@ def exit_page():
 @login_required
 def complete_practical():
     # Get cart data from request
-    data = request.get_json()
+    data = request.get_json(silent=True)
+    if data is not None and not isinstance(data, dict):
+        return jsonify({'success': False, 'message': 'Expected a JSON object'}), 400
     if data and 'cart' in data:
+        # Reserve the cart's stock before confirming it to the student
+        if data['cart']:
+            try:
+                items = parse_reservation_items(data['cart'])
+                practical_number = parse_practical_number(data.get('practical'))
+                idempotency_key = parse_idempotency_key(request.headers.get('Idempotency-Key'))
+            except ValueError as e:
+                return jsonify({'success': False, 'message': str(e)}), 400
+            response, status = create_reservation(session['user_id'], practical_number, items, idempotency_key)
+            if status not in (200, 201):
+                return response, status
+            session['reservation_id'] = response.get_json()['reservation']['reservation_id']
         session['cart_items'] = data['cart']
     
     return jsonify({'success': True, 'redirect': '/exit'})
@@ -288,703 +2726,694 @@ def complete_practical():
 def complete_redirect():
     return redirect(url_for('exit_page'))
 
+# Feedback is queued by the request and inserted by a background writer in
+# batches, each one queued write (see DatabaseWriter). Per-rating counts are maintained by
+# triggers on insert, so /api/feedback/stats reads five rows.
+FEEDBACK_BATCH_SIZE = 200  # Rows per queued insert
+FEEDBACK_FLUSH_INTERVAL = 1.0  # Seconds a submission may wait for its batch to fill
+FEEDBACK_QUEUE_SIZE = 10000  # Pending submissions before new ones are refused
+FEEDBACK_MAX_LENGTH = 5000  # Characters kept per comment
+
+class FeedbackWriter:
+    """Background thread that inserts queued feedback rows in batches.
+
+    A submission only costs the request a queue put. The writer commits what
+    has arrived once a batch is full or FEEDBACK_FLUSH_INTERVAL has passed
+    since the oldest waiting row, and flushes the rest when the process exits.
+    """
+
+    def __init__(self, batch_size, interval, maxsize):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.queue = queue.Queue(maxsize)
+        self.thread = None
+        self.start_lock = threading.Lock()
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0  # Rows given up on after their batch failed every attempt
+        self.refused = 0  # Rows turned away because the queue was full
+        self.last_error = None
+
+    def start(self):
+        """Start the writer thread, once per process"""
+        with self.start_lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='feedback-writer', daemon=True)
+                self.thread.start()
+                atexit.register(self.close)
+
+    def submit(self, row):
+        """Queue one (student_id, rating, feedback, created_at) row; False if the queue is full"""
+        self.start()
+        try:
+            self.queue.put_nowait(row)
+        except queue.Full:
+            self.refused += 1
+            return False
+        return True
+
+    def close(self, timeout=5):
+        """Write everything queued so far and stop the writer; the next submit starts a new one"""
+        with self.start_lock:
+            if self.thread is not None and self.thread.is_alive():
+                self.queue.put(None)
+                self.thread.join(timeout)
+            if self.thread is not None and not self.thread.is_alive():
+                self.thread = None
+
+    def _run(self):
+        while True:
+            row = self.queue.get()
+            batch = []
+            deadline = time.monotonic() + self.interval
+            while row is not None:
+                batch.append(row)
+                if len(batch) == self.batch_size:
+                    break
+                try:
+                    row = self.queue.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(batch)
+            if row is None:
+                return
+
+    def _write(self, batch):
+        for attempt in range(3):
+            try:
+                db_writer.run(insert_feedback, batch)
+                self.written += len(batch)
+                self.batches += 1
+                self.last_error = None
+                return
+            except (sqlite3.Error, WriteQueueBusy) as e:
+                self.last_error = str(e)
+                time.sleep(0.1 * (attempt + 1))
+        self.dropped += len(batch)
+        app.logger.error('Dropped %d feedback submissions after 3 attempts: %s', len(batch), self.last_error)
+
+def insert_feedback(conn, rows):
+    """Queued write inserting a batch of feedback rows"""
+    conn.executemany(INSERT_FEEDBACK_SQL, rows)
+
+feedback_writer = FeedbackWriter(FEEDBACK_BATCH_SIZE, FEEDBACK_FLUSH_INTERVAL, FEEDBACK_QUEUE_SIZE)
+
 @app.route('/submit_feedback', methods=['POST'])
 @login_required
 def submit_feedback():
-    try:
-        # Get data from request
-        data = request.get_json()
-        rating = data.get('rating', 0)
-        feedback = data.get('feedback', '')
-        
-        # Create customer_feedback directory if it doesn't exist
-        feedback_dir = os.path.join(os.path.dirname(__file__), 'customer_feedback')
-        os.makedirs(feedback_dir, exist_ok=True)
-        
-        # Generate filename with timestamp
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f'feedback_{timestamp}.txt'
-        filepath = os.path.join(feedback_dir, filename)
-        
-        # Write feedback to file
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(f"COMPONENT COMPASS - Customer Feedback\n")
-            f.write(f"================================\n\n")
-            f.write(f"Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write(f"User: {session.get('user_fullname', 'Unknown')} ({session.get('user_email', 'Unknown')})\n")
-            f.write(f"Rating: {rating}/5 stars\n")
-            f.write(f"Feedback:\n{feedback}\n\n")
-            f.write(f"---End of Feedback---\n")
-        
-        return jsonify({'success': True, 'message': 'Feedback saved successfully'})
-    
-    except Exception as e:
-        return jsonify({'success': False, 'message': f'Error saving feedback: {str(e)}'}), 500
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({'success': False, 'message': 'Expected a JSON object'}), 400
+    rating = data.get('rating')
+    feedback = data.get('feedback', '')
+    if isinstance(rating, bool) or not isinstance(rating, int) or not 1 <= rating <= 5:
+        return jsonify({'success': False, 'message': 'Rating must be a whole number from 1 to 5'}), 400
+    if not isinstance(feedback, str):
+        return jsonify({'success': False, 'message': 'Feedback must be text'}), 400
+
+    row = (session['user_id'], rating, feedback[:FEEDBACK_MAX_LENGTH], datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'))
+    if not feedback_writer.submit(row):
+        return jsonify({'success': False, 'message': 'Too much feedback is waiting to be saved, please try again shortly'}), 503
+    return jsonify({'success': True, 'message': 'Feedback saved successfully'})
+
+@app.route('/api/feedback/stats')
+@login_required
+def get_feedback_stats():
+    """Rating distribution and average, from the per-rating counts"""
+    conn = get_db_connection()
+    counts = {row['rating']: row['submissions'] for row in conn.execute(FEEDBACK_RATING_COUNTS_SQL).fetchall()}
+    conn.close()
+
+    total = sum(counts.values())
+    return jsonify({
+        'total': total,
+        'average': round(sum(rating * n for rating, n in counts.items()) / total, 2) if total else None,
+        'distribution': {str(rating): n for rating, n in counts.items()},
+        'pending': feedback_writer.queue.qsize(),
+        'written': feedback_writer.written,
+        'batches': feedback_writer.batches,
+        'dropped': feedback_writer.dropped
+    })
+
+# PDF export jobs. Rendering runs on a small worker pool, so a burst of
+# exports queues behind EXPORT_WORKERS renders instead of holding the request
+# threads the catalog API needs. Worker processes (the default) also keep
+# ReportLab off the GIL the request threads share.
+EXPORT_WORKERS = int(os.environ.get('EXPORT_WORKERS', 2))  # Concurrent renders
+EXPORT_QUEUE_LIMIT = int(os.environ.get('EXPORT_QUEUE_LIMIT', 32))  # Queued plus running jobs
+EXPORT_PROCESSES = os.environ.get('EXPORT_PROCESSES', '1') == '1'  # 0 renders on threads instead
+EXPORT_JOB_TTL = timedelta(hours=1)  # How long a finished job stays downloadable
+EXPORT_DIR = os.path.join(os.path.dirname(__file__), 'Reserved_components')
+
+EXPORT_SAVE_TO_DISK = os.environ.get('EXPORT_SAVE_TO_DISK', '1') == '1'  # Keep a copy in EXPORT_DIR
+
+def build_pdf_styles():
+    """The stylesheet, paragraph styles and table styles of a reservation PDF"""
+    styles = getSampleStyleSheet()
+
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=16,
+        spaceAfter=10,
+        alignment=0,  # Left alignment
+        textColor=colors.black
+    )
+
+    header_style = ParagraphStyle(
+        'CustomHeader',
+        parent=styles['Heading2'],
+        fontSize=14,
+        spaceAfter=12,
+        textColor=colors.black
+    )
+
+    good_luck_style = ParagraphStyle('GoodLuck', parent=styles['Normal'],
+                                         alignment=1, fontSize=12, textColor=colors.purple)
+
+    disclaimer_style = ParagraphStyle('Disclaimer', parent=styles['Normal'],
+                                          alignment=1, fontSize=10, textColor=colors.red, fontName='Helvetica-Oblique')
+
+    # Header with EE logo (purple background, white text) next to the title
+    header_table_style = TableStyle([
+        # Logo cell styling (purple background, white text)
+        ('BACKGROUND', (0, 0), (0, 0), HexColor('#8B5CF6')),
+        ('TEXTCOLOR', (0, 0), (0, 0), colors.white),
+        ('FONTNAME', (0, 0), (0, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (0, 0), 18),
+        ('ALIGN', (0, 0), (0, 0), 'CENTER'),
+        ('VALIGN', (0, 0), (0, 0), 'MIDDLE'),
+
+        # Title cell styling
+        ('ALIGN', (1, 0), (1, 0), 'LEFT'),
+        ('VALIGN', (1, 0), (1, 0), 'MIDDLE'),
+        ('LEFTPADDING', (1, 0), (1, 0), 15),
+
+        # Remove borders and add some styling
+        ('BOX', (0, 0), (0, 0), 2, HexColor('#8B5CF6')),
+        ('ROUNDEDCORNERS', (0, 0), (0, 0), [8, 8, 8, 8]),
+    ])
+
+    details_table_style = TableStyle([
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+    ])
+
+    components_table_style = TableStyle([
+        # Header row
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+
+        # Data rows
+        ('FONTNAME', (0, 1), (-1, -2), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, -2), 10),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -2), [colors.white, colors.white]),
+
+        # Total row
+        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, -1), (-1, -1), 12),
+        ('BACKGROUND', (0, -1), (-1, -1), colors.lightgrey),
+
+        # All borders
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ])
+
+    return (styles, title_style, header_style, good_luck_style, disclaimer_style,
+            header_table_style, details_table_style, components_table_style)
+
+# Styles and table templates never change between exports, so they are built
+# once here; only the flowables (which ReportLab lays out in place) are per export
+if REPORTLAB_AVAILABLE:
+    # PDFs are sent as binary downloads, so skip ASCII85-armouring every stream:
+    # ReportLab's pure Python encoder is a large share of render time
+    rl_config.useA85 = 0
+
+    (PDF_STYLES, PDF_TITLE_STYLE, PDF_HEADER_STYLE, PDF_GOOD_LUCK_STYLE, PDF_DISCLAIMER_STYLE,
+     PDF_HEADER_TABLE_STYLE, PDF_DETAILS_TABLE_STYLE, PDF_COMPONENTS_TABLE_STYLE) = build_pdf_styles()
+
+def render_reservation(components, student_name, student_email):
+    """Render a reservation in memory; returns (bytes, mimetype), plain text without ReportLab"""
+    # Generate dates
+    current_date = datetime.now().strftime('%B %d, %Y')
+    collection_date = (datetime.now() + timedelta(days=3)).strftime('%B %d, %Y')
+
+    # Calculate total cost
+    total_cost = sum(component.get('price', 0) for component in components)
+
+    if not REPORTLAB_AVAILABLE:
+        # Fallback: simple text document
+        lines = [
+            "ERS 220 Component Reservation",
+            "=" * 30,
+            "",
+            f"Student: {student_name}",
+            f"Email: {student_email}",
+            f"Date: {current_date}",
+            f"Collection Deadline: {collection_date}",
+            "",
+            "Components:",
+            "-" * 50
+        ]
+        for component in components:
+            lines.append(f"{component.get('name', '')} - {component.get('store', '')} - ${component.get('price', 0):.2f}")
+        lines.append("-" * 50)
+        lines.append(f"Total: ${total_cost:.2f}")
+        return ('\n'.join(lines) + '\n').encode('utf-8'), 'text/plain'
+
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter,
+                            rightMargin=72, leftMargin=72,
+                            topMargin=72, bottomMargin=18)
+
+    story = []
+
+    # Header with logo and title
+    header_data = [
+        [Paragraph('<para align="center" backColor="#8B5CF6" textColor="white" fontSize="18" fontName="Helvetica-Bold">EE</para>', PDF_STYLES['Normal']),
+         Paragraph('ERS 220<br/>Component Reservation', PDF_TITLE_STYLE)]
+    ]
+    story.append(Table(header_data, colWidths=[0.8*inch, 4*inch], style=PDF_HEADER_TABLE_STYLE))
+    story.append(Spacer(1, 30))
+
+    # Header
+    story.append(Paragraph('COMPONENT COMPASS', PDF_TITLE_STYLE))
+    story.append(Paragraph('Reservations', PDF_TITLE_STYLE))
+    story.append(Spacer(1, 20))
+
+    # Student details table
+    details_data = [
+        ['Student:', student_name],
+        ['Email:', student_email],
+        ['Reservation Date:', current_date],
+        ['Collection Deadline:', collection_date]
+    ]
+    story.append(Table(details_data, colWidths=[2*inch, 3*inch], style=PDF_DETAILS_TABLE_STYLE))
+    story.append(Spacer(1, 20))
+
+    # Collection instructions
+    story.append(Paragraph('Collection Instructions', PDF_HEADER_STYLE))
+    story.append(Paragraph(
+        'Please collect your reserved components within 3 days from the respective stores. '
+        'Bring this reservation confirmation and your student ID.',
+        PDF_STYLES['Normal']
+    ))
+    story.append(Spacer(1, 20))
+
+    # Components table
+    story.append(Paragraph('Reserved Components', PDF_HEADER_STYLE))
+
+    table_data = [['Component Name', 'Store', 'Price']]
+    for component in components:
+        table_data.append([
+            component.get('name', ''),
+            component.get('store', ''),
+            f"${component.get('price', 0):.2f}"
+        ])
+    table_data.append(['', 'Total Cost:', f'${total_cost:.2f}'])
+
+    story.append(Table(table_data, colWidths=[3*inch, 2*inch, 1*inch], style=PDF_COMPONENTS_TABLE_STYLE))
+    story.append(Spacer(1, 30))
+
+    # Good luck message
+    story.append(Paragraph(
+        'Good luck with your practical! We\'re excited to see what you\'ll build with these components.',
+        PDF_GOOD_LUCK_STYLE
+    ))
+    story.append(Spacer(1, 20))
+
+    # Disclaimer
+    story.append(Paragraph(
+        'Note: Components are reserved for 3 days only. Uncollected items will be released back to general stock.',
+        PDF_DISCLAIMER_STYLE
+    ))
+
+    doc.build(story)
+    return buffer.getvalue(), 'application/pdf'
+
+def export_reservation(filename, components, student_name, student_email, save_to_disk):
+    """Render a reservation and optionally keep a copy in EXPORT_DIR; returns (filename, bytes, mimetype, render seconds)"""
+    start = time.perf_counter()
+    data, mimetype = render_reservation(components, student_name, student_email)
+    render_seconds = time.perf_counter() - start
+    if mimetype != 'application/pdf':
+        filename = filename.replace('.pdf', '.txt')
+    if save_to_disk:
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        with open(os.path.join(EXPORT_DIR, filename), 'wb') as f:
+            f.write(data)
+    return filename, data, mimetype, render_seconds
+
+class ExportJobs:
+    """Bounded queue of reservation exports rendered on a worker pool.
+
+    Jobs past the queue limit are refused rather than queued, so a burst
+    of exports gets a quick "try again" instead of an ever longer wait.
+    Finished documents are kept in memory until the job expires.
+    """
+
+    def __init__(self, workers, limit, processes=True):
+        self.workers = workers
+        self.processes = processes
+        # Created on the first export, so each preforked server worker gets its
+        # own pool instead of sharing one inherited from the master's import
+        self.executor = None
+        self.limit = limit
+        self.jobs = {}
+        self.pending = 0  # Queued or running
+        self.lock = threading.Lock()
+
+    def submit(self, student_id, components, student_name, student_email):
+        """Queue a render and return its job, or None when the queue is full"""
+        now = datetime.now()
+        with self.lock:
+            self._prune(now)
+            if self.pending >= self.limit:
+                return None
+            self.pending += 1
+            job_id = uuid.uuid4().hex
+            job = {
+                'job_id': job_id,
+                'student_id': student_id,
+                'status': 'queued',
+                'filename': f"reservation_{now.strftime('%Y%m%d_%H%M%S')}_{job_id[:8]}.pdf",
+                'data': None,
+                'mimetype': None,
+                'error': None,
+                'finished_at': None,
+                'queued_at': time.perf_counter()
+            }
+            self.jobs[job_id] = job
+
+        try:
+            with self.lock:
+                if self.executor is None:
+                    if self.processes:
+                        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+                    else:
+                        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='pdf-export')
+            future = self.executor.submit(export_reservation, job['filename'], components,
+                                          student_name, student_email, EXPORT_SAVE_TO_DISK)
+        except Exception as e:
+            future = Future()
+            future.set_exception(e)
+        job['future'] = future
+        future.add_done_callback(lambda done: self._finish(job, done))
+        return job
+
+    def _finish(self, job, future):
+        with self.lock:
+            try:
+                job['filename'], job['data'], job['mimetype'], render_seconds = future.result()
+                job['status'] = 'done'
+                metrics.record_pdf(render_seconds, time.perf_counter() - job['queued_at'])
+            except Exception as e:
+                job['error'] = str(e)
+                job['status'] = 'failed'
+            job['finished_at'] = datetime.now()
+            self.pending -= 1
+
+    def _prune(self, now):
+        """Forget finished jobs older than EXPORT_JOB_TTL; saved copies stay on disk"""
+        expired = [job_id for job_id, job in self.jobs.items()
+                   if job['finished_at'] and now - job['finished_at'] > EXPORT_JOB_TTL]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+    def get(self, job_id, student_id):
+        """Look up a job, only for the student who queued it"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if not job or job['student_id'] != student_id:
+                return None
+            if job['status'] == 'queued' and job['future'].running():
+                job['status'] = 'running'
+            return job
+
+export_jobs = ExportJobs(EXPORT_WORKERS, EXPORT_QUEUE_LIMIT, EXPORT_PROCESSES)
+EXPORT_STREAM_TIMEOUT = 30  # Seconds ?stream=1 waits before falling back to polling
+
+def export_job_json(job):
+    """Job status as returned by the export endpoints"""
+    return {
+        'job_id': job['job_id'],
+        'status': job['status'],
+        'filename': job['filename'],
+        'error': job['error'],
+        'status_url': url_for('export_status', job_id=job['job_id']),
+        'download_url': url_for('export_download', job_id=job['job_id'])
+    }
+
+def parse_export_components(components):
+    """Validate the components of an export; raises ValueError on bad input.
+
+    Checked here rather than in the render, where a bad entry would only
+    surface later as a failed job.
+    """
+    if not isinstance(components, list):
+        raise ValueError('components must be a list')
+    for component in components:
+        if not isinstance(component, dict) or not isinstance(component.get('name'), str):
+            raise ValueError('each component needs a name')
+        price = component.get('price')
+        if isinstance(price, bool) or not isinstance(price, (int, float)):
+            raise ValueError('each component needs a numeric price')
+        if not isinstance(component.get('store', ''), str):
+            raise ValueError('store must be text')
+    return components
 
 @app.route('/export_pdf', methods=['POST'])
 @login_required
 def export_pdf():
+    """Queue a reservation PDF; poll status_url until it is done, then fetch download_url.
+
+    With ?stream=1 the request waits for the render and returns the PDF itself.
+    """
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({'success': False, 'message': 'Expected a JSON object'}), 400
     try:
-        # Get data from request
-        data = request.get_json()
-        components = data.get('components', [])
-        student_email = session.get('user_email', 'student@example.com')
-        
-        # Create Reserved_components directory if it doesn't exist
-        pdf_dir = os.path.join(os.path.dirname(__file__), 'Reserved_components')
-        os.makedirs(pdf_dir, exist_ok=True)
-        
-        # Generate filename with timestamp
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f'reservation_{timestamp}.pdf'
-        filepath = os.path.join(pdf_dir, filename)
-        
-        # Generate dates
-        current_date = datetime.now().strftime('%B %d, %Y')
-        collection_date = (datetime.now() + timedelta(days=3)).strftime('%B %d, %Y')
-        
-        # Calculate total cost
-        total_cost = sum(component.get('price', 0) for component in components)
-        
-        if REPORTLAB_AVAILABLE:
-            # Create PDF using ReportLab
-            doc = SimpleDocTemplate(filepath, pagesize=letter, 
-                                  rightMargin=72, leftMargin=72, 
-                                  topMargin=72, bottomMargin=18)
-            
-            story = []
-            styles = getSampleStyleSheet()
-            
-            # Custom styles
-            title_style = ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Heading1'],
-                fontSize=16,
-                spaceAfter=10,
-                alignment=0,  # Left alignment
-                textColor=colors.black
-            )
-            
-            header_style = ParagraphStyle(
-                'CustomHeader',
-                parent=styles['Heading2'],
-                fontSize=14,
-                spaceAfter=12,
-                textColor=colors.black
-            )
-
-            # Enhanced Header with EE Logo styling
-            from reportlab.platypus import KeepTogether
-            from reportlab.lib.colors import HexColor
-            
-            # Create a table for the header with logo and title
-            header_data = [
-                [Paragraph('<para align="center" backColor="#8B5CF6" textColor="white" fontSize="18" fontName="Helvetica-Bold">EE</para>', styles['Normal']), 
-                 Paragraph('ERS 220<br/>Component Reservation', title_style)]
-            ]
-            
-            header_table = Table(header_data, colWidths=[0.8*inch, 4*inch])
-            header_table.setStyle(TableStyle([
-                # Logo cell styling (purple background, white text)
-                ('BACKGROUND', (0, 0), (0, 0), HexColor('#8B5CF6')),
-                ('TEXTCOLOR', (0, 0), (0, 0), colors.white),
-                ('FONTNAME', (0, 0), (0, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (0, 0), 18),
-                ('ALIGN', (0, 0), (0, 0), 'CENTER'),
-                ('VALIGN', (0, 0), (0, 0), 'MIDDLE'),
-                
-                # Title cell styling
-                ('ALIGN', (1, 0), (1, 0), 'LEFT'),
-                ('VALIGN', (1, 0), (1, 0), 'MIDDLE'),
-                ('LEFTPADDING', (1, 0), (1, 0), 15),
-                
-                # Remove borders and add some styling
-                ('BOX', (0, 0), (0, 0), 2, HexColor('#8B5CF6')),
-                ('ROUNDEDCORNERS', (0, 0), (0, 0), [8, 8, 8, 8]),
-            ]))
-            
-            story.append(header_table)
-            story.append(Spacer(1, 30))
-            
-            # Header
-            story.append(Paragraph('COMPONENT COMPASS', title_style))
-            story.append(Paragraph('Reservations', title_style))
-            story.append(Spacer(1, 20))
-            
-            # Student details table
-            details_data = [
-                ['Student:', session.get('user_fullname', 'Unknown')],
-                ['Email:', student_email],
-                ['Reservation Date:', current_date],
-                ['Collection Deadline:', collection_date]
-            ]
-            
-            details_table = Table(details_data, colWidths=[2*inch, 3*inch])
-            details_table.setStyle(TableStyle([
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-            ]))
-            
-            story.append(details_table)
-            story.append(Spacer(1, 20))
-            
-            # Collection instructions
-            story.append(Paragraph('Collection Instructions', header_style))
-            story.append(Paragraph(
-                'Please collect your reserved components within 3 days from the respective stores. '
-                'Bring this reservation confirmation and your student ID.',
-                styles['Normal']
-            ))
-            story.append(Spacer(1, 20))
-            
-            # Components table
-            story.append(Paragraph('Reserved Components', header_style))
-            
-            # Table data
-            table_data = [['Component Name', 'Store', 'Price']]
-            
-            for component in components:
-                table_data.append([
-                    component.get('name', ''),
-                    component.get('store', ''),
-                    f"${component.get('price', 0):.2f}"
-                ])
-            
-            # Add total row
-            table_data.append(['', 'Total Cost:', f'${total_cost:.2f}'])
-            
-            # Create table
-            components_table = Table(table_data, colWidths=[3*inch, 2*inch, 1*inch])
-            components_table.setStyle(TableStyle([
-                # Header row
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 12),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                
-                # Data rows
-                ('FONTNAME', (0, 1), (-1, -2), 'Helvetica'),
-                ('FONTSIZE', (0, 1), (-1, -2), 10),
-                ('ROWBACKGROUNDS', (0, 1), (-1, -2), [colors.white, colors.white]),
-                
-                # Total row
-                ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, -1), (-1, -1), 12),
-                ('BACKGROUND', (0, -1), (-1, -1), colors.lightgrey),
-                
-                # All borders
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
-            
-            story.append(components_table)
-            story.append(Spacer(1, 30))
-            
-            # Good luck message
-            story.append(Paragraph(
-                'Good luck with your practical! We\'re excited to see what you\'ll build with these components.',
-                ParagraphStyle('GoodLuck', parent=styles['Normal'], 
-                             alignment=1, fontSize=12, textColor=colors.purple)
-            ))
-            story.append(Spacer(1, 20))
-            
-            # Disclaimer
-            story.append(Paragraph(
-                'Note: Components are reserved for 3 days only. Uncollected items will be released back to general stock.',
-                ParagraphStyle('Disclaimer', parent=styles['Normal'], 
-                             alignment=1, fontSize=10, textColor=colors.red, fontName='Helvetica-Oblique')
-            ))
-            
-            # Build PDF
-            doc.build(story)
-            
-        else:
-            # Fallback: Create simple text file
-            with open(filepath.replace('.pdf', '.txt'), 'w', encoding='utf-8') as f:
-                f.write("ERS 220 Component Reservation\n")
-                f.write("=" * 30 + "\n\n")
-                f.write(f"Student: {session.get('user_fullname', 'Unknown')}\n")
-                f.write(f"Email: {student_email}\n")
-                f.write(f"Date: {current_date}\n")
-                f.write(f"Collection Deadline: {collection_date}\n\n")
-                f.write("Components:\n")
-                f.write("-" * 50 + "\n")
-                for component in components:
-                    f.write(f"{component.get('name', '')} - {component.get('store', '')} - ${component.get('price', 0):.2f}\n")
-                f.write("-" * 50 + "\n")
-                f.write(f"Total: ${total_cost:.2f}\n")
-        
-        return jsonify({
-            'success': True, 
-            'message': f'PDF exported successfully! {"PDF" if REPORTLAB_AVAILABLE else "Text"} file created.',
-            'filename': filename
-        })
-        
-    except Exception as e:
-        return jsonify({'success': False, 'message': f'Error creating PDF: {str(e)}'}), 500
+        components = parse_export_components(data.get('components', []))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
 
-if __name__ == '__main__':
-    # Initialize database on startup
-    if not init_db():
-        print("\nDatabase not found. Creating database...")
-        # Run the database initialization script
+    job = export_jobs.submit(session['user_id'], components,
+                             session.get('user_fullname', 'Unknown'),
+                             session.get('user_email', 'student@example.com'))
+    if job is None:
+        response = jsonify({'success': False, 'message': 'Too many PDF exports in progress, please try again shortly'})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+
+    if request.args.get('stream') == '1':
         try:
-            import subprocess
-            import sys
-            result = subprocess.run([sys.executable, 'init_db.py'], 
-                                  capture_output=True, text=True)
-            if result.returncode == 0:
-                print("Database initialized successfully!")
-            else:
-                print("Database initialization failed:", result.stderr)
+            filename, pdf, mimetype, _ = job['future'].result(timeout=EXPORT_STREAM_TIMEOUT)
+        except FutureTimeoutError:
+            return jsonify({'success': True, **export_job_json(job)}), 202
         except Exception as e:
-            print(f"Error initializing database: {e}")
-    
-    app.run(debug=True)
+            return jsonify({'success': False, 'message': f'Error creating PDF: {str(e)}'}), 500
+        return send_file(BytesIO(pdf), mimetype=mimetype, as_attachment=True, download_name=filename)
+    return jsonify({'success': True, **export_job_json(job)}), 202
 
-@app.route('/exit')
-def exit_page():
-    user_email = session.get('user_email', 'student@example.com')
-    cart_items = session.get('cart_items', [])
-    return render_template('exit.html', user_email=user_email, cart_items=cart_items)
+@app.route('/export_pdf/<job_id>')
+@login_required
+def export_status(job_id):
+    """Status of a queued PDF export"""
+    job = export_jobs.get(job_id, session['user_id'])
+    if job is None:
+        return jsonify({'success': False, 'message': 'Export not found'}), 404
+    return jsonify({'success': True, **export_job_json(job)})
 
-@app.route('/complete_practical', methods=['POST'])
-def complete_practical():
-    # Get cart data from request
-    data = request.get_json()
-    if data and 'cart' in data:
-        session['cart_items'] = data['cart']
-    
-    return jsonify({'success': True, 'redirect': '/exit'})
+@app.route('/export_pdf/<job_id>/download')
+@login_required
+def export_download(job_id):
+    """Download a finished PDF export"""
+    job = export_jobs.get(job_id, session['user_id'])
+    if job is None:
+        return jsonify({'success': False, 'message': 'Export not found'}), 404
+    if job['status'] != 'done':
+        return jsonify({'success': False, **export_job_json(job)}), 409
+    return send_file(BytesIO(job['data']), mimetype=job['mimetype'], as_attachment=True,
+                     download_name=job['filename'])
 
-@app.route('/complete_redirect')
-def complete_redirect():
-    return redirect(url_for('exit_page'))
+def prometheus_histogram(lines, name, buckets, histogram, labels=''):
+    """Append a histogram's cumulative buckets, sum and count"""
+    cumulative = 0
+    for le, count in zip([*buckets, '+Inf'], histogram):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{labels}{"," if labels else ""}le="{le}"}} {cumulative}')
+    suffix = f'{{{labels}}}' if labels else ''
+    lines.append(f'{name}_sum{suffix} {histogram[-1]}')
+    lines.append(f'{name}_count{suffix} {cumulative}')
 
-@app.route('/submit_feedback', methods=['POST'])
-def submit_feedback():
-    try:
-        # Get data from request
-        data = request.get_json()
-        rating = data.get('rating', 0)
-        feedback = data.get('feedback', '')
-        
-        # Create customer_feedback directory if it doesn't exist
-        feedback_dir = os.path.join(os.path.dirname(__file__), 'customer_feedback')
-        os.makedirs(feedback_dir, exist_ok=True)
-        
-        # Generate filename with timestamp
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f'feedback_{timestamp}.txt'
-        filepath = os.path.join(feedback_dir, filename)
-        
-        # Write feedback to file
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(f"COMPONENT COMPASS - Customer Feedback\n")
-            f.write(f"================================\n\n")
-            f.write(f"Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write(f"Rating: {rating}/5 stars\n")
-            f.write(f"Feedback:\n{feedback}\n\n")
-            f.write(f"---End of Feedback---\n")
-        
-        return jsonify({'success': True, 'message': 'Feedback saved successfully'})
-    
-    except Exception as e:
-        return jsonify({'success': False, 'message': f'Error saving feedback: {str(e)}'}), 500
+@app.route('/metrics')
+def prometheus_metrics():
+    """Request, SQL, PDF export and write queue metrics in Prometheus text format"""
+    total = metrics.snapshot()
+    lines = []
 
-@app.route('/export_pdf', methods=['POST'])
-def export_pdf():
+    def header(name, kind, help_text):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+
+    header('app_requests_total', 'counter', 'Requests handled, by endpoint, method and status code.')
+    for (endpoint, method, status), count in sorted(total.requests.items()):
+        lines.append(f'app_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {count}')
+
+    header('app_request_duration_seconds', 'histogram', 'Time to build the response, by endpoint.')
+    for endpoint, histogram in sorted(total.latency.items()):
+        prometheus_histogram(lines, 'app_request_duration_seconds', METRICS_LATENCY_BUCKETS, histogram,
+                             f'endpoint="{endpoint}"')
+
+    header('app_requests_in_flight', 'gauge', 'Requests being handled, by endpoint.')
+    for endpoint, count in sorted(total.in_flight.items()):
+        lines.append(f'app_requests_in_flight{{endpoint="{endpoint}"}} {count}')
+
+    header('app_sql_statements_total', 'counter', 'SQL statements executed by requests, by endpoint.')
+    for endpoint, (statements, _) in sorted(total.sql.items()):
+        lines.append(f'app_sql_statements_total{{endpoint="{endpoint}"}} {statements}')
+
+    header('app_sql_seconds_total', 'counter', 'Time spent executing SQL statements for requests, by endpoint.')
+    for endpoint, (_, seconds) in sorted(total.sql.items()):
+        lines.append(f'app_sql_seconds_total{{endpoint="{endpoint}"}} {seconds}')
+
+    header('app_request_sql_statements', 'histogram', 'SQL statements per request, by endpoint.')
+    for endpoint, histogram in sorted(total.sql_per_request.items()):
+        prometheus_histogram(lines, 'app_request_sql_statements', METRICS_SQL_BUCKETS, histogram,
+                             f'endpoint="{endpoint}"')
+
+    header('app_pdf_render_seconds', 'histogram', 'Time to render one reservation document.')
+    prometheus_histogram(lines, 'app_pdf_render_seconds', METRICS_PDF_BUCKETS, total.pdf_render)
+
+    header('app_pdf_export_seconds', 'histogram', 'Time from queueing an export to its document being ready.')
+    prometheus_histogram(lines, 'app_pdf_export_seconds', METRICS_PDF_BUCKETS, total.pdf_export)
+
+    header('app_export_queue_depth', 'gauge', 'PDF exports queued or rendering.')
+    lines.append(f'app_export_queue_depth {export_jobs.pending}')
+
+    header('app_db_write_queue_depth', 'gauge', 'Database writes waiting for the writer thread.')
+    lines.append(f'app_db_write_queue_depth {db_writer.queue.qsize()}')
+
+    header('app_db_write_batch_size', 'histogram', 'Writes committed together in one transaction.')
+    prometheus_histogram(lines, 'app_db_write_batch_size', METRICS_WRITE_BATCH_BUCKETS, db_writer.batch_sizes)
+
+    header('app_db_write_wait_seconds', 'histogram', 'Time from queueing a write to its transaction committing.')
+    prometheus_histogram(lines, 'app_db_write_wait_seconds', METRICS_LATENCY_BUCKETS, db_writer.wait)
+
+    header('app_db_writes_total', 'counter', 'Queued database writes, by outcome.')
+    lines.append(f'app_db_writes_total{{outcome="committed"}} {db_writer.committed}')
+    lines.append(f'app_db_writes_total{{outcome="failed"}} {db_writer.failed}')
+    lines.append(f'app_db_writes_total{{outcome="refused"}} {db_writer.refused}')
+
+    header('app_feedback_queue_depth', 'gauge', 'Feedback submissions waiting for their batch.')
+    lines.append(f'app_feedback_queue_depth {feedback_writer.queue.qsize()}')
+
+    header('app_feedback_submissions_total', 'counter', 'Feedback submissions, by outcome.')
+    lines.append(f'app_feedback_submissions_total{{outcome="written"}} {feedback_writer.written}')
+    lines.append(f'app_feedback_submissions_total{{outcome="dropped"}} {feedback_writer.dropped}')
+    lines.append(f'app_feedback_submissions_total{{outcome="refused"}} {feedback_writer.refused}')
+
+    return '\n'.join(lines) + '\n', 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+# Admin endpoints are disabled unless IMPORT_TOKEN is set; callers send it as a bearer token
+IMPORT_TOKEN = os.environ.get('IMPORT_TOKEN')
+
+def admin_token_error(feature):
+    """Error response unless the request carries the admin token, else None"""
+    if not IMPORT_TOKEN:
+        return jsonify({'success': False, 'message': f'{feature} is disabled'}), 404
+    if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {IMPORT_TOKEN}'):
+        return jsonify({'success': False, 'message': 'Invalid import token'}), 401
+    return None
+
+SQL_PROFILE_DEFAULT_LIMIT = 20
+SQL_PROFILE_MAX_LIMIT = 200
+
+@app.route('/admin/sql_profile')
+def sql_profile():
+    """Top statements by total time, plus the most recent slow statements and their plans"""
+    error = admin_token_error('SQL profile')
+    if error:
+        return error
+    limit = min(max(request.args.get('limit', SQL_PROFILE_DEFAULT_LIMIT, type=int), 1), SQL_PROFILE_MAX_LIMIT)
+
+    # Statements that differ only in literals or IN-list length are grouped
+    grouped = {}
+    for sql, (calls, seconds, rows, slowest) in metrics.snapshot().statements.items():
+        totals = grouped.setdefault(normalize_sql(sql), [0, 0.0, 0, 0.0])
+        totals[0] += calls
+        totals[1] += seconds
+        totals[2] += rows
+        totals[3] = max(totals[3], slowest)
+
+    top = sorted(grouped.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+    return jsonify({
+        'threshold_ms': SLOW_QUERY_MS,
+        'statements': [{
+            'sql': sql,
+            'calls': calls,
+            'total_ms': round(seconds * 1000, 2),
+            'mean_ms': round(seconds * 1000 / calls, 3),
+            'max_ms': round(slowest * 1000, 2),
+            'rows': rows,
+            'rows_per_call': round(rows / calls, 1)
+        } for sql, (calls, seconds, rows, slowest) in top],
+        'slow': list(reversed(sql_profiler.slow))[:limit]
+    })
+
+# Bulk catalog import over HTTP, taking the same files as catalog_import.py.
+@app.route('/admin/import', methods=['POST'])
+def import_catalog():
+    """Stream a CSV/JSON offer list (raw body or a 'file' upload) into the catalog.
+
+    The format comes from ?format=, else the upload's file name, else the
+    request's content type. Returns the import report.
+    """
+    error = admin_token_error('Catalog import')
+    if error:
+        return error
+
+    upload = request.files.get('file')
+    if upload:
+        stream, fmt = upload.stream, guess_format(upload.filename or '')
+    else:
+        stream, fmt = request.stream, 'json' if request.mimetype in ('application/json', 'application/x-ndjson') else 'csv'
+    fmt = request.args.get('format', fmt)
+    if fmt not in ('csv', 'json'):
+        return jsonify({'success': False, 'message': "format must be 'csv' or 'json'"}), 400
+
+    conn = get_db_connection()
+    importer = CatalogImporter(conn, write_lock=db_write_lock)
     try:
-        # Get data from request
-        data = request.get_json()
-        components = data.get('components', [])
-        student_email = data.get('student_email', 'student@example.com')
-        
-        # Create Reserved_components directory if it doesn't exist
-        pdf_dir = os.path.join(os.path.dirname(__file__), 'Reserved_components')
-        os.makedirs(pdf_dir, exist_ok=True)
-        
-        # Generate filename with timestamp
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f'reservation_{timestamp}.pdf'
-        filepath = os.path.join(pdf_dir, filename)
-        
-        # Generate dates
-        current_date = datetime.now().strftime('%B %d, %Y')
-        collection_date = (datetime.now() + timedelta(days=3)).strftime('%B %d, %Y')
-        
-        # Calculate total cost
-        total_cost = sum(component.get('price', 0) for component in components)
-        
-        if REPORTLAB_AVAILABLE:
-            # Create PDF using ReportLab
-            doc = SimpleDocTemplate(filepath, pagesize=letter, 
-                                  rightMargin=72, leftMargin=72, 
-                                  topMargin=72, bottomMargin=18)
-            
-            story = []
-            styles = getSampleStyleSheet()
-            
-            # Custom styles
-            title_style = ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Heading1'],
-                fontSize=16,
-                spaceAfter=10,
-                alignment=0,  # Left alignment
-                textColor=colors.black
-            )
-            
-            header_style = ParagraphStyle(
-                'CustomHeader',
-                parent=styles['Heading2'],
-                fontSize=14,
-                spaceAfter=12,
-                textColor=colors.black
-            )
-
-            # Enhanced Header with EE Logo styling
-            from reportlab.platypus import KeepTogether
-            from reportlab.lib.colors import HexColor
-            
-            # Create a table for the header with logo and title
-            header_data = [
-                [Paragraph('<para align="center" backColor="#8B5CF6" textColor="white" fontSize="18" fontName="Helvetica-Bold">EE</para>', styles['Normal']), 
-                 Paragraph('ERS 220<br/>Component Reservation', title_style)]
-            ]
-            
-            header_table = Table(header_data, colWidths=[0.8*inch, 4*inch])
-            header_table.setStyle(TableStyle([
-                # Logo cell styling (purple background, white text)
-                ('BACKGROUND', (0, 0), (0, 0), HexColor('#8B5CF6')),
-                ('TEXTCOLOR', (0, 0), (0, 0), colors.white),
-                ('FONTNAME', (0, 0), (0, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (0, 0), 18),
-                ('ALIGN', (0, 0), (0, 0), 'CENTER'),
-                ('VALIGN', (0, 0), (0, 0), 'MIDDLE'),
-                
-                # Title cell styling
-                ('ALIGN', (1, 0), (1, 0), 'LEFT'),
-                ('VALIGN', (1, 0), (1, 0), 'MIDDLE'),
-                ('LEFTPADDING', (1, 0), (1, 0), 15),
-                
-                # Remove borders and add some styling
-                ('BOX', (0, 0), (0, 0), 2, HexColor('#8B5CF6')),
-                ('ROUNDEDCORNERS', (0, 0), (0, 0), [8, 8, 8, 8]),
-            ]))
-            
-            story.append(header_table)
-            story.append(Spacer(1, 30))
-            
-            # Header
-            story.append(Paragraph('COMPONENT COMPASS', title_style))
-            story.append(Paragraph('Reservations', title_style))
-            story.append(Spacer(1, 20))
-            
-            # Student details table
-            details_data = [
-                ['Student Email:', student_email],
-                ['Reservation Date:', current_date],
-                ['Collection Deadline:', collection_date]
-            ]
-            
-            details_table = Table(details_data, colWidths=[2*inch, 3*inch])
-            details_table.setStyle(TableStyle([
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-            ]))
-            
-            story.append(details_table)
-            story.append(Spacer(1, 20))
-            
-            # Collection instructions
-            story.append(Paragraph('Collection Instructions', header_style))
-            story.append(Paragraph(
-                'Please collect your reserved components within 3 days from the respective stores. '
-                'Bring this reservation confirmation and your student ID.',
-                styles['Normal']
-            ))
-            story.append(Spacer(1, 20))
-            
-            # Components table
-            story.append(Paragraph('Reserved Components', header_style))
-            
-            # Table data
-            table_data = [['Component Name', 'Store', 'Price']]
-            
-            for component in components:
-                table_data.append([
-                    component.get('name', ''),
-                    component.get('store', ''),
-                    f"${component.get('price', 0):.2f}"
-                ])
-            
-            # Add total row
-            table_data.append(['', 'Total Cost:', f'${total_cost:.2f}'])
-            
-            # Create table
-            components_table = Table(table_data, colWidths=[3*inch, 2*inch, 1*inch])
-            components_table.setStyle(TableStyle([
-                # Header row
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 12),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                
-                # Data rows
-                ('FONTNAME', (0, 1), (-1, -2), 'Helvetica'),
-                ('FONTSIZE', (0, 1), (-1, -2), 10),
-                ('ROWBACKGROUNDS', (0, 1), (-1, -2), [colors.white, colors.white]),
-                
-                # Total row
-                ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, -1), (-1, -1), 12),
-                ('BACKGROUND', (0, -1), (-1, -1), colors.lightgrey),
-                
-                # All borders
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
-            
-            story.append(components_table)
-            story.append(Spacer(1, 30))
-            
-            # Good luck message
-            story.append(Paragraph(
-                'Good luck with your practical! We\'re excited to see what you\'ll build with these components.',
-                ParagraphStyle('GoodLuck', parent=styles['Normal'], 
-                             alignment=1, fontSize=12, textColor=colors.purple)
-            ))
-            story.append(Spacer(1, 20))
-            
-            # Disclaimer
-            story.append(Paragraph(
-                'Note: Components are reserved for 3 days only. Uncollected items will be released back to general stock.',
-                ParagraphStyle('Disclaimer', parent=styles['Normal'], 
-                             alignment=1, fontSize=10, textColor=colors.red, fontName='Helvetica-Oblique')
-            ))
-            
-            # Build PDF
-            doc.build(story)
-            
-        else:
-            
-            html_content = f"""
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <style>
-                    * {{
-                        margin: 0;
-                        padding: 0;
-                        box-sizing: border-box;
-                    }}
-                    
-                    body {{
-                        font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-                        background: #fafafa;
-                        padding: 30px;
-                    }}
-                    
-                    .pdf-preview {{
-                        border: 2px solid #e1e8ed;
-                        border-radius: 15px;
-                        padding: 30px;
-                        background: #fafafa;
-                        margin-bottom: 30px;
-                        position: relative;
-                    }}
-                    
-                    .pdf-header {{
-                        display: flex;
-                        justify-content: space-between;
-                        align-items: flex-start;
-                        margin-bottom: 30px;
-                        padding-bottom: 20px;
-                        border-bottom: 2px solid #e1e8ed;
-                    }}
-                    
-                    .pdf-logo-section {{
-                        display: flex;
-                        align-items: center;
-                    }}
-                    
-                    .pdf-logo {{
-                        width: 50px;
-                        height: 50px;
-                        background-color: #8B5CF6;
-                        border-radius: 8px;
-                        display: flex;
-                        align-items: center;
-                        justify-content: center;
-                        font-weight: bold;
-                        font-size: 20px;
-                        color: white;
-                        margin-right: 15px;
-                        border: 2px solid #8B5CF6;
-                    }}
-                    
-                    .pdf-title {{
-                        font-size: 22px;
-                        font-weight: 700;
-                        color: #2c3e50;
-                        line-height: 1.2;
-                    }}
-                    
-                    .student-details {{
-                        text-align: right;
-                        font-size: 14px;
-                        color: #6b7280;
-                    }}
-                    
-                    .collection-info {{
-                        background: #f0f9ff;
-                        border: 1px solid #0ea5e9;
-                        border-radius: 10px;
-                        padding: 15px;
-                        margin-bottom: 20px;
-                        font-size: 14px;
-                        color: #0369a1;
-                    }}
-                    
-                    .component-list {{
-                        margin-bottom: 30px;
-                    }}
-                    
-                    .component-item {{
-                        display: flex;
-                        justify-content: space-between;
-                        align-items: center;
-                        padding: 15px;
-                        border-bottom: 1px solid #e5e7eb;
-                        font-size: 14px;
-                    }}
-                    
-                    .component-name-store {{
-                        flex: 1;
-                    }}
-                    
-                    .component-name {{
-                        font-weight: 600;
-                        color: #2c3e50;
-                    }}
-                    
-                    .component-store {{
-                        color: #6b7280;
-                        font-size: 12px;
-                    }}
-                    
-                    .component-price {{
-                        font-weight: 600;
-                        color: #667eea;
-                        min-width: 80px;
-                        text-align: right;
-                    }}
-                    
-                    .pdf-total {{
-                        border-top: 2px solid #2c3e50;
-                        padding-top: 15px;
-                        margin-top: 20px;
-                        display: flex;
-                        justify-content: space-between;
-                        align-items: center;
-                        font-size: 18px;
-                        font-weight: 700;
-                        color: #2c3e50;
-                    }}
-                    
-                    .good-luck-message {{
-                        background: #f0fdf4;
-                        border: 1px solid #22c55e;
-                        border-radius: 10px;
-                        padding: 15px;
-                        margin-bottom: 15px;
-                        font-size: 14px;
-                        color: #15803d;
-                        text-align: center;
-                    }}
-                    
-                    .disclaimer {{
-                        font-size: 12px;
-                        color: #6b7280;
-                        text-align: center;
-                        font-style: italic;
-                    }}
-                </style>
-            </head>
-            <body>
-                <div class="pdf-preview">
-                    <div class="pdf-header">
-                        <div class="pdf-logo-section">
-                            <div class="pdf-logo">EE</div>
-                            <div class="pdf-title">ERS 220<br>Component Reservation</div>
-                        </div>
-                        <div class="student-details">
-                            <strong>Student Email:</strong> {student_email}<br>
-                            <strong>Reservation Date:</strong> {current_date}<br>
-                            <strong>Collection Deadline:</strong> {collection_date}
-                        </div>
-                    </div>
-
-                    <div class="collection-info">
-                        <strong>Collection Instructions:</strong> Please collect your reserved components within 3 days from the Electronics Lab (Room 201). Bring this reservation confirmation and your student ID.
-                    </div>
-
-                    <div class="component-list">
-            """
-            
-            for component in components:
-                html_content += f"""
-                        <div class="component-item">
-                            <div class="component-name-store">
-                                <div class="component-name">{component.get('name', '')}</div>
-                                <div class="component-store">{component.get('store', '')}</div>
-                            </div>
-                            <div class="component-price">${component.get('price', 0):.2f}</div>
-                        </div>
-                """
-            
-            html_content += f"""
-                    </div>
-
-                    <div class="pdf-total">
-                        <span>Total Cost:</span>
-                        <span>${total_cost:.2f}</span>
-                    </div>
-
-                    <div class="good-luck-message">
-                        Good luck with your practical! We're excited to see what you'll build with these components.
-                    </div>
-
-                    <div class="disclaimer">
-                        Note: Components are reserved for 3 days only. Uncollected items will be released back to general stock.
-                    </div>
-                </div>
-            </body>
-            </html>
-            """
-            
-            # For now, save as HTML (can be printed to PDF by user)
-            filepath = filepath.replace('.pdf', '.html')
-            filename = filename.replace('.pdf', '.html')
-            
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(html_content)
-        
-        return jsonify({
-            'success': True, 
-            'message': f'PDF exported successfully! {"PDF" if REPORTLAB_AVAILABLE else "HTML"} file created.',
-            'filename': filename
-        })
-        
-    except Exception as e:
-        return jsonify({'success': False, 'message': f'Error creating PDF: {str(e)}'}), 500
+        report = importer.run(open_records(stream, fmt))
+    except (ValueError, csv.Error) as e:
+        # Chunks before the unreadable part stay imported
+        return jsonify({'success': False, 'message': f'The input could not be read: {e}', **importer.report()}), 400
+    finally:
+        conn.close()
+        catalog_cache.invalidate()
+    return jsonify({'success': True, **report})
+
+@app.route('/test_query_plans')
+def test_query_plans():
+    """Check that no catalog query has regressed to a table scan or temp B-tree sort"""
+    conn = get_db_connection()
+    results = check_query_plans(conn)
+    conn.close()
+
+    failures = [r for r in results if r['problems']]
+    return jsonify({
+        'status': 'failed' if failures else 'success',
+        'checked': len(results),
+        'failures': failures,
+        'results': results
+    }), 500 if failures else 200
 
 @app.route('/test_db')
 def test_db():
@@ -1017,5 +3446,46 @@ def test_db():
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)})
 
+def create_app(config=None):
+    """Configure and return the WSGI application, e.g. gunicorn 'app:create_app()'.
+
+    config is one of the Config classes or its name in CONFIGS, defaulting
+    to APP_CONFIG from the environment (production). Routes, connection pool
+    and background services are per process, so every call configures the
+    same app object. Outside development and testing, a SECRET_KEY must be
+    set or RuntimeError is raised.
+    """
+    if config is None:
+        config = os.environ.get('APP_CONFIG', 'production')
+    if isinstance(config, str):
+        config = CONFIGS[config]
+    app.config.from_object(config)
+
+    if app.config['DATABASE'] != db_pool.database:
+        db_pool.use_database(app.config['DATABASE'])
+        catalog_cache.invalidate()
+    if app.config['SECRET_KEY'] == DEFAULT_SECRET_KEY and not app.testing:
+        if not app.debug:
+            # Anyone could sign a session for any student with the published key
+            raise RuntimeError('SECRET_KEY is not set; refusing to serve with the key published in app.py')
+        app.logger.warning('SECRET_KEY is not set, sessions are signed with the key published in app.py')
+    return app
+
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    # Development server only; production runs serve.py (see README)
+    if not init_db():
+        print("\nDatabase not found. Creating database...")
+        # Run the database initialization script
+        try:
+            import subprocess
+            import sys
+            result = subprocess.run([sys.executable, 'init_db.py'], 
+                                  capture_output=True, text=True)
+            if result.returncode == 0:
+                print("Database initialized successfully!")
+            else:
+                print("Database initialization failed:", result.stderr)
+        except Exception as e:
+            print(f"Error initializing database: {e}")
+
+    create_app(DevelopmentConfig).run()
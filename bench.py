@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the Flask app
+Each subcommand measures one optimisation in isolation, so the figures
+quoted in commit messages can be reproduced:
+
+    python bench.py pool --requests 3000
+    python bench.py login --url http://127.0.0.1:5000 --rate 8 --duration 10
+    python bench.py export --renders 300 --lines 5 20 60
+
+pool    sequential GET /api/component/<id>/suppliers through the Flask test
+        client, in-process: the per-request cost of getting a configured
+        SQLite connection
+login   open-loop logins at a fixed rate against a running server, each with
+        its own account, while one logged-in client polls /api/practicals:
+        login throughput and p99, and how far a login storm slows the catalog.
+        Accounts are added to --database first, hashed with
+        PASSWORD_HASH_METHOD as the server would. Start the server with a
+        LOGIN_IP_BURST above the number of logins
+export  reservation PDF renders, in-process and interleaved: the old renderer
+        (styles built per render, ASCII85 streams) against styles reused,
+        with and without ASCII85, for carts of each --lines size
+"""
+
+import argparse
+import http.client
+import os
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlsplit
+
+LOGIN_PASSWORD = 'bench-password'
+
+def load_app(database):
+    """Import app.py against database, logged in as the first student; returns (app module, client)"""
+    if database:
+        os.environ['DATABASE'] = database
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import app
+    flask_app = app.create_app('testing') if hasattr(app, 'create_app') else app.app
+    client = flask_app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = 1
+        session['user_email'] = 'bench@example.com'
+        session['user_fullname'] = 'Bench'
+    return app, client
+
+def bench_pool(args):
+    _, client = load_app(args.database)
+    path = f'/api/component/{args.component}/suppliers'
+    for _ in range(args.warmup):
+        client.get(path)
+    start = time.perf_counter()
+    for _ in range(args.requests):
+        response = client.get(path)
+        if response.status_code != 200:
+            sys.exit(f'{path} returned {response.status_code}')
+    elapsed = time.perf_counter() - start
+    print(f'{args.requests} x GET {path}: {args.requests / elapsed:.0f} req/s '
+          f'({elapsed / args.requests * 1e6:.0f} us/req)')
+
+def percentile(values, q):
+    """q-th percentile of sorted values in milliseconds"""
+    return values[min(len(values) - 1, int(q / 100 * len(values)))] * 1000 if values else float('nan')
+
+def create_login_accounts(database, count):
+    """Make sure bench<N>@example.com exists for every N below count"""
+    from werkzeug.security import generate_password_hash
+    password_hash = generate_password_hash(LOGIN_PASSWORD, os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1'))
+    conn = sqlite3.connect(database)
+    conn.executemany(
+        'INSERT OR IGNORE INTO Student (full_name, email_address, password_hash) VALUES (?, ?, ?)',
+        [(f'Bench {i}', f'bench{i}@example.com', password_hash) for i in range(count)]
+    )
+    conn.commit()
+    conn.close()
+
+def bench_login(args):
+    url = urlsplit(args.url)
+    logins = int(args.rate * args.duration)
+    create_login_accounts(args.database or os.environ.get('DATABASE', 'practical_management.db'), logins + 1)
+    local = threading.local()
+
+    def call(method, path, body=None, headers=None):
+        """One request on this thread's keep-alive connection; returns (status, headers, seconds)"""
+        conn = getattr(local, 'conn', None)
+        if conn is None:
+            conn = local.conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=60)
+        start = time.perf_counter()
+        try:
+            conn.request(method, path, body=body, headers=headers or {})
+            response = conn.getresponse()
+            response.read()
+            status, response_headers = response.status, response.headers
+        except (OSError, http.client.HTTPException):
+            local.conn = None
+            status, response_headers = 0, {}
+        return status, response_headers, time.perf_counter() - start
+
+    def login(i):
+        form = urlencode({'email': f'bench{i}@example.com', 'password': LOGIN_PASSWORD})
+        return call('POST', '/login', form, {'Content-Type': 'application/x-www-form-urlencoded'})
+
+    # The catalog poller logs in with the extra account, before the storm starts
+    status, headers, _ = login(logins)
+    cookie = headers.get('Set-Cookie', '').split(';', 1)[0]
+    if status != 302 or not cookie:
+        sys.exit(f'Could not log in to {args.url} (status {status})')
+    catalog = []
+    stopped = threading.Event()
+
+    def poll_catalog():
+        while not stopped.is_set():
+            catalog.append(call('GET', '/api/practicals', headers={'Cookie': cookie})[2])
+            time.sleep(args.poll_interval)
+
+    poller = threading.Thread(target=poll_catalog)
+    poller.start()
+    futures = []
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        start = time.perf_counter()
+        for i in range(logins):
+            delay = start + i / args.rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            futures.append(pool.submit(login, i))
+        results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - start
+    stopped.set()
+    poller.join()
+
+    statuses = {}
+    for status, _, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    ok = sorted(seconds for status, _, seconds in results if status == 302)
+    catalog.sort()
+    print(f'offered {args.rate:g}/s: ok {len(ok) / elapsed:.1f}/s statuses {statuses} | '
+          f'login p50 {percentile(ok, 50):.0f} p99 {percentile(ok, 99):.0f} ms | '
+          f'catalog p50 {percentile(catalog, 50):.1f} p99 {percentile(catalog, 99):.1f} ms')
+
+def bench_export(args):
+    app, _ = load_app(args.database)
+    if not app.REPORTLAB_AVAILABLE:
+        sys.exit('ReportLab is not installed, exports are plain text')
+    from reportlab import rl_config
+    cached = app.build_pdf_styles()
+
+    def use_styles(styles):
+        (app.PDF_STYLES, app.PDF_TITLE_STYLE, app.PDF_HEADER_STYLE, app.PDF_GOOD_LUCK_STYLE,
+         app.PDF_DISCLAIMER_STYLE, app.PDF_HEADER_TABLE_STYLE, app.PDF_DETAILS_TABLE_STYLE,
+         app.PDF_COMPONENTS_TABLE_STYLE) = styles
+
+    variants = {
+        'styles per render, ASCII85': (True, 1),
+        'styles reused, ASCII85': (False, 1),
+        'styles reused (current)': (False, 0),
+    }
+    for lines in args.lines:
+        components = [{'name': f'Component {i}', 'store': 'Online', 'price': 1.25 + i} for i in range(lines)]
+        times = {name: [] for name in variants}
+        for i in range(args.warmup + args.renders):
+            # Interleaved, so drift in machine load hits every variant alike
+            for name, (rebuild, a85) in variants.items():
+                rl_config.useA85 = a85
+                start = time.perf_counter()
+                use_styles(app.build_pdf_styles() if rebuild else cached)
+                app.render_reservation(components, 'Bench Student', 'bench@example.com')
+                if i >= args.warmup:
+                    times[name].append(time.perf_counter() - start)
+        for name, seconds in times.items():
+            seconds.sort()
+            print(f'{lines:3} lines, {name:27}: median {percentile(seconds, 50):6.2f} ms, '
+                  f'p95 {percentile(seconds, 95):6.2f} ms')
+    use_styles(cached)
+    rl_config.useA85 = 0
+
+def main():
+    parser = argparse.ArgumentParser(description='Micro-benchmarks for single optimisations')
+    parser.add_argument('--database', help='SQLite file to use (default: DATABASE or practical_management.db)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    pool = commands.add_parser('pool', help='sequential catalog requests through the test client')
+    pool.add_argument('--requests', type=int, default=3000, help='timed requests')
+    pool.add_argument('--warmup', type=int, default=200, help='untimed requests first')
+    pool.add_argument('--component', type=int, default=5, help='component whose suppliers are requested')
+    pool.set_defaults(run=bench_pool)
+
+    login = commands.add_parser('login', help='open-loop logins against a running server')
+    login.add_argument('--url', default='http://127.0.0.1:5000', help='server to test')
+    login.add_argument('--rate', type=float, default=8, help='logins started per second')
+    login.add_argument('--duration', type=float, default=10, help='seconds to keep starting logins')
+    login.add_argument('--concurrency', type=int, default=128, help='logins in flight at most')
+    login.add_argument('--poll-interval', type=float, default=0.02, help='seconds between catalog polls')
+    login.set_defaults(run=bench_login)
+
+    export = commands.add_parser('export', help='reservation PDF renders, old renderer against current')
+    export.add_argument('--renders', type=int, default=300, help='timed renders per variant and size')
+    export.add_argument('--warmup', type=int, default=20, help='untimed renders first')
+    export.add_argument('--lines', type=int, nargs='+', default=[5, 20, 60], help='components per reservation')
+    export.set_defaults(run=bench_export)
+
+    args = parser.parse_args()
+    args.run(args)
+
+if __name__ == '__main__':
+    main()
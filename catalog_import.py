@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Bulk importer for supplier price and stock lists
+Streams CSV or JSON offer rows into Supplier, Components/Alt_components and
+Supplier_components/Supplier_alt_components with chunked upserts
+
+    python catalog_import.py prices.csv
+    python catalog_import.py --format json prices.jsonl --chunk-size 20000
+
+One row is one supplier's offer for one part:
+    supplier_name, supplier_location, store_type, part_type, part_name, price, quantity_in_stock
+
+part_type is 'component' (the default) or 'alternative'. A blank store_type
+keeps an existing supplier's type, and for a new supplier is 'online' when its
+location is 'Online', otherwise 'physical'. Suppliers are matched on name and
+location, parts on name; existing offers get the new price and stock, and
+offers whose price and stock are unchanged are left alone (no change is logged).
+JSON input may be an array of objects or one object per line; neither CSV nor
+JSON is ever read into memory whole. Bad rows are rejected and reported, the
+rest are imported.
+"""
+
+import argparse
+import csv
+import io
+import json
+import math
+import sqlite3
+import sys
+import time
+
+DATABASE = 'practical_management.db'
+IMPORT_CHUNK_SIZE = 10000  # Rows per transaction
+IMPORT_REJECT_DETAILS = 100  # Rejected rows reported individually; the rest are only counted
+NAME_MAX_LENGTH = 45  # The schema's VARCHAR(45) names
+JSON_READ_SIZE = 1 << 16  # Characters read at a time from JSON input
+JSON_MAX_RECORD = 1 << 20  # Longest JSON record accepted, so a malformed one can't pull in the whole file
+
+FIELDS = ('supplier_name', 'supplier_location', 'store_type', 'part_type', 'part_name', 'price', 'quantity_in_stock')
+
+PART_TABLES = {
+    # part_type: (insert new names, look up ids for a JSON array of names, upsert offers)
+    'component': (
+        'INSERT INTO Components (component_name) VALUES (?) ON CONFLICT (component_name) DO NOTHING',
+        '''SELECT component_name, component_id FROM Components
+           WHERE component_name IN (SELECT value FROM json_each(?))''',
+        '''INSERT INTO Supplier_components (quantity_in_stock, price_component_per_supplier, component_id, supplier_id)
+           VALUES (?, ?, ?, ?)
+           ON CONFLICT (component_id, supplier_id) DO UPDATE SET
+               quantity_in_stock = excluded.quantity_in_stock,
+               price_component_per_supplier = excluded.price_component_per_supplier,
+               updated_at = CURRENT_TIMESTAMP
+           WHERE quantity_in_stock IS NOT excluded.quantity_in_stock
+               OR price_component_per_supplier IS NOT excluded.price_component_per_supplier'''
+    ),
+    'alternative': (
+        'INSERT INTO Alt_components (alt_component_name) VALUES (?) ON CONFLICT (alt_component_name) DO NOTHING',
+        '''SELECT alt_component_name, alt_component_id FROM Alt_components
+           WHERE alt_component_name IN (SELECT value FROM json_each(?))''',
+        '''INSERT INTO Supplier_alt_components (alt_quantity_in_stock, alt_price_component_per_supplier, alt_component_id, supplier_id)
+           VALUES (?, ?, ?, ?)
+           ON CONFLICT (alt_component_id, supplier_id) DO UPDATE SET
+               alt_quantity_in_stock = excluded.alt_quantity_in_stock,
+               alt_price_component_per_supplier = excluded.alt_price_component_per_supplier,
+               updated_at = CURRENT_TIMESTAMP
+           WHERE alt_quantity_in_stock IS NOT excluded.alt_quantity_in_stock
+               OR alt_price_component_per_supplier IS NOT excluded.alt_price_component_per_supplier'''
+    )
+}
+
+# Suppliers given a store_type take it; others keep whatever they have
+UPSERT_SUPPLIER_SQL = '''
+    INSERT INTO Supplier (supplier_name, supplier_location, store_type) VALUES (?, ?, ?)
+    ON CONFLICT (supplier_name, IFNULL(supplier_location, '')) DO UPDATE SET
+        store_type = excluded.store_type,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE store_type != excluded.store_type
+'''
+INSERT_SUPPLIER_SQL = '''
+    INSERT INTO Supplier (supplier_name, supplier_location, store_type) VALUES (?, ?, ?)
+    ON CONFLICT (supplier_name, IFNULL(supplier_location, '')) DO NOTHING
+'''
+SUPPLIER_ID_SQL = "SELECT supplier_id FROM Supplier WHERE supplier_name = ? AND IFNULL(supplier_location, '') = ?"
+
+def read_csv(stream):
+    """(line number, row dict) for each CSV data row; the header names the fields"""
+    reader = csv.DictReader(stream)
+    for row in reader:
+        yield reader.line_num, row
+
+def read_json(stream):
+    """(record number, object) for a JSON array of objects or one object per line"""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    number = 0
+    eof = False
+    separators = ' \t\r\n'  # Until the input turns out to be an array
+    while True:
+        while position < len(buffer) and buffer[position] in separators:
+            position += 1
+        if position == len(buffer):
+            if eof:
+                return
+            buffer = stream.read(JSON_READ_SIZE)
+            position = 0
+            eof = not buffer
+            continue
+        if number == 0 and separators == ' \t\r\n' and buffer[position] == '[':
+            # Records are array elements, separated by commas and closed by ']'
+            separators = ' \t\r\n,]'
+            position += 1
+            continue
+        try:
+            record, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof or len(buffer) - position > JSON_MAX_RECORD:
+                raise
+            # The record runs past the buffer; read more and try again
+            more = stream.read(JSON_READ_SIZE)
+            buffer = buffer[position:] + more
+            position = 0
+            eof = not more
+            continue
+        number += 1
+        yield number, record
+        position = end
+
+def parse_offer(row):
+    """Validate one input row; returns the offer tuple or raises ValueError"""
+    if not isinstance(row, dict):
+        raise ValueError('row is not an object')
+    values = {field: row.get(field) for field in FIELDS}
+    for field in ('supplier_name', 'supplier_location', 'store_type', 'part_type', 'part_name'):
+        value = values[field]
+        values[field] = '' if value is None else str(value).strip()
+
+    supplier_name, part_name = values['supplier_name'], values['part_name']
+    if not supplier_name or not part_name:
+        raise ValueError('supplier_name and part_name are required')
+    if len(supplier_name) > NAME_MAX_LENGTH or len(part_name) > NAME_MAX_LENGTH:
+        raise ValueError(f'names must be at most {NAME_MAX_LENGTH} characters')
+
+    part_type = values['part_type'].lower() or 'component'
+    if part_type not in PART_TABLES:
+        raise ValueError("part_type must be 'component' or 'alternative'")
+    store_type = values['store_type'].lower()
+    if store_type not in ('', 'online', 'physical'):
+        raise ValueError("store_type must be 'online' or 'physical'")
+
+    try:
+        price = float(values['price'])
+        quantity = int(values['quantity_in_stock'])
+    except (TypeError, ValueError):
+        raise ValueError('price must be a number and quantity_in_stock a whole number')
+    if not math.isfinite(price) or price < 0 or quantity < 0:
+        raise ValueError('price and quantity_in_stock must be zero or more')
+
+    return (supplier_name, values['supplier_location'] or None, store_type, part_type, part_name,
+            round(price, 2), quantity)
+
+class CatalogImporter:
+    """Upserts validated offers in chunks, one transaction per chunk.
+
+    Supplier and part ids are cached across chunks, so each name is looked up
+    once per import however many offers mention it.
+    """
+
+    def __init__(self, conn, chunk_size=IMPORT_CHUNK_SIZE, write_lock=None, progress=None):
+        self.conn = conn
+        self.chunk_size = chunk_size
+        self.write_lock = write_lock
+        self.progress = progress
+        self.supplier_ids = {}
+        self.part_ids = {part_type: {} for part_type in PART_TABLES}
+        self.read = 0
+        self.imported = 0
+        self.rejected = 0
+        self.rejects = []
+        self.chunks = 0
+        self.started = None
+
+    def run(self, records):
+        """Import (position, row) pairs; returns the report"""
+        self.started = time.perf_counter()
+        chunk = []
+        for position, row in records:
+            self.read += 1
+            try:
+                chunk.append(parse_offer(row))
+            except ValueError as e:
+                self.reject(position, str(e))
+                continue
+            if len(chunk) == self.chunk_size:
+                self.write(chunk)
+                chunk = []
+        if chunk:
+            self.write(chunk)
+        return self.report()
+
+    def reject(self, position, reason):
+        self.rejected += 1
+        if len(self.rejects) < IMPORT_REJECT_DETAILS:
+            self.rejects.append({'row': position, 'error': reason})
+
+    def write(self, chunk):
+        if self.write_lock is not None:
+            with self.write_lock:
+                self._write(chunk)
+        else:
+            self._write(chunk)
+        self.imported += len(chunk)
+        self.chunks += 1
+        if self.progress:
+            self.progress(self.report())
+
+    def _write(self, chunk):
+        conn = self.conn
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            self._upsert_suppliers(chunk)
+            offers = {part_type: [] for part_type in PART_TABLES}
+            for part_type, names in self._part_names(chunk).items():
+                self._upsert_parts(part_type, names)
+            for supplier_name, location, _, part_type, part_name, price, quantity in chunk:
+                offers[part_type].append((quantity, price, self.part_ids[part_type][part_name],
+                                          self.supplier_ids[supplier_name, location or '']))
+            for part_type, rows in offers.items():
+                if rows:
+                    conn.executemany(PART_TABLES[part_type][2], rows)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+    def _upsert_suppliers(self, chunk):
+        suppliers = {}
+        for supplier_name, location, store_type, *_ in chunk:
+            key = (supplier_name, location or '')
+            if store_type or key not in suppliers:
+                suppliers[key] = (supplier_name, location, store_type)
+        given = [(name, location, store_type) for name, location, store_type in suppliers.values() if store_type]
+        inferred = [(name, location, 'online' if (location or '').lower() == 'online' else 'physical')
+                    for name, location, store_type in suppliers.values()
+                    if not store_type and (name, location or '') not in self.supplier_ids]
+        if given:
+            self.conn.executemany(UPSERT_SUPPLIER_SQL, given)
+        if inferred:
+            self.conn.executemany(INSERT_SUPPLIER_SQL, inferred)
+        for key in suppliers:
+            if key not in self.supplier_ids:
+                self.supplier_ids[key] = self.conn.execute(SUPPLIER_ID_SQL, key).fetchone()[0]
+
+    def _part_names(self, chunk):
+        """Part names in this chunk whose ids are not known yet, by part type"""
+        names = {part_type: set() for part_type in PART_TABLES}
+        for _, _, _, part_type, part_name, _, _ in chunk:
+            if part_name not in self.part_ids[part_type]:
+                names[part_type].add(part_name)
+        return names
+
+    def _upsert_parts(self, part_type, names):
+        if not names:
+            return
+        insert_sql, ids_sql, _ = PART_TABLES[part_type]
+        self.conn.executemany(insert_sql, [(name,) for name in names])
+        ids = self.part_ids[part_type]
+        for name, part_id in self.conn.execute(ids_sql, (json.dumps(list(names)),)).fetchall():
+            ids[name] = part_id
+
+    def report(self):
+        seconds = time.perf_counter() - self.started
+        return {
+            'rows_read': self.read,
+            'rows_imported': self.imported,
+            'rows_rejected': self.rejected,
+            'rejects': self.rejects,
+            'chunks': self.chunks,
+            'suppliers': len(self.supplier_ids),
+            'parts': sum(len(ids) for ids in self.part_ids.values()),
+            'seconds': round(seconds, 3),
+            'rows_per_second': round(self.imported / seconds) if seconds else 0
+        }
+
+def open_records(stream, fmt):
+    """Records from a binary stream in the given format ('csv' or 'json')"""
+    if not isinstance(stream, io.BufferedIOBase):
+        stream = io.BufferedReader(stream)
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    return read_csv(text) if fmt == 'csv' else read_json(text)
+
+def guess_format(filename):
+    return 'json' if filename.lower().endswith(('.json', '.jsonl', '.ndjson')) else 'csv'
+
+def main():
+    parser = argparse.ArgumentParser(description='Import supplier price and stock lists into the catalog')
+    parser.add_argument('file', help="CSV or JSON file of offers, '-' for standard input")
+    parser.add_argument('--format', choices=('csv', 'json'), help='input format (default: from the file extension)')
+    parser.add_argument('--database', default=DATABASE, help='SQLite database to import into')
+    parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE, help='rows per transaction')
+    args = parser.parse_args()
+
+    # Same settings as the app's pool, so importing alongside a running server is safe
+    conn = sqlite3.connect(args.database, timeout=5, isolation_level=None)
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = NORMAL')
+    conn.execute('PRAGMA busy_timeout = 5000')
+
+    def progress(report):
+        print(f"{report['rows_imported']:,} rows imported, {report['rows_rejected']:,} rejected "
+              f"({report['rows_per_second']:,} rows/s)", file=sys.stderr)
+
+    fmt = args.format or guess_format(args.file)
+    stream = sys.stdin.buffer if args.file == '-' else open(args.file, 'rb')
+    importer = CatalogImporter(conn, args.chunk_size, progress=progress)
+    try:
+        report = importer.run(open_records(stream, fmt))
+    except (ValueError, csv.Error) as e:
+        # Chunks before the unreadable part stay imported
+        print(f"Stopped, the input could not be read: {e}", file=sys.stderr)
+        progress(importer.report())
+        return 1
+    finally:
+        stream.close()
+        conn.close()
+
+    for reject in report['rejects']:
+        print(f"Rejected row {reject['row']}: {reject['error']}", file=sys.stderr)
+    print(json.dumps(report if report['rejects'] else {k: v for k, v in report.items() if k != 'rejects'}, indent=2))
+    return 0 if report['rows_imported'] or not report['rows_read'] else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,20 +2,71 @@
 """
 Database initialization script for Flask app
 Converts MySQL schema to SQLite and creates the database
+
+    python init_db.py                  # schema plus the small sample catalog
+    python init_db.py --synthetic      # schema plus a generated large catalog
+    python init_db.py --synthetic --components 200000 --offers 2000000 --seed 7 --database bench.db
+
+The synthetic catalog is deterministic for a given seed and scale, so
+benchmark and query-plan runs against it are comparable between commits.
+Start the app on it with DATABASE=bench.db python app.py.
 """
 
+import argparse
+import math
+import random
 import sqlite3
 import os
+import time
 
-def create_database():
-    
-    db_path = 'practical_management.db'
-    
+# Synthetic catalog defaults (python init_db.py --synthetic)
+SYNTHETIC_COMPONENTS = 100000
+SYNTHETIC_SUPPLIERS = 500
+SYNTHETIC_OFFERS = 1000000  # Supplier_components rows; alternatives get a tenth as many
+SYNTHETIC_PRACTICALS = 200
+SYNTHETIC_STUDENTS = 5000
+SYNTHETIC_SEED = 1
+SYNTHETIC_PASSWORD = 'password123'  # Shared by every generated student account
+
+# Offer counts per part follow a Zipf-like curve: a few popular parts are
+# stocked by most suppliers, the long tail by one or two
+OFFER_SKEW = 0.8
+# Practical BOMs draw most lines from the popular parts, so they overlap
+BOM_CORE_FRACTION = 0.02  # Share of parts that count as popular
+BOM_CORE_PICKS = 0.7  # Share of BOM lines drawn from them
+
+PART_FAMILIES = [
+    (['74HC', '74HCT', '74LS'], ['00 NAND Gate', '04 Hex Inverter', '08 AND Gate', '32 OR Gate', '86 XOR Gate',
+                                  '138 Decoder', '151 Multiplexer', '164 Shift Register', '574 D Flip-Flop',
+                                  '595 Shift Register']),
+    (['CD40'], ['11 NAND Gate', '17 Decade Counter', '46 PLL', '51 Multiplexer', '93 Schmitt Trigger']),
+    (['1k', '2.2k', '4.7k', '10k', '47k', '100k', '220', '330'], [' Resistor 1/4W', ' Resistor Pack', ' Trimpot']),
+    (['10nF', '100nF', '1uF', '10uF', '100uF', '470uF'], [' Ceramic Capacitor', ' Electrolytic Capacitor']),
+    (['Red', 'Green', 'Blue', 'Yellow', 'White', 'RGB'], [' LED 5mm', ' LED 3mm', ' LED Strip']),
+    (['ATmega328P', 'ESP32', 'NodeMCU', 'STM32F103', 'RP2040'], [' Microcontroller', ' Dev Board']),
+    (['LM7805', 'LM317', 'AMS1117', 'LM358', 'NE555', 'LM393'], [' Regulator', ' Op-Amp', ' Timer IC']),
+    (['Push Button', 'DIP Switch', 'Slide Switch', 'Relay', 'Buzzer', '7-Segment Display', 'LCD 16x2'], ['']),
+    (['Jumper Wire', 'Header Pins', 'Breadboard', 'Terminal Block', 'IC Socket'], [' Pack', ' Set']),
+]
+MANUFACTURERS = ['TI', 'NXP', 'ON', 'ST', 'Vishay', 'Kemet', 'Bourns', 'Microchip', 'Diodes', 'Yageo']
+SUPPLIER_WORDS = (['Chip', 'Electro', 'Component', 'Tech', 'Maker', 'Circuit', 'Volt', 'Signal', 'Micro', 'Parts'],
+                  ['World', 'Hub', 'Shop', 'Space', 'Depot', 'Store', 'Supply', 'Direct', 'Works', 'Market'])
+CITIES = ['Cape Town', 'Johannesburg', 'Pretoria', 'Durban', 'Stellenbosch', 'Bloemfontein', 'Gqeberha', 'Polokwane']
+PRACTICAL_TOPICS = ['Digital Logic', 'Sequential Circuits', 'Combinational Logic', 'Microcontrollers', 'Power Supplies',
+                    'Amplifiers', 'Sensors', 'Signal Processing', 'Communication', 'Embedded Systems']
+
+def create_database(db_path='practical_management.db', synthetic=None):
+    """Create the database; synthetic holds generate_catalog() options, else the sample data is used"""
     
     if os.path.exists(db_path):
         os.remove(db_path)
         print(f"Removed existing database: {db_path}")
-    
+
+    # The app runs in WAL mode; stale journal files must not outlive the database
+    for suffix in ('-wal', '-shm'):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
     
     conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
@@ -50,6 +101,8 @@ def create_database():
             supplier_id INTEGER PRIMARY KEY AUTOINCREMENT,
             supplier_name VARCHAR(45) NOT NULL,
             supplier_location VARCHAR(45),
+            store_type VARCHAR(10) NOT NULL DEFAULT 'physical' CHECK (store_type IN ('online', 'physical')),
+            low_stock_threshold INTEGER NOT NULL DEFAULT 10 CHECK (low_stock_threshold >= 0),
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
@@ -121,9 +174,208 @@ def create_database():
             FOREIGN KEY (alt_component_id) REFERENCES Alt_components(alt_component_id) ON DELETE SET NULL
         )
     ''')
-    
-   
-    
+
+    # 9. Reservation table
+    cursor.execute('''
+        CREATE TABLE Reservation (
+            reservation_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            student_id INTEGER NOT NULL,
+            practical_number INTEGER,
+            status VARCHAR(10) NOT NULL DEFAULT 'active' CHECK (status IN ('active', 'released', 'expired')),
+            expires_at TIMESTAMP NOT NULL DEFAULT (datetime('now', '+3 days')),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            idempotency_key VARCHAR(64),  -- Sent by the client so a resubmitted cart is not reserved twice
+            FOREIGN KEY (student_id) REFERENCES Student(student_id) ON DELETE CASCADE,
+            FOREIGN KEY (practical_number) REFERENCES Practical(prac_number) ON DELETE SET NULL
+        )
+    ''')
+
+    # 10. Reservation_item table. Each item holds stock of either a component
+    # or an alternative at one supplier.
+    cursor.execute('''
+        CREATE TABLE Reservation_item (
+            reservation_id INTEGER NOT NULL,
+            supplier_id INTEGER NOT NULL,
+            component_id INTEGER,
+            alt_component_id INTEGER,
+            quantity INTEGER NOT NULL CHECK (quantity > 0),
+            unit_price DECIMAL(10,2),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            CHECK ((component_id IS NULL) <> (alt_component_id IS NULL)),
+            FOREIGN KEY (reservation_id) REFERENCES Reservation(reservation_id) ON DELETE CASCADE,
+            FOREIGN KEY (supplier_id) REFERENCES Supplier(supplier_id) ON DELETE CASCADE,
+            FOREIGN KEY (component_id) REFERENCES Components(component_id) ON DELETE CASCADE,
+            FOREIGN KEY (alt_component_id) REFERENCES Alt_components(alt_component_id) ON DELETE CASCADE
+        )
+    ''')
+
+    # 11. Feedback table
+    cursor.execute('''
+        CREATE TABLE Feedback (
+            feedback_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            student_id INTEGER,
+            rating INTEGER NOT NULL CHECK (rating BETWEEN 1 AND 5),
+            feedback TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (student_id) REFERENCES Student(student_id) ON DELETE SET NULL
+        )
+    ''')
+
+    # 12. Feedback_rating_count table: submissions per rating, kept up to date
+    # by triggers so rating statistics never rescan Feedback
+    cursor.execute('''
+        CREATE TABLE Feedback_rating_count (
+            rating INTEGER PRIMARY KEY CHECK (rating BETWEEN 1 AND 5),
+            submissions INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('INSERT INTO Feedback_rating_count (rating) VALUES (1), (2), (3), (4), (5)')
+    cursor.executescript('''
+        CREATE TRIGGER feedback_count_insert AFTER INSERT ON Feedback BEGIN
+            UPDATE Feedback_rating_count SET submissions = submissions + 1 WHERE rating = NEW.rating;
+        END;
+        CREATE TRIGGER feedback_count_delete AFTER DELETE ON Feedback BEGIN
+            UPDATE Feedback_rating_count SET submissions = submissions - 1 WHERE rating = OLD.rating;
+        END;
+    ''')
+
+    # Secondary indexes for the catalog queries in app.py. The supplier offer
+    # indexes cover every column the queries read, already sorted by price.
+    cursor.execute('''
+        CREATE INDEX idx_practical_component_practical
+        ON Practical_component (practical_number, component_id, quantity, alt_component_id)
+    ''')
+    cursor.execute('''
+        CREATE INDEX idx_supplier_components_price
+        ON Supplier_components (component_id, price_component_per_supplier, supplier_id, quantity_in_stock)
+    ''')
+    cursor.execute('''
+        CREATE INDEX idx_supplier_alt_components_price
+        ON Supplier_alt_components (alt_component_id, alt_price_component_per_supplier, supplier_id, alt_quantity_in_stock)
+    ''')
+    cursor.execute('CREATE INDEX idx_practical_component_alt ON Practical_component (alt_component_id, practical_number)')
+    cursor.execute('CREATE INDEX idx_supplier_name ON Supplier (supplier_name)')
+    cursor.execute('CREATE INDEX idx_supplier_store_type ON Supplier (store_type, supplier_id)')
+    # Natural keys the bulk importer (catalog_import.py) upserts on
+    cursor.execute('''
+        CREATE UNIQUE INDEX idx_supplier_identity
+        ON Supplier (supplier_name, IFNULL(supplier_location, ''))
+    ''')
+    cursor.execute('CREATE UNIQUE INDEX idx_components_name ON Components (component_name)')
+    cursor.execute('CREATE UNIQUE INDEX idx_alt_components_name ON Alt_components (alt_component_name)')
+    cursor.execute('CREATE INDEX idx_reservation_student ON Reservation (student_id, reservation_id)')
+    cursor.execute('CREATE INDEX idx_reservation_item_reservation ON Reservation_item (reservation_id)')
+    cursor.execute('''
+        CREATE UNIQUE INDEX idx_reservation_idempotency
+        ON Reservation (student_id, idempotency_key) WHERE idempotency_key IS NOT NULL
+    ''')
+    cursor.execute('CREATE INDEX idx_feedback_created ON Feedback (created_at)')
+    cursor.execute('CREATE INDEX idx_feedback_student ON Feedback (student_id)')
+    # Only active reservations can expire, so the sweeper's index skips the rest
+    cursor.execute('''
+        CREATE INDEX idx_reservation_active_expiry
+        ON Reservation (expires_at) WHERE status = 'active'
+    ''')
+
+    # Offer: every supplier offer, regular and alternative, in one shape with
+    # its stock classified against the supplier's low_stock_threshold. SQLite
+    # pushes conditions on part_type and part_id into both arms of the union,
+    # so queries on the view still use the covering offer indexes (supplier_id
+    # comes from the offer table so the index order covers the tie-break);
+    # LEFT JOINs against it would materialize the whole view instead.
+    # Component_offer and Alt_component_offer are its two arms. Joins that
+    # only want one part type use them directly: joined against Offer, the
+    # other arm is still planned, and not always in the requested join order.
+    cursor.execute('''
+        CREATE VIEW Component_offer AS
+        SELECT
+            'component' AS part_type,
+            sc.component_id AS part_id,
+            c.component_name AS part_name,
+            sc.supplier_id,
+            s.supplier_name,
+            s.supplier_location,
+            s.store_type,
+            sc.quantity_in_stock,
+            sc.price_component_per_supplier AS price,
+            CASE WHEN sc.quantity_in_stock > s.low_stock_threshold THEN 'In Stock'
+                 WHEN sc.quantity_in_stock > 0 THEN sc.quantity_in_stock || ' left'
+                 ELSE 'Out of Stock' END AS stock_status,
+            CASE WHEN sc.quantity_in_stock > s.low_stock_threshold THEN 'high'
+                 WHEN sc.quantity_in_stock > 0 THEN 'low'
+                 ELSE 'out' END AS stock_level
+        FROM Supplier_components sc
+        JOIN Supplier s ON s.supplier_id = sc.supplier_id
+        JOIN Components c ON c.component_id = sc.component_id
+    ''')
+    cursor.execute('''
+        CREATE VIEW Alt_component_offer AS
+        SELECT
+            'alternative' AS part_type,
+            sac.alt_component_id AS part_id,
+            ac.alt_component_name AS part_name,
+            sac.supplier_id,
+            s.supplier_name,
+            s.supplier_location,
+            s.store_type,
+            sac.alt_quantity_in_stock AS quantity_in_stock,
+            sac.alt_price_component_per_supplier AS price,
+            CASE WHEN sac.alt_quantity_in_stock > s.low_stock_threshold THEN 'In Stock'
+                 WHEN sac.alt_quantity_in_stock > 0 THEN sac.alt_quantity_in_stock || ' left'
+                 ELSE 'Out of Stock' END AS stock_status,
+            CASE WHEN sac.alt_quantity_in_stock > s.low_stock_threshold THEN 'high'
+                 WHEN sac.alt_quantity_in_stock > 0 THEN 'low'
+                 ELSE 'out' END AS stock_level
+        FROM Supplier_alt_components sac
+        JOIN Supplier s ON s.supplier_id = sac.supplier_id
+        JOIN Alt_components ac ON ac.alt_component_id = sac.alt_component_id
+    ''')
+    cursor.execute('''
+        CREATE VIEW Offer AS
+        SELECT * FROM Component_offer
+        UNION ALL
+        SELECT * FROM Alt_component_offer
+    ''')
+
+    # Full-text search over component and alternative names. The rowid is the
+    # component_id for components and minus the alt_component_id for
+    # alternatives; the triggers below keep it in sync with both tables.
+    cursor.execute('''
+        CREATE VIRTUAL TABLE Part_search USING fts5(
+            part_name,
+            prefix = '2 3 4'
+        )
+    ''')
+    cursor.executescript('''
+        CREATE TRIGGER components_search_insert AFTER INSERT ON Components BEGIN
+            INSERT INTO Part_search (rowid, part_name) VALUES (NEW.component_id, NEW.component_name);
+        END;
+        CREATE TRIGGER components_search_update AFTER UPDATE OF component_name ON Components BEGIN
+            UPDATE Part_search SET part_name = NEW.component_name WHERE rowid = OLD.component_id;
+        END;
+        CREATE TRIGGER components_search_delete AFTER DELETE ON Components BEGIN
+            DELETE FROM Part_search WHERE rowid = OLD.component_id;
+        END;
+
+        CREATE TRIGGER alt_components_search_insert AFTER INSERT ON Alt_components BEGIN
+            INSERT INTO Part_search (rowid, part_name) VALUES (-NEW.alt_component_id, NEW.alt_component_name);
+        END;
+        CREATE TRIGGER alt_components_search_update AFTER UPDATE OF alt_component_name ON Alt_components BEGIN
+            UPDATE Part_search SET part_name = NEW.alt_component_name WHERE rowid = -OLD.alt_component_id;
+        END;
+        CREATE TRIGGER alt_components_search_delete AFTER DELETE ON Alt_components BEGIN
+            DELETE FROM Part_search WHERE rowid = -OLD.alt_component_id;
+        END;
+    ''')
+
+    if synthetic is not None:
+        generate_catalog(conn, **synthetic)
+        create_change_tracking(cursor)
+        conn.commit()
+        conn.close()
+        return
+
     # Sample practicals
     cursor.execute('''
         INSERT INTO Practical (prac_name) VALUES
@@ -135,15 +387,15 @@ def create_database():
     
     # Sample suppliers
     cursor.execute('''
-        INSERT INTO Supplier (supplier_name, supplier_location) VALUES
-        ('ChipWorld', 'Online'),
-        ('ElectroWorld', 'Cape Town'),
-        ('ComponentHub', 'Online'),
-        ('TechShop', 'Online'),
-        ('CapacitorWorld', 'Online'),
-        ('SwitchTech', 'Online'),
-        ('DisplayTech', 'Online'),
-        ('MakerSpace', 'Johannesburg')
+        INSERT INTO Supplier (supplier_name, supplier_location, store_type) VALUES
+        ('ChipWorld', 'Online', 'online'),
+        ('ElectroWorld', 'Cape Town', 'physical'),
+        ('ComponentHub', 'Online', 'online'),
+        ('TechShop', 'Online', 'online'),
+        ('CapacitorWorld', 'Online', 'online'),
+        ('SwitchTech', 'Online', 'online'),
+        ('DisplayTech', 'Online', 'online'),
+        ('MakerSpace', 'Johannesburg', 'physical')
     ''')
     
     # Sample components
@@ -282,6 +534,8 @@ def create_database():
         (1, 15, 4, NULL)  -- Soldering Kit
     ''')
     
+    create_change_tracking(cursor)
+
     # Commit changes and close connection
     conn.commit()
     conn.close()
@@ -292,7 +546,200 @@ def create_database():
     print("- Practical, Supplier, Components")
     print("- Supplier_components, Alt_components, Supplier_alt_components")
     print("- Practical_component")
+    print("- Reservation, Reservation_item")
+    print("- Feedback, Feedback_rating_count")
+    print("- Catalog_change")
     print("\nSample data inserted for all tables except Student (users will register)")
 
+# Tables whose updated_at the touch triggers maintain
+TOUCHED_TABLES = ('Student', 'Practical', 'Supplier', 'Components', 'Supplier_components', 'Alt_components',
+                  'Supplier_alt_components', 'Practical_component', 'Reservation')
+
+# Offer tables logged to Catalog_change: (part_type, table, part id, stock, price)
+CHANGE_LOGGED_TABLES = (
+    ('component', 'Supplier_components', 'component_id', 'quantity_in_stock', 'price_component_per_supplier'),
+    ('alternative', 'Supplier_alt_components', 'alt_component_id', 'alt_quantity_in_stock',
+     'alt_price_component_per_supplier'),
+)
+
+def create_change_tracking(cursor):
+    """Create the updated_at triggers and the offer change log.
+
+    Runs after the initial data is loaded, so a fresh catalog is version 0
+    rather than one logged insert per offer.
+    """
+    # Updates that don't set updated_at themselves get the current time.
+    # recursive_triggers is off, so the trigger's own UPDATE doesn't re-fire it.
+    for table in TOUCHED_TABLES:
+        cursor.execute(f'''
+            CREATE TRIGGER {table.lower()}_touch AFTER UPDATE ON {table}
+            WHEN NEW.updated_at IS OLD.updated_at BEGIN
+                UPDATE {table} SET updated_at = CURRENT_TIMESTAMP WHERE rowid = NEW.rowid;
+            END
+        ''')
+
+    # Catalog_change: an append-only log with one row per offer insert, price
+    # or stock update and delete. Clients keep the highest version they have
+    # seen and ask for rows above it; the offer's current state (or its
+    # absence, for a deletion) is read from the offer tables. Versions come
+    # from AUTOINCREMENT, so they are never reused after the app prunes old rows.
+    cursor.execute('''
+        CREATE TABLE Catalog_change (
+            version INTEGER PRIMARY KEY AUTOINCREMENT,
+            part_type VARCHAR(11) NOT NULL CHECK (part_type IN ('component', 'alternative')),
+            part_id INTEGER NOT NULL,
+            supplier_id INTEGER NOT NULL,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    for part_type, table, part_id, stock, price in CHANGE_LOGGED_TABLES:
+        log = ("INSERT INTO Catalog_change (part_type, part_id, supplier_id) "
+               "VALUES ('{part_type}', {row}.{part_id}, {row}.supplier_id);")
+        new, old = (log.format(part_type=part_type, part_id=part_id, row=row) for row in ('NEW', 'OLD'))
+        cursor.executescript(f'''
+            CREATE TRIGGER {table.lower()}_log_insert AFTER INSERT ON {table} BEGIN
+                {new}
+            END;
+            -- Only real changes; re-importing an unchanged price list logs nothing
+            CREATE TRIGGER {table.lower()}_log_update AFTER UPDATE OF {stock}, {price}, {part_id}, supplier_id ON {table}
+            WHEN NEW.{stock} IS NOT OLD.{stock} OR NEW.{price} IS NOT OLD.{price}
+                OR NEW.{part_id} != OLD.{part_id} OR NEW.supplier_id != OLD.supplier_id BEGIN
+                {new}
+            END;
+            -- An offer moved to another part or supplier is gone from its old key
+            CREATE TRIGGER {table.lower()}_log_rekey AFTER UPDATE OF {part_id}, supplier_id ON {table}
+            WHEN NEW.{part_id} != OLD.{part_id} OR NEW.supplier_id != OLD.supplier_id BEGIN
+                {old}
+            END;
+            CREATE TRIGGER {table.lower()}_log_delete AFTER DELETE ON {table} BEGIN
+                {old}
+            END;
+        ''')
+
+def skewed_counts(total, parts, limit, rng):
+    """Offer counts per part summing to about total, Zipf-skewed and between 1 and limit each"""
+    weights = [1 / rank ** OFFER_SKEW for rank in range(1, parts + 1)]
+    total = min(max(total, parts), parts * limit)
+
+    # Clamping the head to limit loses offers, so search for the scale that hits the total
+    low, high = 0, total / weights[-1]
+    for _ in range(50):
+        scale = (low + high) / 2
+        if sum(max(1, min(limit, round(weight * scale))) for weight in weights) < total:
+            low = scale
+        else:
+            high = scale
+    counts = [max(1, min(limit, round(weight * high))) for weight in weights]
+    rng.shuffle(counts)  # Popularity is unrelated to id order
+    return counts
+
+def part_names(count, rng):
+    """count distinct part names drawn from PART_FAMILIES"""
+    for part_id in range(1, count + 1):
+        prefixes, suffixes = rng.choice(PART_FAMILIES)
+        # The id keeps names unique, like a supplier's order code
+        yield (f"{rng.choice(prefixes)}{rng.choice(suffixes)} {rng.choice(MANUFACTURERS)}-{part_id:06d}",)
+
+def offer_rows(counts, base_prices, suppliers, rng):
+    """(stock, price, part id, supplier id) rows, each part offered by distinct suppliers"""
+    for part_id, (count, base_price) in enumerate(zip(counts, base_prices), start=1):
+        for supplier_id in rng.sample(range(1, suppliers + 1), count):
+            # 10% out of stock, 20% low (1-10), the rest 11-500; random() is far cheaper than randint()
+            roll = rng.random()
+            stock = 0 if roll < 0.1 else 1 + int(roll * 50) % 10 if roll < 0.3 else 11 + int(rng.random() * 490)
+            yield stock, round(base_price * (0.85 + 0.45 * rng.random()), 2), part_id, supplier_id
+
+def generate_catalog(conn, components=SYNTHETIC_COMPONENTS, suppliers=SYNTHETIC_SUPPLIERS, offers=SYNTHETIC_OFFERS,
+                     practicals=SYNTHETIC_PRACTICALS, students=SYNTHETIC_STUDENTS, seed=SYNTHETIC_SEED):
+    """Fill a freshly created schema with a deterministic synthetic catalog, using bulk inserts"""
+    from werkzeug.security import generate_password_hash
+
+    started = time.perf_counter()
+    rng = random.Random(seed)
+    alternatives = max(1, components // 5)
+    cursor = conn.cursor()
+    conn.commit()
+    # The file is being built from scratch, so a crash just means running this again
+    cursor.execute('PRAGMA journal_mode = OFF')
+    cursor.execute('PRAGMA synchronous = OFF')
+    cursor.execute('PRAGMA cache_size = -262144')  # 256 MB, so index pages stay cached during the build
+
+    cursor.executemany('INSERT INTO Practical (prac_name) VALUES (?)', (
+        (f"Practical {number} - {PRACTICAL_TOPICS[(number - 1) % len(PRACTICAL_TOPICS)]}",)
+        for number in range(1, practicals + 1)))
+
+    supplier_rows = []
+    for supplier_id in range(1, suppliers + 1):
+        online = rng.random() < 0.4
+        name = f"{rng.choice(SUPPLIER_WORDS[0])}{rng.choice(SUPPLIER_WORDS[1])} {supplier_id}"
+        supplier_rows.append((name, 'Online' if online else rng.choice(CITIES), 'online' if online else 'physical'))
+    cursor.executemany('INSERT INTO Supplier (supplier_name, supplier_location, store_type) VALUES (?, ?, ?)',
+                       supplier_rows)
+
+    cursor.executemany('INSERT INTO Components (component_name) VALUES (?)', part_names(components, rng))
+    cursor.executemany('INSERT INTO Alt_components (alt_component_name) VALUES (?)', part_names(alternatives, rng))
+
+    # Prices are log-normal around R5: most parts are cheap, a few cost hundreds
+    component_counts = skewed_counts(offers, components, suppliers, rng)
+    component_prices = [math.exp(rng.gauss(math.log(5), 1.2)) for _ in range(components)]
+    cursor.executemany('''
+        INSERT INTO Supplier_components (quantity_in_stock, price_component_per_supplier, component_id, supplier_id)
+        VALUES (?, ?, ?, ?)
+    ''', offer_rows(component_counts, component_prices, suppliers, rng))
+
+    alt_counts = skewed_counts(offers // 10, alternatives, suppliers, rng)
+    alt_prices = [math.exp(rng.gauss(math.log(5), 1.2)) for _ in range(alternatives)]
+    cursor.executemany('''
+        INSERT INTO Supplier_alt_components (alt_quantity_in_stock, alt_price_component_per_supplier, alt_component_id, supplier_id)
+        VALUES (?, ?, ?, ?)
+    ''', offer_rows(alt_counts, alt_prices, suppliers, rng))
+
+    # BOMs mostly reuse the popular parts, so practicals share many components
+    by_popularity = sorted(range(1, components + 1), key=lambda part_id: -component_counts[part_id - 1])
+    core = by_popularity[:max(1, int(components * BOM_CORE_FRACTION))]
+    bom_rows = []
+    for number in range(1, practicals + 1):
+        bom = set()
+        for _ in range(rng.randint(6, 30)):
+            bom.add(rng.choice(core) if rng.random() < BOM_CORE_PICKS else rng.randint(1, components))
+        for component_id in sorted(bom):
+            alt_component_id = rng.randint(1, alternatives) if rng.random() < 0.25 else None
+            quantity = 1 if rng.random() < 0.7 else rng.randint(2, 5)
+            bom_rows.append((quantity, component_id, number, alt_component_id))
+    cursor.executemany('''
+        INSERT INTO Practical_component (quantity, component_id, practical_number, alt_component_id)
+        VALUES (?, ?, ?, ?)
+    ''', bom_rows)
+
+    # One hash shared by every account; hashing per student would dominate the build
+    password_hash = generate_password_hash(SYNTHETIC_PASSWORD)
+    cursor.executemany('INSERT INTO Student (full_name, email_address, password_hash) VALUES (?, ?, ?)', (
+        (f"Student {number}", f"student{number}@example.com", password_hash) for number in range(1, students + 1)))
+
+    conn.commit()
+    cursor.execute('ANALYZE')
+    cursor.execute('PRAGMA journal_mode = DELETE')
+
+    print(f"Synthetic catalog (seed {seed}) generated in {time.perf_counter() - started:.1f}s:")
+    for table in ('Practical', 'Supplier', 'Components', 'Alt_components', 'Supplier_components',
+                  'Supplier_alt_components', 'Practical_component', 'Student'):
+        print(f"- {table}: {cursor.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]:,} rows")
+    print(f"Student accounts: student<N>@example.com, password {SYNTHETIC_PASSWORD!r}")
+
 if __name__ == '__main__':
-    create_database()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Create the database with the sample data or a synthetic catalog')
+    parser.add_argument('--database', default='practical_management.db', help='database file to (re)create')
+    parser.add_argument('--synthetic', action='store_true', help='generate a large catalog instead of the sample data')
+    parser.add_argument('--components', type=int, default=SYNTHETIC_COMPONENTS)
+    parser.add_argument('--suppliers', type=int, default=SYNTHETIC_SUPPLIERS)
+    parser.add_argument('--offers', type=int, default=SYNTHETIC_OFFERS, help='supplier offers for components')
+    parser.add_argument('--practicals', type=int, default=SYNTHETIC_PRACTICALS)
+    parser.add_argument('--students', type=int, default=SYNTHETIC_STUDENTS)
+    parser.add_argument('--seed', type=int, default=SYNTHETIC_SEED)
+    args = parser.parse_args()
+
+    synthetic = None
+    if args.synthetic:
+        synthetic = {'components': args.components, 'suppliers': args.suppliers, 'offers': args.offers,
+                     'practicals': args.practicals, 'students': args.students, 'seed': args.seed}
+    create_database(args.database, synthetic)
\ No newline at end of file
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Load test for the Flask app
+Replays the student session flow against a running server with many
+concurrent virtual students and reports latency per route
+
+Start the server first (python app.py), then for example:
+    python loadtest.py --users 200 --concurrency 50 --out results.json
+    python loadtest.py --users 200 --concurrency 50 --compare results.json
+
+Every virtual student signs up (or logs in, if the account exists from an
+earlier run), loads the main page and catalog like loadPracticals(), applies a
+filter, reserves a cart, opens the exit page, exports the PDF, submits
+feedback and finally cancels the reservation so repeated runs don't drain
+stock. Login admission control allows a burst of LOGIN_IP_BURST attempts from
+one address, so raise LOGIN_IP_BURST/LOGIN_IP_RATE on the server for runs
+with more students than that.
+"""
+
+import argparse
+import http.client
+import json
+import random
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+PASSWORD = 'loadtest-password'
+PERCENTILES = (50, 95, 99)
+FILTERS = [{}, {'min_price': 0, 'max_price': 10}, {'min_price': 10, 'max_price': 25}, {'min_price': 25},
+           {'store_type': 'online'}, {'store_type': 'physical'}]
+
+class Student:
+    """One virtual student: a keep-alive connection and its session cookie"""
+
+    def __init__(self, host, port, timings, timeout):
+        self.conn = http.client.HTTPConnection(host, port, timeout=timeout)
+        self.host, self.port, self.timeout = host, port, timeout
+        self.timings = timings
+        self.cookie = None
+
+    def request(self, route, method, path, body=None, form=None):
+        """Send one request, record its latency under route; returns (status, headers, body)"""
+        headers = {}
+        if self.cookie:
+            headers['Cookie'] = f'session={self.cookie}'
+        if form is not None:
+            body = urlencode(form)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        elif body is not None:
+            body = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+
+        start = time.perf_counter()
+        try:
+            self.conn.request(method, path, body=body, headers=headers)
+            response = self.conn.getresponse()
+            data = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            # Count it as status 0 and reconnect for the next request
+            self.conn.close()
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self.timings.record(route, 0, time.perf_counter() - start)
+            return 0, {}, b''
+        self.timings.record(route, status, time.perf_counter() - start)
+
+        cookie = SimpleCookie(response.getheader('Set-Cookie', ''))
+        if 'session' in cookie:
+            self.cookie = cookie['session'].value
+        return status, dict(response.getheaders()), data
+
+    def json(self, route, method, path, body=None):
+        status, _, data = self.request(route, method, path, body)
+        try:
+            return status, json.loads(data)
+        except ValueError:
+            return status, None
+
+class Timings:
+    """Latencies and status codes per route, shared by all students"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.statuses = {}
+
+    def record(self, route, status, seconds):
+        with self.lock:
+            self.latencies.setdefault(route, []).append(seconds)
+            counts = self.statuses.setdefault(route, {})
+            counts[status] = counts.get(status, 0) + 1
+
+def percentile(ordered, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    return ordered[min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))]
+
+def build_cart(catalog, practical, size, rng):
+    """Pick size offers from a practical's catalog, shaped like main.html's cart items"""
+    offers = []
+    for component in catalog.get(str(practical), []):
+        for supplier in component['suppliers']:
+            offers.append(('component', component['component_id'], component['component_name'], supplier))
+        for supplier in component['alt_suppliers']:
+            offers.append(('alternative', component['alt_component_id'], component['alt_component_name'], supplier))
+
+    in_stock = [offer for offer in offers if offer[3]['stock_level'] != 'out'] or offers
+    cart = []
+    for part_type, part_id, name, supplier in rng.sample(in_stock, min(size, len(in_stock))):
+        prefix = 'alt_' if part_type == 'alternative' else ''
+        cart.append({
+            'id': f"{prefix}{part_id}_{supplier['supplier_id']}",
+            'name': f"{name} - {supplier['supplier_name']}",
+            'price': supplier['price'],
+            'store': f"{supplier['supplier_name']} ({supplier['supplier_location']})",
+            'part_type': part_type,
+            'part_id': part_id,
+            'supplier_id': supplier['supplier_id'],
+            'quantity': 1
+        })
+    return cart
+
+def run_session(index, args, host, port, timings):
+    """Replay one student's visit; returns True if every step succeeded"""
+    rng = random.Random(args.seed * 100003 + index)
+    student = Student(host, port, timings, args.timeout)
+    email = f'loadtest-{index}@example.com'
+
+    def think():
+        if args.think:
+            time.sleep(rng.uniform(0, 2 * args.think))
+
+    try:
+        # Sign up; an account left by an earlier run redirects back to /signup
+        status, headers, _ = student.request('POST /signup', 'POST', '/signup', form={
+            'fullname': f'Load Test {index}', 'email': email, 'password': PASSWORD})
+        if not headers.get('Location', '').endswith('/main'):
+            status, headers, _ = student.request('POST /login', 'POST', '/login', form={
+                'email': email, 'password': PASSWORD})
+            if not headers.get('Location', '').endswith('/main'):
+                return False
+        student.request('GET /main', 'GET', '/main')
+
+        # loadPracticals(): the practical list, then every practical's catalog in one request
+        status, practicals = student.json('GET /api/practicals', 'GET', '/api/practicals')
+        if status != 200 or not practicals:
+            return False
+        numbers = [p['prac_number'] for p in practicals]
+        status, catalog = student.json('GET /api/catalog', 'GET',
+                                       '/api/catalog?practicals=' + ','.join(map(str, numbers)))
+        if status != 200:
+            return False
+        think()
+
+        # applyFilters() on one tab, then back to the unfiltered catalog via switchTab()
+        practical = rng.choice(numbers)
+        query = urlencode(rng.choice(FILTERS[1:]))
+        student.request('GET /api/practical/<n>/catalog', 'GET', f'/api/practical/{practical}/catalog?{query}')
+        student.request('GET /api/practical/<n>/catalog', 'GET', f'/api/practical/{practical}/catalog?')
+        think()
+
+        cart = build_cart(catalog, practical, args.cart_size, rng)
+        status, result = student.json('POST /complete_practical', 'POST', '/complete_practical',
+                                      {'cart': cart, 'practical': practical})
+        if status != 200:
+            return False
+        student.request('GET /exit', 'GET', '/exit')
+        think()
+
+        ok = True
+        if args.export:
+            status, job = student.json('POST /export_pdf', 'POST', '/export_pdf',
+                                       {'components': cart, 'student_email': email})
+            if status == 202:
+                deadline = time.monotonic() + args.timeout
+                while time.monotonic() < deadline:
+                    status, job = student.json('GET /export_pdf/<job_id>', 'GET', job['status_url'])
+                    if status != 200 or job['status'] != 'queued' and job['status'] != 'running':
+                        break
+                    time.sleep(args.poll_interval)
+                if status == 200 and job['status'] == 'done':
+                    student.request('GET /export_pdf/<job_id>/download', 'GET', job['download_url'])
+                else:
+                    ok = False
+            else:
+                ok = False
+
+        status, _ = student.json('POST /submit_feedback', 'POST', '/submit_feedback', {
+            'rating': rng.randint(1, 5), 'feedback': 'Load test session'})
+        ok = ok and status == 200
+
+        if args.release:
+            status, reservations = student.json('GET /api/reservations', 'GET', '/api/reservations')
+            for reservation in reservations or []:
+                if reservation['status'] == 'active':
+                    student.request('DELETE /api/reservations/<id>', 'DELETE',
+                                    f"/api/reservations/{reservation['reservation_id']}")
+        return ok
+    finally:
+        student.conn.close()
+
+def summarize(timings, elapsed):
+    """Per-route count, throughput, status codes and latency percentiles in milliseconds"""
+    routes = {}
+    for route, latencies in sorted(timings.latencies.items()):
+        ordered = sorted(latencies)
+        stats = {
+            'count': len(ordered),
+            'throughput': round(len(ordered) / elapsed, 2),
+            'statuses': {str(status): n for status, n in sorted(timings.statuses[route].items())},
+            'mean_ms': round(sum(ordered) / len(ordered) * 1000, 2),
+            'max_ms': round(ordered[-1] * 1000, 2)
+        }
+        for pct in PERCENTILES:
+            stats[f'p{pct}_ms'] = round(percentile(ordered, pct) * 1000, 2)
+        routes[route] = stats
+    return routes
+
+def git_revision():
+    """Current commit of the working tree, so results can be matched to code"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_report(results, baseline=None):
+    print(f"\n{results['sessions']['completed']}/{results['sessions']['total']} sessions completed in "
+          f"{results['elapsed_s']:.1f} s ({results['sessions']['per_second']:.2f} sessions/s, "
+          f"{results['requests_per_second']:.1f} requests/s)")
+    print(f"{'route':38} {'count':>6} {'req/s':>7} {'p50':>8} {'p95':>8} {'p99':>8}  statuses")
+    for route, stats in results['routes'].items():
+        line = (f"{route:38} {stats['count']:6} {stats['throughput']:7.1f} {stats['p50_ms']:8.1f} "
+                f"{stats['p95_ms']:8.1f} {stats['p99_ms']:8.1f}  {stats['statuses']}")
+        before = (baseline or {}).get('routes', {}).get(route)
+        if before:
+            line += f"  (p95 {stats['p95_ms'] - before['p95_ms']:+.1f}, p99 {stats['p99_ms'] - before['p99_ms']:+.1f} ms)"
+        print(line)
+    if baseline:
+        print(f"Compared against {baseline.get('revision')} from {baseline.get('started_at')}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay the student session flow against a running server')
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='server to test')
+    parser.add_argument('--users', type=int, default=50, help='student sessions to run in total')
+    parser.add_argument('--concurrency', type=int, default=10, help='sessions running at once')
+    parser.add_argument('--cart-size', type=int, default=3, help='offers each student reserves')
+    parser.add_argument('--think', type=float, default=0, help='mean pause in seconds between page steps')
+    parser.add_argument('--poll-interval', type=float, default=0.5, help='seconds between export status polls')
+    parser.add_argument('--timeout', type=float, default=60, help='seconds before a request or export gives up')
+    parser.add_argument('--no-export', dest='export', action='store_false', help='skip the PDF export step')
+    parser.add_argument('--keep-reservations', dest='release', action='store_false',
+                        help='leave reservations active instead of cancelling them')
+    parser.add_argument('--seed', type=int, default=1, help='random seed for carts, filters and ratings')
+    parser.add_argument('--out', help='write results as JSON to this file')
+    parser.add_argument('--compare', help='earlier results JSON to report latency changes against')
+    args = parser.parse_args()
+
+    url = urlsplit(args.url)
+    host, port = url.hostname, url.port or 80
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    timings = Timings()
+    started_at = datetime.now().isoformat(timespec='seconds')
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        outcomes = list(pool.map(lambda i: run_session(i, args, host, port, timings), range(args.users)))
+    elapsed = time.perf_counter() - start
+
+    routes = summarize(timings, elapsed)
+    results = {
+        'revision': git_revision(),
+        'started_at': started_at,
+        'url': args.url,
+        'options': {k: v for k, v in vars(args).items() if k not in ('out', 'compare')},
+        'elapsed_s': round(elapsed, 3),
+        'sessions': {'total': args.users, 'completed': sum(outcomes),
+                     'per_second': round(sum(outcomes) / elapsed, 2)},
+        'requests_per_second': round(sum(r['count'] for r in routes.values()) / elapsed, 2),
+        'routes': routes
+    }
+    print_report(results, baseline)
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.out}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Production server for the Flask app
+Runs app.create_app() under gunicorn: one master process imports the app
+once (preload) and forks worker processes, each serving requests on a pool of
+threads. python app.py is the development server only.
+
+    python serve.py --workers 4 --threads 64 --bind 0.0.0.0:8000 --pid serve.pid
+
+Signals to the master process:
+    HUP   replace the workers gracefully; in-flight requests finish first.
+          Workers fork from the preloaded master, so this re-reads settings
+          but not code
+    USR2  start a new master and workers on the current code next to the
+          old ones; then send TERM to the old master (the pid read before
+          USR2) to hand over without refusing connections
+    TERM  graceful shutdown
+
+See "Running in production" in README.md for sizing workers and threads.
+"""
+
+import argparse
+import os
+import sys
+
+try:
+    from gunicorn.app.base import BaseApplication
+except ImportError:
+    BaseApplication = None
+
+DEFAULT_WORKERS = min(os.cpu_count() or 1, 4)  # Past a few processes, writers mostly wait on SQLite's lock
+DEFAULT_THREADS = 64  # Every open /api/stream holds a thread for as long as the page stays open
+REQUEST_THREADS = 16  # Threads per worker kept free of event streams for ordinary requests
+
+def stream_limit(threads):
+    """Open event streams allowed per worker, so streams can't take every thread"""
+    return max(threads - REQUEST_THREADS, threads // 2)
+
+if BaseApplication is not None:
+    class Server(BaseApplication):
+        """gunicorn application serving create_app(config) with the given settings"""
+
+        def __init__(self, config, options):
+            self.config_name = config
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from app import create_app
+            return create_app(self.config_name)
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the app with preforked gunicorn workers')
+    parser.add_argument('--bind', default='127.0.0.1:5000', help='address to listen on, host:port')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='worker processes')
+    parser.add_argument('--threads', type=int, default=DEFAULT_THREADS, help='request threads per worker')
+    parser.add_argument('--config', default=os.environ.get('APP_CONFIG', 'production'),
+                        choices=('production', 'development', 'testing'), help='config class for create_app()')
+    parser.add_argument('--graceful-timeout', type=int, default=15,
+                        help='seconds stopping workers get to finish requests; live streams are cut after this')
+    parser.add_argument('--pid', help='write the master process id to this file')
+    parser.add_argument('--access-log', help="request log file, '-' for stdout")
+    args = parser.parse_args()
+
+    if BaseApplication is None:
+        print("gunicorn is not installed (pip install gunicorn); it needs a POSIX system. "
+              "On other systems run app.py for development.")
+        sys.exit(1)
+
+    # Read by app.py when the master preloads it; an explicit setting wins
+    os.environ.setdefault('SSE_MAX_SUBSCRIBERS', str(stream_limit(args.threads)))
+    Server(args.config, {
+        'bind': args.bind,
+        'workers': args.workers,
+        'threads': args.threads,
+        'worker_class': 'gthread',
+        'preload_app': True,
+        'graceful_timeout': args.graceful_timeout,
+        'pidfile': args.pid,
+        'accesslog': args.access_log,
+        'proc_name': 'component-compass'
+    }).run()
+
+if __name__ == '__main__':
+    main()
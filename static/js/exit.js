@@ -0,0 +1,157 @@
+// Initialize template data from Flask
+const CART_ITEMS = JSON.parse(document.getElementById('cart-data').textContent);
+const USER_EMAIL = JSON.parse(document.getElementById('user-data').textContent);
+
+let currentRating = 0;
+
+function setRating(rating) {
+    currentRating = rating;
+    const stars = document.querySelectorAll('.star');
+    stars.forEach((star, index) => {
+        if (index < rating) {
+            star.classList.add('active');
+        } else {
+            star.classList.remove('active');
+        }
+    });
+}
+
+function submitReview() {
+    const feedback = document.getElementById('feedbackText').value;
+    const confirmationMessage = document.getElementById('confirmationMessage');
+
+    // Validate that user provided at least a rating
+    if (currentRating === 0) {
+        alert('Please provide a rating before submitting your review.');
+        return;
+    }
+
+    // Send feedback to backend
+    fetch('/submit_feedback', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+            rating: currentRating,
+            feedback: feedback
+        })
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            // Show confirmation message
+            confirmationMessage.style.display = 'block';
+
+            // Clear the form
+            document.getElementById('feedbackText').value = '';
+            setRating(0);
+
+            // Hide the confirmation message after 3 seconds
+            setTimeout(() => {
+                confirmationMessage.style.display = 'none';
+            }, 3000);
+        } else {
+            alert('Error saving feedback: ' + data.message);
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        alert('Error submitting feedback. Please try again.');
+    });
+}
+
+function exportPDF() {
+    // Use global variables set from Flask template
+    const components = CART_ITEMS;
+    const studentEmail = USER_EMAIL;
+
+    // Render the PDF in this request; the server answers 202 and a status URL to poll if it takes long.
+    // Waiting here keeps the download on the worker process that holds the job
+    fetch('/export_pdf?stream=1', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+            components: components,
+            student_email: studentEmail
+        })
+    })
+    .then(response => {
+        if (response.status === 200) {
+            return response.blob().then(blob => saveDownload(blob, response.headers.get('Content-Disposition')));
+        }
+        return response.json().then(data => {
+            if (data.success) {
+                waitForExport(data.status_url);
+            } else {
+                alert('Error exporting PDF: ' + data.message);
+            }
+        });
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        alert('Error exporting PDF. Please try again.');
+    });
+}
+
+function saveDownload(blob, disposition) {
+    const match = /filename="?([^";]+)"?/.exec(disposition || '');
+    const link = document.createElement('a');
+    link.href = URL.createObjectURL(blob);
+    link.download = match ? match[1] : 'reservation.pdf';
+    document.body.appendChild(link);
+    link.click();
+    link.remove();
+    setTimeout(() => URL.revokeObjectURL(link.href), 1000);
+}
+
+function waitForExport(statusUrl) {
+    fetch(statusUrl)
+    .then(response => response.json())
+    .then(data => {
+        if (!data.success) {
+            alert('Error exporting PDF: ' + data.message);
+        } else if (data.status === 'done') {
+            window.location.href = data.download_url;
+        } else if (data.status === 'failed') {
+            alert('Error exporting PDF: ' + data.error);
+        } else {
+            setTimeout(() => waitForExport(statusUrl), 500);
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        alert('Error exporting PDF. Please try again.');
+    });
+}
+
+function goBackToMain() {
+    window.location.href = '/main';
+}
+
+// Set current date and collection date
+function setDates() {
+    const now = new Date();
+    const collectionDate = new Date(now);
+    collectionDate.setDate(now.getDate() + 3);
+
+    const formatOptions = { 
+        year: 'numeric', 
+        month: 'long', 
+        day: 'numeric' 
+    };
+
+    document.getElementById('currentDate').textContent = now.toLocaleDateString('en-US', formatOptions);
+    document.getElementById('collectionDate').textContent = collectionDate.toLocaleDateString('en-US', formatOptions);
+}
+
+// Initialize dates when page loads
+document.addEventListener('DOMContentLoaded', function() {
+    setDates();
+
+    // Debug: Check if cart data was passed correctly
+    console.log('Cart items received:', CART_ITEMS);
+    console.log('User email:', USER_EMAIL);
+});
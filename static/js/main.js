@@ -0,0 +1,468 @@
+let cart = [];
+// Sent with the cart so a resubmitted cart is not reserved twice; a new cart gets a new key
+let reservationKey = null;
+let currentTab = null;
+let practicalData = {};
+let practicals = [];
+let selectedComponent = null;
+
+// Load practicals from database on page load
+async function loadPracticals() {
+    try {
+        const response = await fetch('/api/practicals');
+        practicals = await response.json();
+
+        // Create tab buttons dynamically
+        const headerNav = document.querySelector('.header-nav');
+        headerNav.innerHTML = ''; // Clear existing tabs
+
+        practicals.forEach((practical, index) => {
+            const tabButton = document.createElement('div');
+            tabButton.className = 'nav-tab';
+            tabButton.textContent = practical.prac_name;
+            tabButton.onclick = () => switchTab(practical.prac_number, practical.prac_name);
+            headerNav.appendChild(tabButton);
+
+            // Set first practical as default
+            if (index === 0) {
+                currentTab = practical.prac_number;
+            }
+        });
+
+        // Read the change feed version first, so no stock change between it and the catalog is missed
+        const practicalNumbers = practicals.map(practical => practical.prac_number).join(',');
+        const versionResponse = await fetch('/api/changes');
+        const { version } = await versionResponse.json();
+
+        await loadCatalog(practicalNumbers);
+        watchStock(practicalNumbers, version);
+
+    } catch (error) {
+        console.error('Error loading practicals:', error);
+        // Show error message to user
+        const headerNav = document.querySelector('.header-nav');
+        headerNav.innerHTML = '<div style="color: red; padding: 10px;">Error loading practicals. Please ensure database is initialized.</div>';
+    }
+}
+
+// Load data for all practicals in a single catalog request
+async function loadCatalog(practicalNumbers) {
+    const catalogResponse = await fetch(`/api/catalog?practicals=${practicalNumbers}`);
+    const catalog = await catalogResponse.json();
+
+    for (const practical of practicals) {
+        storePracticalData(practical.prac_number, practical.prac_name, catalog[practical.prac_number] || []);
+    }
+}
+
+// Live stock and price updates: the server pushes changed offers and
+// the tiles showing them are patched in place
+let stockVersion = null;
+
+function watchStock(practicalNumbers, version) {
+    stockVersion = version;
+    const stream = new EventSource(`/api/stream?practicals=${practicalNumbers}&since=${version}`);
+
+    stream.addEventListener('offers', event => {
+        const update = JSON.parse(event.data);
+        update.changes.forEach(applyOfferChange);
+        stockVersion = update.version;
+    });
+
+    // Too much changed at once (e.g. a price list import): reload instead
+    stream.addEventListener('reset', async () => {
+        await loadCatalog(practicalNumbers);
+        if (currentTab !== null && document.getElementById('practicalContent').style.display === 'block') {
+            await applyFilters();
+        }
+    });
+
+    // The browser reconnects dropped streams itself; a refused one (e.g. the server is busy) is retried here
+    stream.onerror = () => {
+        if (stream.readyState === EventSource.CLOSED) {
+            setTimeout(() => watchStock(practicalNumbers, stockVersion), 30000);
+        }
+    };
+}
+
+function applyOfferChange(change) {
+    const id = `${change.part_type === 'alternative' ? 'alt_' : ''}${change.part_id}_${change.supplier_id}`;
+    const tile = tiles[id];
+    if (!tile) {
+        return; // Not an offer this page shows; new offers appear on the next load
+    }
+
+    if (change.deleted) {
+        tile.stock = 'Out of Stock';
+        tile.stockLevel = 'out';
+    } else {
+        tile.price = change.price;
+        tile.stock = change.stock_status;
+        tile.stockLevel = change.stock_level;
+    }
+    patchTile(tile);
+}
+
+// Update every rendered copy of a tile without re-rendering the panel
+function patchTile(tile) {
+    document.querySelectorAll(`[data-tile-id="${tile.id}"]`).forEach(element => {
+        element.dataset.price = tile.price;
+        element.querySelector('.component-price').textContent = `$${tile.price}`;
+
+        const stock = element.querySelector('.component-stock');
+        stock.className = `component-stock ${stockClass(tile.stockLevel)}`;
+        stock.textContent = tile.stock;
+
+        const button = element.querySelector('.add-btn');
+        const out = tile.stockLevel === 'out';
+        button.disabled = out;
+        button.style.background = out ? '#ccc' : '';
+        button.style.cursor = out ? 'not-allowed' : '';
+    });
+}
+
+function stockClass(stockLevel) {
+    return stockLevel === 'high' ? 'in-stock' : stockLevel === 'low' ? 'low-stock' : 'out-of-stock';
+}
+
+// Load components and suppliers for a specific practical, optionally filtered by the server
+async function loadPracticalData(pracNumber, pracName, filterQuery = '') {
+    try {
+        const response = await fetch(`/api/practical/${pracNumber}/catalog?${filterQuery}`);
+        const components = await response.json();
+        storePracticalData(pracNumber, pracName, components, filterQuery);
+    } catch (error) {
+        console.error(`Error loading practical ${pracNumber} data:`, error);
+    }
+}
+
+// Convert a supplier offer from the catalog API into a component tile
+// Tiles by id, so the cart can record exactly which offer was added.
+// An offer listed by several practicals shares one tile object, so a
+// live update reaches all of them.
+const tiles = {};
+
+function toTile(id, name, supplier, partType, partId) {
+    return tiles[id] = Object.assign(tiles[id] || {}, {
+        id: id,
+        partType: partType,
+        partId: partId,
+        supplierId: supplier.supplier_id,
+        name: `${name} - ${supplier.supplier_name}`,
+        price: supplier.price,
+        store: `${supplier.supplier_name} (${supplier.supplier_location})`,
+        storeType: supplier.store_type,
+        stock: supplier.stock_status,
+        stockLevel: supplier.stock_level
+    });
+}
+
+// Build the practical data used by the panels from catalog components
+function storePracticalData(pracNumber, pracName, components, filterQuery = '') {
+    const practicalComponents = {};
+    const alternatives = [];
+
+    for (const component of components) {
+        practicalComponents[component.component_name] = {
+            description: `Required quantity: ${component.quantity}`,
+            components: component.suppliers.map(supplier =>
+                toTile(`${component.component_id}_${supplier.supplier_id}`, component.component_name, supplier,
+                       'component', component.component_id))
+        };
+
+        alternatives.push(...component.alt_suppliers.map(supplier =>
+            toTile(`alt_${component.alt_component_id}_${supplier.supplier_id}`, component.alt_component_name, supplier,
+                   'alternative', component.alt_component_id)));
+    }
+
+    practicalData[pracNumber] = {
+        title: pracName,
+        requiredComponents: practicalComponents,
+        alternatives: alternatives,
+        filterQuery: filterQuery
+    };
+}
+
+// Dynamic data loading functions
+
+// All practical data is now loaded dynamically from the database
+
+async function switchTab(pracNumber, pracName) {
+    currentTab = pracNumber;
+    selectedComponent = null;
+
+    // Update tab active state
+    document.querySelectorAll('.nav-tab').forEach(tab => tab.classList.remove('active'));
+    event.target.classList.add('active');
+
+    // Show practical content
+    document.getElementById('welcomeContent').style.display = 'none';
+    document.getElementById('practicalContent').style.display = 'block';
+
+    // Filters are reset below, so reload the full catalog if this practical was filtered
+    if (practicalData[pracNumber] && practicalData[pracNumber].filterQuery) {
+        await loadPracticalData(pracNumber, pracName);
+    }
+
+    // Update content
+    const data = practicalData[pracNumber];
+    if (data) {
+        document.getElementById('sectionTitle').textContent = data.title;
+
+        // Load component list in left panel
+        loadComponentList(data.requiredComponents);
+
+        // Reset right panel
+        resetRightPanel();
+
+        // Reset filters
+        document.getElementById('priceFilter').value = 'all';
+        document.getElementById('storeFilter').value = 'all';
+    }
+}
+
+function loadComponents(components, gridId) {
+    const grid = document.getElementById(gridId);
+    grid.innerHTML = '';
+
+    components.forEach(component => {
+        const tile = createComponentTile(component);
+        grid.appendChild(tile);
+    });
+}
+
+function loadComponentList(requiredComponents) {
+    const list = document.getElementById('componentList');
+    list.innerHTML = '';
+
+    Object.keys(requiredComponents).forEach(componentName => {
+        const listItem = document.createElement('li');
+        listItem.className = 'component-list-item';
+        listItem.textContent = componentName;
+        listItem.onclick = () => selectComponent(componentName, requiredComponents[componentName]);
+        list.appendChild(listItem);
+    });
+}
+
+function selectComponent(componentName, componentData) {
+    // Update active state in left panel
+    document.querySelectorAll('.component-list-item').forEach(item => {
+        item.classList.remove('active');
+    });
+    event.target.classList.add('active');
+    selectedComponent = componentName;
+
+    // Load component details in right panel
+    loadComponentDetails(componentName, componentData);
+}
+
+function loadComponentDetails(componentName, componentData) {
+    const detailsContainer = document.getElementById('componentDetails');
+    detailsContainer.innerHTML = `
+        <h2 class="panel-title" style="font-size: 24px; margin-bottom: 8px;">${componentName}</h2>
+        <p class="component-description">${componentData.description}</p>
+        <div class="component-details-grid">
+            ${componentData.components.map(component => createComponentDetailTile(component)).join('')}
+        </div>
+    `;
+
+    // Show alternatives section in right panel
+    const data = practicalData[currentTab];
+    if (data && data.alternatives && data.alternatives.length > 0) {
+        loadComponents(data.alternatives, 'alternativesGrid');
+        document.getElementById('alternativesSection').style.display = 'block';
+        document.getElementById('alternativesDivider').style.display = 'block';
+    } else {
+        document.getElementById('alternativesSection').style.display = 'none';
+        document.getElementById('alternativesDivider').style.display = 'none';
+    }
+}
+
+function createComponentDetailTile(component) {
+    return `
+        <div class="component-detail-tile" data-tile-id="${component.id}" data-price="${component.price}" data-store-type="${component.storeType}">
+            <div class="component-header">
+                <h3 class="component-name">${component.name}</h3>
+                <button class="add-btn" onclick="addToCart('${component.id}')" 
+                        ${component.stockLevel === 'out' ? 'disabled style="background: #ccc; cursor: not-allowed;"' : ''}>
+                    +
+                </button>
+            </div>
+            <div class="component-details">
+                <div class="component-price">$${component.price}</div>
+                <div class="component-store">${component.store}</div>
+                <div class="component-stock ${stockClass(component.stockLevel)}">${component.stock}</div>
+            </div>
+        </div>
+    `;
+}
+
+function resetRightPanel() {
+    const detailsContainer = document.getElementById('componentDetails');
+    detailsContainer.innerHTML = `
+        <div class="no-component-selected">
+            <h3>Select a component</h3>
+            <p>Click on a component from the left panel to view available options</p>
+        </div>
+    `;
+
+    // Hide alternatives section
+    document.getElementById('alternativesSection').style.display = 'none';
+    document.getElementById('alternativesDivider').style.display = 'none';
+}
+
+function createComponentTile(component) {
+    const tile = document.createElement('div');
+    tile.className = 'component-tile';
+    tile.dataset.tileId = component.id;
+    tile.dataset.price = component.price;
+    tile.dataset.storeType = component.storeType;
+
+    tile.innerHTML = `
+        <div class="component-header">
+            <h3 class="component-name">${component.name}</h3>
+            <button class="add-btn" onclick="addToCart('${component.id}')" 
+                    ${component.stockLevel === 'out' ? 'disabled style="background: #ccc; cursor: not-allowed;"' : ''}>
+                +
+            </button>
+        </div>
+        <div class="component-details">
+            <div class="component-price">$${component.price}</div>
+            <div class="component-store">${component.store}</div>
+            <div class="component-stock ${stockClass(component.stockLevel)}">${component.stock}</div>
+        </div>
+    `;
+
+    return tile;
+}
+
+function addToCart(id) {
+    const tile = tiles[id];
+    cart.push({
+        id: id,
+        name: tile.name,
+        price: tile.price,
+        store: tile.store,
+        part_type: tile.partType,
+        part_id: tile.partId,
+        supplier_id: tile.supplierId,
+        quantity: 1
+    });
+    reservationKey = null;
+    updateCartBadge();
+
+    // Visual feedback
+    const button = event.target;
+    const originalText = button.textContent;
+    button.textContent = 'âœ“';
+    button.style.background = '#10B981';
+
+    setTimeout(() => {
+        button.textContent = originalText;
+        button.style.background = '#10B981';
+    }, 1000);
+}
+
+function updateCartBadge() {
+    const badge = document.getElementById('cartBadge');
+    badge.textContent = cart.length;
+    badge.classList.toggle('show', cart.length > 0);
+}
+
+// Build the catalog query string for the selected filters
+function filterQuery() {
+    const priceFilter = document.getElementById('priceFilter').value;
+    const storeFilter = document.getElementById('storeFilter').value;
+    const params = new URLSearchParams();
+
+    // Price ranges map to inclusive min/max prices
+    const priceRanges = { '0-10': [0, 10], '10-25': [10, 25], '25+': [25, null] };
+    if (priceRanges[priceFilter]) {
+        const [minPrice, maxPrice] = priceRanges[priceFilter];
+        params.set('min_price', minPrice);
+        if (maxPrice !== null) {
+            params.set('max_price', maxPrice);
+        }
+    }
+
+    if (storeFilter !== 'all') {
+        params.set('store_type', storeFilter);
+    }
+
+    return params.toString();
+}
+
+// Filtering happens on the server, so only matching offers are downloaded and rendered
+async function applyFilters() {
+    const data = practicalData[currentTab];
+    if (!data) {
+        return;
+    }
+
+    await loadPracticalData(currentTab, data.title, filterQuery());
+    const filtered = practicalData[currentTab];
+
+    // Re-render the component list and keep the selected component open
+    loadComponentList(filtered.requiredComponents);
+    if (selectedComponent && filtered.requiredComponents[selectedComponent]) {
+        document.querySelectorAll('.component-list-item').forEach(item => {
+            item.classList.toggle('active', item.textContent === selectedComponent);
+        });
+        loadComponentDetails(selectedComponent, filtered.requiredComponents[selectedComponent]);
+    } else {
+        resetRightPanel();
+    }
+}
+
+function completePractical() {
+    if (!reservationKey) {
+        reservationKey = Date.now().toString(36) + Math.random().toString(36).slice(2);
+    }
+    // Send cart data to backend before redirecting
+    fetch('/complete_practical', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'Idempotency-Key': `${reservationKey}-${currentTab}`
+        },
+        body: JSON.stringify({
+            cart: cart,
+            practical: currentTab
+        })
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            window.location.href = data.redirect;
+        } else {
+            // e.g. someone else reserved the last one first
+            alert('Could not reserve your components: ' + data.message);
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        // Fallback to direct redirect
+        window.location.href = '/exit';
+    });
+}
+
+function toggleCart() {
+    if (cart.length === 0) {
+        alert('Your cart is empty!');
+        return;
+    }
+
+    const cartItems = cart.map(item => `${item.name} - $${item.price}`).join('\n');
+    const total = cart.reduce((sum, item) => sum + item.price, 0).toFixed(2);
+    alert(`Cart Contents:\n${cartItems}\n\nTotal: $${total}`);
+}
+
+// Initialize welcome state on page load
+document.addEventListener('DOMContentLoaded', function() {
+    // Show welcome message by default
+    document.getElementById('welcomeContent').style.display = 'block';
+    document.getElementById('practicalContent').style.display = 'none';
+
+    // Load practicals from database
+    loadPracticals();
+});
@@ -0,0 +1,42 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+import init_db
+
+@pytest.fixture
+def database(tmp_path):
+    """A freshly created copy of the sample database"""
+    path = str(tmp_path / 'test.db')
+    init_db.create_database(path)
+    return path
+
+@pytest.fixture
+def app(database):
+    """The app in TestingConfig, pointed at the test database"""
+    class Config(app_module.TestingConfig):
+        DATABASE = database
+    return app_module.create_app(Config)
+
+@pytest.fixture
+def client(app):
+    """Test client logged in as student 1"""
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = 1
+        session['user_email'] = 'student@example.com'
+        session['user_fullname'] = 'Test Student'
+    return client
+
+@pytest.fixture
+def db(database):
+    """Direct connection to the test database, for setting up and checking state"""
+    conn = sqlite3.connect(database)
+    conn.row_factory = sqlite3.Row
+    yield conn
+    conn.close()
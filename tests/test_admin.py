@@ -0,0 +1,32 @@
+import logging
+
+import pytest
+
+import app as app_module
+
+TOKEN = 'test-admin-token'
+
+@pytest.fixture
+def admin_token(monkeypatch):
+    monkeypatch.setattr(app_module, 'IMPORT_TOKEN', TOKEN)
+    return TOKEN
+
+def test_sql_profile_is_disabled_without_a_token(client, monkeypatch):
+    monkeypatch.setattr(app_module, 'IMPORT_TOKEN', None)
+    assert client.get('/admin/sql_profile').status_code == 404
+
+@pytest.mark.parametrize('authorization', [None, 'Bearer wrong', TOKEN])
+def test_sql_profile_needs_the_admin_token(client, admin_token, authorization):
+    headers = {'Authorization': authorization} if authorization else {}
+    assert client.get('/admin/sql_profile', headers=headers).status_code == 401
+
+def test_sql_profile_with_the_admin_token(client, admin_token):
+    response = client.get('/admin/sql_profile', headers={'Authorization': f'Bearer {admin_token}'})
+    assert response.status_code == 200
+    assert 'statements' in response.get_json()
+
+def test_slow_queries_are_logged(client, monkeypatch, caplog):
+    monkeypatch.setattr(app_module.sql_profiler, 'threshold', 0)
+    with caplog.at_level(logging.WARNING, logger=app_module.app.logger.name):
+        assert client.get('/api/component/1/suppliers').status_code == 200
+    assert any(record.getMessage().startswith('Slow query (') for record in caplog.records)
@@ -0,0 +1,124 @@
+import random
+from itertools import combinations
+
+import pytest
+
+import app as app_module
+
+def offer(supplier_id, price, stock):
+    return {'supplier_id': supplier_id, 'price': price, 'quantity_in_stock': stock}
+
+def component(component_id, quantity, suppliers, alt_suppliers=()):
+    return {'component_id': component_id, 'alt_component_id': component_id + 100, 'quantity': quantity,
+            'suppliers': list(suppliers), 'alt_suppliers': list(alt_suppliers)}
+
+def brute_force(components, store_penalty):
+    """Best objective over every store set, buying each share from its cheapest offers in the set.
+
+    The alternative only covers what no supplier has of the original, as in
+    the optimizer, so each part's split between the two is fixed.
+    """
+    stores = sorted({o['supplier_id'] for c in components for o in c['suppliers'] + c['alt_suppliers']})
+    best = None
+    for size in range(len(stores) + 1):
+        for chosen in combinations(stores, size):
+            cost, used, feasible = 0, set(), True
+            for c in components:
+                remaining = c['quantity']
+                for offers in (c['suppliers'], c['alt_suppliers']):
+                    share = min(remaining, sum(o['quantity_in_stock'] for o in offers))
+                    remaining -= share
+                    for o in sorted((o for o in offers if o['supplier_id'] in chosen), key=lambda o: o['price']):
+                        take = min(share, o['quantity_in_stock'])
+                        if take:
+                            cost += take * o['price']
+                            used.add(o['supplier_id'])
+                            share -= take
+                    feasible = feasible and share == 0
+            if feasible:
+                objective = cost + store_penalty * len(used)
+                best = objective if best is None else min(best, objective)
+    return best
+
+def random_components(rng):
+    suppliers = list(range(1, rng.randint(2, 6) + 1))
+    components = []
+    for component_id in range(1, rng.randint(1, 5) + 1):
+        def offers():
+            return [offer(s, rng.choice([0.5, 1, 1.25, 2, 3, 5, 8]), rng.randint(0, 4))
+                    for s in rng.sample(suppliers, rng.randint(0, len(suppliers)))]
+        components.append(component(component_id, rng.randint(1, 6), offers(), offers()))
+    return components
+
+def allocated(parts, fills):
+    """Units bought per (part type, part id, supplier)"""
+    return {(o[3], o[4], o[0]): take for fill in fills for o, take in fill[2]}
+
+@pytest.mark.parametrize('seed', range(300))
+def test_matches_brute_force(seed):
+    rng = random.Random(seed)
+    components = random_components(rng)
+    store_penalty = rng.choice([0, 0.5, 2, 5, 20])
+
+    parts, fills, objective, lower_bound, exact = app_module.optimize_basket(components, store_penalty)
+
+    assert exact
+    assert objective == pytest.approx(brute_force(components, store_penalty))
+    assert lower_bound == pytest.approx(objective)
+    for part, fill in zip(parts, fills):
+        stock = sum(o['quantity_in_stock'] for o in part['component']['suppliers'] + part['component']['alt_suppliers'])
+        assert fill[1] == min(part['component']['quantity'], stock)
+
+@pytest.mark.parametrize('seed', range(100))
+def test_cut_short_search_bounds_the_optimum(seed, monkeypatch):
+    monkeypatch.setattr(app_module, 'BASKET_EXACT_EVALUATIONS', 2)
+    rng = random.Random(seed)
+    components = random_components(rng)
+    store_penalty = rng.choice([0.5, 2, 5, 20])
+
+    _, _, objective, lower_bound, exact = app_module.optimize_basket(components, store_penalty)
+    optimum = brute_force(components, store_penalty)
+
+    assert lower_bound <= optimum + 1e-9 <= objective + 2e-9
+    if exact:
+        assert objective == pytest.approx(optimum)
+
+def test_cheaper_alternative_only_covers_what_the_original_lacks():
+    components = [component(1, 5, [offer(1, 4.0, 3)], [offer(2, 1.0, 10)])]
+    parts, fills, objective, _, exact = app_module.optimize_basket(components)
+    assert allocated(parts, fills) == {('component', 1, 1): 3, ('alternative', 101, 2): 2}
+    assert objective == pytest.approx(14.0) == brute_force(components, 0)
+    assert exact
+
+def test_shortfall_when_stock_cannot_meet_the_quantity():
+    components = [component(1, 10, [offer(1, 1.0, 3), offer(2, 2.0, 2)], [offer(1, 3.0, 1)])]
+    parts, fills, objective, _, exact = app_module.optimize_basket(components, store_penalty=5)
+    assert fills[0][1] == 6
+    assert parts[0]['shortfall'] == 4
+    assert objective == pytest.approx(brute_force(components, 5))
+    assert exact
+
+def test_store_penalty_merges_stores():
+    # Each part is cheapest at its own store; store 3 sells both for a little more
+    components = [
+        component(1, 1, [offer(1, 1.0, 5), offer(3, 1.5, 5)]),
+        component(2, 1, [offer(2, 1.0, 5), offer(3, 1.5, 5)]),
+    ]
+    per_item = app_module.optimize_basket(components)
+    assert {store for _, _, store in allocated(per_item[0], per_item[1])} == {1, 2}
+
+    parts, fills, objective, lower_bound, exact = app_module.optimize_basket(components, store_penalty=5)
+    assert {store for _, _, store in allocated(parts, fills)} == {3}
+    assert objective == pytest.approx(8.0) == brute_force(components, 5)
+    assert objective < per_item[2] + 5 * 2
+    assert exact and lower_bound == pytest.approx(objective)
+
+def test_optimal_basket_endpoint(client):
+    response = client.get('/api/practical/1/optimal-basket?store_penalty=10')
+    assert response.status_code == 200
+    basket = response.get_json()
+    assert basket['exact']
+    assert basket['lower_bound'] <= basket['objective']
+    assert basket['objective'] == pytest.approx(basket['total_cost'] + 10 * basket['store_count'], abs=0.01)
+    assert client.get('/api/practical/1/optimal-basket?store_penalty=-1').status_code == 400
+    assert client.get('/api/practical/1/optimal-basket?store_penalty=abc').status_code == 400
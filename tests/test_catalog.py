@@ -0,0 +1,135 @@
+import base64
+import json
+
+import pytest
+
+COMPONENT_ID = 5
+
+@pytest.fixture
+def offers(db):
+    """Give the test component an offer from every supplier, with a price tie"""
+    db.executemany('INSERT INTO Supplier_components (quantity_in_stock, price_component_per_supplier, component_id, supplier_id) '
+                   'VALUES (?, ?, ?, ?)',
+                   [(0, 0.5, COMPONENT_ID, 1), (25, 5.99, COMPONENT_ID, 5), (5, 8.25, COMPONENT_ID, 6),
+                    (90, 15.0, COMPONENT_ID, 7), (30, 2.49, COMPONENT_ID, 8)])
+    db.commit()
+    return db.execute('SELECT supplier_id, store_type, quantity_in_stock, price FROM Component_offer WHERE part_id = ?',
+                      (COMPONENT_ID,)).fetchall()
+
+def suppliers(client, **params):
+    response = client.get(f'/api/component/{COMPONENT_ID}/suppliers', query_string=params)
+    assert response.status_code == 200, response.get_json()
+    return response
+
+def supplier_ids(response):
+    return [offer['supplier_id'] for offer in response.get_json()]
+
+def test_sort_by_price(client, offers):
+    by_price = sorted(offers, key=lambda offer: (offer['price'], offer['supplier_id']))
+    assert supplier_ids(suppliers(client)) == [offer['supplier_id'] for offer in by_price]
+    assert supplier_ids(suppliers(client, sort='price')) == [offer['supplier_id'] for offer in by_price]
+    assert supplier_ids(suppliers(client, sort='-price')) == [offer['supplier_id'] for offer in reversed(by_price)]
+
+def test_sort_by_stock(client, offers):
+    by_stock = sorted(offers, key=lambda offer: (offer['quantity_in_stock'], offer['supplier_id']), reverse=True)
+    assert supplier_ids(suppliers(client, sort='-stock')) == [offer['supplier_id'] for offer in by_stock]
+
+@pytest.mark.parametrize('min_price, max_price', [(2.49, 5.99), (None, 3.99), (8.25, None), (3, 3), (20, 1)])
+def test_price_bounds_are_inclusive(client, offers, min_price, max_price):
+    params = {key: value for key, value in (('min_price', min_price), ('max_price', max_price)) if value is not None}
+    expected = {offer['supplier_id'] for offer in offers
+                if (min_price is None or offer['price'] >= min_price) and (max_price is None or offer['price'] <= max_price)}
+    got = suppliers(client, **params).get_json()
+    assert {offer['supplier_id'] for offer in got} == expected
+    assert [offer['price'] for offer in got] == sorted(offer['price'] for offer in got)
+
+@pytest.mark.parametrize('store_type', ['online', 'physical', 'ONLINE'])
+def test_store_type(client, offers, store_type):
+    got = suppliers(client, store_type=store_type).get_json()
+    assert {offer['supplier_id'] for offer in got} == {
+        offer['supplier_id'] for offer in offers if offer['store_type'] == store_type.lower()}
+    assert len(suppliers(client, store_type='all').get_json()) == len(offers)
+
+def test_in_stock_only(client, offers):
+    got = supplier_ids(suppliers(client, in_stock_only='true'))
+    assert set(got) == {offer['supplier_id'] for offer in offers if offer['quantity_in_stock'] > 0}
+
+@pytest.mark.parametrize('sort', ['price', '-price', '-stock'])
+@pytest.mark.parametrize('limit', [1, 3, 200])
+def test_paging_visits_every_offer_once(client, offers, sort, limit):
+    expected = supplier_ids(suppliers(client, sort=sort))
+    seen, cursor = [], None
+    while True:
+        response = suppliers(client, sort=sort, limit=limit, **({'cursor': cursor} if cursor else {}))
+        page = supplier_ids(response)
+        assert 1 <= len(page) <= limit
+        seen += page
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            break
+    assert seen == expected
+
+def test_paging_with_filters(client, offers):
+    first = suppliers(client, store_type='online', min_price=1, limit=2)
+    second = suppliers(client, store_type='online', min_price=1, limit=2, cursor=first.headers['X-Next-Cursor'])
+    unpaged = supplier_ids(suppliers(client, store_type='online', min_price=1))
+    assert supplier_ids(first) + supplier_ids(second) == unpaged[:4]
+
+def cursor_of(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+BAD_OFFER_PARAMS = [
+    {'limit': '0'}, {'limit': '201'}, {'limit': '-1'}, {'limit': '1.5'}, {'limit': 'abc'}, {'limit': '9' * 30},
+    {'min_price': 'abc'}, {'max_price': '1,50'}, {'min_price': 'nan'}, {'max_price': 'inf'}, {'min_price': '-1'},
+    {'min_price': '1e999'}, {'sort': 'name'}, {'sort': 'stock'}, {'store_type': 'warehouse'},
+    {'cursor': 'abc'}, {'cursor': '%%%'}, {'cursor': cursor_of([])}, {'cursor': cursor_of([1, 2, 3])},
+    {'cursor': cursor_of(['a', 'b'])}, {'cursor': cursor_of([None, None])}, {'cursor': cursor_of([True, 1])},
+    {'cursor': cursor_of({'price': 1})}, {'cursor': base64.urlsafe_b64encode(b'\xff\xfe').decode()},
+]
+
+@pytest.mark.parametrize('params', BAD_OFFER_PARAMS)
+def test_bad_supplier_params_are_rejected(client, params):
+    response = client.get(f'/api/component/{COMPONENT_ID}/suppliers', query_string=params)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+def practical_catalog(client, prac_number=1, **params):
+    response = client.get(f'/api/practical/{prac_number}/catalog', query_string=params)
+    assert response.status_code == 200, response.get_json()
+    return response
+
+def test_practical_catalog_filters_apply_to_every_component(client):
+    catalog = practical_catalog(client, store_type='online', max_price=3, sort='-price').get_json()
+    assert catalog
+    for component in catalog:
+        for key in ('suppliers', 'alt_suppliers'):
+            prices = [offer['price'] for offer in component[key]]
+            assert prices == sorted(prices, reverse=True)
+            assert all(offer['store_type'] == 'online' and offer['price'] <= 3 for offer in component[key])
+
+def test_practical_catalog_paging(client):
+    everything = [component['component_id'] for component in practical_catalog(client).get_json()]
+    assert len(everything) > 1
+    seen, cursor = [], None
+    while True:
+        response = practical_catalog(client, limit=1, **({'cursor': cursor} if cursor else {}))
+        page = response.get_json()
+        assert len(page) == 1
+        seen.append(page[0]['component_id'])
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            break
+    assert seen == everything
+
+BAD_CATALOG_PARAMS = [
+    {'limit': '0'}, {'limit': '201'}, {'limit': 'ten'}, {'min_price': 'cheap'}, {'max_price': '-inf'},
+    {'store_type': 'mail'}, {'sort': 'random'}, {'cursor': 'abc'}, {'cursor': cursor_of([1, 2])},
+    {'cursor': cursor_of([1, 'A', 'B'])}, {'cursor': cursor_of(['1', 'A', 1])},
+]
+
+@pytest.mark.parametrize('params', BAD_CATALOG_PARAMS)
+def test_bad_catalog_params_are_rejected(client, params):
+    for url, extra in (('/api/practical/1/catalog', {}), ('/api/catalog', {'practicals': '1,2'})):
+        response = client.get(url, query_string={**extra, **params})
+        assert response.status_code == 400, url
+        assert 'error' in response.get_json()
@@ -0,0 +1,38 @@
+import app as app_module
+
+PATH = '/api/component/1/suppliers'
+
+def prices(client):
+    response = client.get(PATH)
+    assert response.status_code == 200
+    return {offer['supplier_id']: offer['price'] for offer in response.get_json()}
+
+def test_commit_on_another_connection_invalidates(client, db):
+    before = prices(client)
+    supplier_id = next(iter(before))
+    # As another worker process would, outside this process's pool and writer
+    db.execute('UPDATE Supplier_components SET price_component_per_supplier = 123.45 '
+               'WHERE component_id = 1 AND supplier_id = ?', (supplier_id,))
+    db.commit()
+    assert prices(client)[supplier_id] == 123.45
+
+def test_commit_through_writer_invalidates(client):
+    before = prices(client)
+    supplier_id = next(iter(before))
+    # No explicit invalidate(): data_version alone has to catch it
+    app_module.db_writer.run(
+        app_module.write_statement,
+        'UPDATE Supplier_components SET price_component_per_supplier = 67.89 '
+        'WHERE component_id = 1 AND supplier_id = ?', (supplier_id,)
+    )
+    assert prices(client)[supplier_id] == 67.89
+
+def test_commit_before_first_check_is_not_served_stale(app, client, db):
+    before = prices(client)
+    supplier_id = next(iter(before))
+    db.execute('UPDATE Supplier_components SET price_component_per_supplier = 9.99 '
+               'WHERE component_id = 1 AND supplier_id = ?', (supplier_id,))
+    db.commit()
+    # A new worker, or a restarted watch connection, has no version to compare against
+    app_module.catalog_cache.after_fork()
+    assert prices(client)[supplier_id] == 9.99
@@ -0,0 +1,109 @@
+import io
+import json
+import sqlite3
+
+import pytest
+
+import app as app_module
+import catalog_import
+
+CSV = '''supplier_name,supplier_location,store_type,part_type,part_name,price,quantity_in_stock
+Import Supplies,Online,,component,Import Resistor,0.10,500
+Import Supplies,Online,,alternative,Import Resistor Kit,2.50,20
+Bench Parts,Cape Town,physical,component,Import Resistor,0.12,40
+Bench Parts,Cape Town,physical,component,Import LED,0.35,0
+'''
+
+RECORDS = [
+    {'supplier_name': 'A', 'part_name': 'x', 'price': 1, 'quantity_in_stock': 2},
+    {'supplier_name': 'B', 'part_name': 'y, "quoted" [name]', 'price': 2.5, 'quantity_in_stock': 0},
+    {'supplier_name': 'C', 'part_name': 'z', 'price': '3', 'quantity_in_stock': '4'},
+]
+
+COUNTED_TABLES = ('Supplier', 'Components', 'Alt_components', 'Supplier_components',
+                  'Supplier_alt_components', 'Catalog_change')
+
+@pytest.fixture
+def conn(database):
+    """Connection set up as catalog_import.main() sets it up"""
+    conn = sqlite3.connect(database, isolation_level=None)
+    yield conn
+    conn.close()
+
+def import_csv(conn, text):
+    importer = catalog_import.CatalogImporter(conn)
+    return importer.run(catalog_import.open_records(io.BytesIO(text.encode()), 'csv'))
+
+def counts(conn):
+    return {table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0] for table in COUNTED_TABLES}
+
+@pytest.mark.parametrize('text', [
+    json.dumps(RECORDS),
+    json.dumps(RECORDS, indent=2),
+    '\n'.join(json.dumps(record) for record in RECORDS) + '\n',
+    ' [ ' + ' , '.join(json.dumps(record) for record in RECORDS) + ' ] ',
+])
+def test_read_json_arrays_and_ndjson(text, monkeypatch):
+    # Small reads, so records are split across buffer refills
+    monkeypatch.setattr(catalog_import, 'JSON_READ_SIZE', 7)
+    assert list(catalog_import.read_json(io.StringIO(text))) == list(enumerate(RECORDS, 1))
+
+def test_read_json_stops_at_malformed_input():
+    with pytest.raises(ValueError):
+        list(catalog_import.read_json(io.StringIO('{"supplier_name": "A"}\n{"part_name": ')))
+
+def test_bad_rows_are_rejected_with_their_row_numbers(conn):
+    report = import_csv(conn, '''supplier_name,supplier_location,store_type,part_type,part_name,price,quantity_in_stock
+Good Supplier,Online,online,component,Good Part,1.00,5
+Good Supplier,Online,online,component,Cheap Part,free,5
+Good Supplier,Online,online,component,Negative Part,-1,5
+Good Supplier,Online,online,component,NaN Part,nan,5
+Good Supplier,Online,online,component,Half Part,1.00,2.5
+Good Supplier,Online,online,component,Owed Part,1.00,-3
+,Online,online,component,Orphan Part,1.00,5
+Good Supplier,Online,warehouse,component,Stored Part,1.00,5
+Good Supplier,Online,online,gadget,Odd Part,1.00,5
+''')
+    assert report['rows_read'] == 9
+    assert report['rows_imported'] == 1
+    assert [reject['row'] for reject in report['rejects']] == [3, 4, 5, 6, 7, 8, 9, 10]
+    errors = [reject['error'] for reject in report['rejects']]
+    assert errors[0] == errors[3] == 'price must be a number and quantity_in_stock a whole number'
+    assert errors[1] == errors[2] == errors[4] == 'price and quantity_in_stock must be zero or more'
+    assert errors[5] == 'supplier_name and part_name are required'
+    assert 'store_type' in errors[6] and 'part_type' in errors[7]
+
+def test_reimport_is_idempotent(conn):
+    before = counts(conn)
+    first = import_csv(conn, CSV)
+    after_first = counts(conn)
+    second = import_csv(conn, CSV)
+
+    assert first['rows_imported'] == second['rows_imported'] == 4
+    assert after_first['Supplier'] == before['Supplier'] + 2
+    assert after_first['Supplier_components'] == before['Supplier_components'] + 3
+    assert after_first['Supplier_alt_components'] == before['Supplier_alt_components'] + 1
+    assert counts(conn) == after_first  # No duplicate offers, and unchanged offers log no change
+
+    online, = conn.execute("SELECT store_type FROM Supplier WHERE supplier_name = 'Import Supplies'").fetchone()
+    assert online == 'online'
+    price, stock = conn.execute('''
+        SELECT price_component_per_supplier, quantity_in_stock FROM Supplier_components
+        JOIN Components USING (component_id) JOIN Supplier USING (supplier_id)
+        WHERE component_name = 'Import Resistor' AND supplier_name = 'Bench Parts'
+    ''').fetchone()
+    assert (price, stock) == (0.12, 40)
+
+def test_admin_import_needs_the_token(client, monkeypatch):
+    monkeypatch.setattr(app_module, 'IMPORT_TOKEN', None)
+    assert client.post('/admin/import', data=CSV, content_type='text/csv').status_code == 404
+
+    monkeypatch.setattr(app_module, 'IMPORT_TOKEN', 'import-token')
+    response = client.post('/admin/import', data=CSV, content_type='text/csv',
+                           headers={'Authorization': 'Bearer wrong-token'})
+    assert response.status_code == 401
+
+    response = client.post('/admin/import', data=CSV, content_type='text/csv',
+                           headers={'Authorization': 'Bearer import-token'})
+    assert response.status_code == 200
+    assert response.get_json()['rows_imported'] == 4
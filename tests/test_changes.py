@@ -0,0 +1,82 @@
+import app as app_module
+
+OFFERS_SQL = 'SELECT component_id, supplier_id FROM Supplier_components ORDER BY component_id, supplier_id LIMIT ?'
+UPDATE_SQL = 'UPDATE Supplier_components SET {} WHERE component_id = ? AND supplier_id = ?'
+
+def log_size(db):
+    return db.execute('SELECT COUNT(*) FROM Catalog_change').fetchone()[0]
+
+def update(db, assignments, key, parameters=()):
+    db.execute(UPDATE_SQL.format(assignments), (*parameters, *key))
+    db.commit()
+
+def current_version(client):
+    return client.get('/api/changes').get_json()['version']
+
+def test_price_or_stock_update_logs_one_change(db):
+    key = tuple(db.execute(OFFERS_SQL, (1,)).fetchone())
+    size = log_size(db)
+
+    update(db, 'price_component_per_supplier = price_component_per_supplier + 1', key)
+    assert log_size(db) == size + 1
+    update(db, 'quantity_in_stock = quantity_in_stock + 1', key)
+    assert log_size(db) == size + 2
+    update(db, 'quantity_in_stock = quantity_in_stock - 1, price_component_per_supplier = 9.99', key)
+    assert log_size(db) == size + 3
+
+    row = db.execute('SELECT part_type, part_id, supplier_id FROM Catalog_change ORDER BY version DESC LIMIT 1').fetchone()
+    assert tuple(row) == ('component', *key)
+
+def test_no_op_update_logs_nothing(db):
+    key = tuple(db.execute(OFFERS_SQL, (1,)).fetchone())
+    size = log_size(db)
+    update(db, 'quantity_in_stock = quantity_in_stock, price_component_per_supplier = price_component_per_supplier', key)
+    update(db, "updated_at = '2020-01-01 00:00:00'", key)
+    assert log_size(db) == size
+
+def test_since_pages_through_the_changes(client, db):
+    keys = [tuple(row) for row in db.execute(OFFERS_SQL, (5,)).fetchall()]
+    since = start = current_version(client)
+    for stock, key in enumerate(keys):
+        update(db, 'quantity_in_stock = ?', key, (stock + 100,))
+    update(db, 'quantity_in_stock = 42', keys[0])  # A second change to the first offer
+
+    pages = []
+    while True:
+        page = client.get(f'/api/changes?since={since}&limit=2').get_json()
+        assert not page['reset']
+        pages.append(page)
+        since = page['version']
+        if not page['has_more']:
+            break
+
+    assert [page['has_more'] for page in pages] == [True, True, False]
+    assert since == start + len(keys) + 1
+    changes = [change for page in pages for change in page['changes']]
+    assert [change['version'] for change in changes] == sorted(change['version'] for change in changes)
+    latest = {(change['part_id'], change['supplier_id']): change['quantity_in_stock'] for change in changes}
+    assert latest[keys[0]] == 42
+    assert {key: latest[key] for key in keys[1:]} == {key: stock + 100 for stock, key in enumerate(keys) if stock}
+
+    assert client.get(f'/api/changes?since={since}').get_json() == {
+        'version': since, 'has_more': False, 'reset': False, 'changes': []}
+
+def test_since_older_than_the_log_resets(client, db):
+    keys = [tuple(row) for row in db.execute(OFFERS_SQL, (3,)).fetchall()]
+    start = current_version(client)
+    for key in keys:
+        update(db, 'quantity_in_stock = quantity_in_stock + 1', key)
+
+    assert app_module.prune_change_log(db, keep=1, pause=0) == len(keys) - 1
+    stale = client.get(f'/api/changes?since={start}').get_json()
+    assert stale['reset'] and stale['changes'] == []
+    assert stale['version'] == start + len(keys)
+
+    # The last retained change can still be replayed from just before it
+    assert not client.get(f'/api/changes?since={start + len(keys) - 1}').get_json()['reset']
+    # A version from before the database was recreated is ahead of the log
+    assert client.get(f'/api/changes?since={start + 1000}').get_json()['reset']
+
+def test_since_must_be_a_whole_number(client):
+    assert client.get('/api/changes?since=abc').status_code == 400
+    assert client.get('/api/changes?since=-1').status_code == 400
@@ -0,0 +1,41 @@
+import logging
+
+import pytest
+
+import app as app_module
+
+@pytest.fixture
+def use_database(database, monkeypatch):
+    """Point every config class at the test database"""
+    for config in app_module.CONFIGS.values():
+        monkeypatch.setattr(config, 'DATABASE', database)
+
+def test_testing_app_serves_requests(use_database, database):
+    flask_app = app_module.create_app('testing')
+    assert flask_app.testing and not flask_app.config['BACKGROUND_SERVICES']
+    assert app_module.db_pool.database == database
+
+    client = flask_app.test_client()
+    assert client.get('/').status_code == 200
+    with client.session_transaction() as session:
+        session['user_id'] = 1
+    response = client.get('/api/practicals')
+    assert response.status_code == 200
+    assert response.get_json()
+
+def test_production_refuses_the_published_secret_key(use_database, monkeypatch):
+    monkeypatch.setattr(app_module.ProductionConfig, 'SECRET_KEY', app_module.DEFAULT_SECRET_KEY)
+    with pytest.raises(RuntimeError, match='SECRET_KEY'):
+        app_module.create_app('production')
+
+def test_production_with_a_secret_key(use_database, monkeypatch):
+    monkeypatch.setattr(app_module.ProductionConfig, 'SECRET_KEY', 'a-real-secret')
+    flask_app = app_module.create_app('production')
+    assert flask_app.secret_key == 'a-real-secret'
+    assert flask_app.config['SESSION_COOKIE_SAMESITE'] == 'Lax'
+
+def test_development_warns_about_the_published_secret_key(use_database, monkeypatch, caplog):
+    monkeypatch.setattr(app_module.DevelopmentConfig, 'SECRET_KEY', app_module.DEFAULT_SECRET_KEY)
+    with caplog.at_level(logging.WARNING, logger=app_module.app.logger.name):
+        app_module.create_app('development')
+    assert any('SECRET_KEY is not set' in record.getMessage() for record in caplog.records)
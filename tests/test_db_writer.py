@@ -0,0 +1,114 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import app as app_module
+
+STOCK_SQL = 'SELECT quantity_in_stock FROM Supplier_components WHERE component_id = ? AND supplier_id = ?'
+SET_STOCK_SQL = 'UPDATE Supplier_components SET quantity_in_stock = ? WHERE component_id = ? AND supplier_id = ?'
+
+@pytest.fixture
+def offers(app, db):
+    """(component_id, supplier_id) of three offers, each with 10 in stock"""
+    keys = [tuple(row) for row in db.execute('SELECT component_id, supplier_id FROM Supplier_components '
+                                             'ORDER BY component_id, supplier_id LIMIT 3').fetchall()]
+    db.executemany(SET_STOCK_SQL, [(10, *key) for key in keys])
+    db.commit()
+    return keys
+
+@pytest.fixture
+def writer():
+    """A writer of its own, so batches and queue limits are under the test's control"""
+    writers = []
+
+    def make(batch_size=100, maxsize=100, timeout=5):
+        writers.append(app_module.DatabaseWriter(batch_size, maxsize, timeout))
+        return writers[-1]
+    yield make
+    for writer in writers:
+        writer.close()
+
+def hold(writer):
+    """Keep writer busy in a transaction until the returned event is set"""
+    started, release = threading.Event(), threading.Event()
+
+    def gate(conn):
+        started.set()
+        release.wait(10)
+    future = writer.submit(gate)
+    assert started.wait(5)
+    return release, future
+
+def set_stock(conn, stock, key):
+    return conn.execute(SET_STOCK_SQL, (stock, *key)).rowcount
+
+def set_stock_then_fail(conn, stock, key):
+    conn.execute(SET_STOCK_SQL, (stock, *key))
+    raise ValueError('bad write')
+
+def stock(db, key):
+    return db.execute(STOCK_SQL, key).fetchone()[0]
+
+def test_failing_write_rolls_back_only_itself(writer, db, offers):
+    writer = writer()
+    release, _ = hold(writer)
+    futures = [writer.submit(set_stock, 1, offers[0]),
+               writer.submit(set_stock_then_fail, 2, offers[1]),
+               writer.submit(set_stock, 3, offers[2])]
+    assert writer.queue.qsize() == 3  # Queued behind the held transaction, so they commit as one batch
+    release.set()
+
+    assert futures[0].result(5) == 1
+    with pytest.raises(ValueError, match='bad write'):
+        futures[1].result(5)
+    assert futures[2].result(5) == 1
+    assert [stock(db, key) for key in offers] == [1, 10, 3]
+
+def test_timed_out_write_is_cancelled_and_never_committed(writer, db, offers):
+    writer = writer(timeout=0.2)
+    release, held = hold(writer)
+    with pytest.raises(app_module.WriteQueueBusy):
+        writer.run(set_stock, 0, offers[0])
+    release.set()
+    held.result(5)
+    writer.run(set_stock, 7, offers[1])  # Anything queued after it has been through the writer
+    assert stock(db, offers[0]) == 10
+    assert stock(db, offers[1]) == 7
+
+def test_write_already_running_at_the_timeout_is_waited_for(writer, db, offers):
+    writer = writer(timeout=0.1)
+
+    def slow(conn):
+        time.sleep(0.3)
+        return set_stock(conn, 4, offers[0])
+    assert writer.run(slow) == 1
+    assert stock(db, offers[0]) == 4
+
+def test_full_queue_is_refused(writer, offers):
+    writer = writer(maxsize=1)
+    release, _ = hold(writer)
+    queued = writer.submit(set_stock, 5, offers[0])
+    with pytest.raises(app_module.WriteQueueBusy):
+        writer.submit(set_stock, 6, offers[0])
+    assert writer.refused == 1
+    release.set()
+    assert queued.result(5) == 1
+
+def test_routes_answer_503_when_the_queue_is_full(writer, client, offers, monkeypatch):
+    writer = writer(maxsize=1)
+    monkeypatch.setattr(app_module, 'db_writer', writer)
+    release, _ = hold(writer)
+    writer.submit(set_stock, 5, offers[0])
+    try:
+        component_id, supplier_id = offers[0]
+        response = client.post('/api/reservations', json={'items': [
+            {'part_type': 'component', 'part_id': component_id, 'supplier_id': supplier_id}]})
+        assert response.status_code == 503
+        response = client.post('/signup', data={'fullname': 'New Student', 'email': 'new@example.com',
+                                                'password': 'secret123'})
+        assert response.status_code == 503
+        assert writer.refused == 2
+    finally:
+        release.set()
@@ -0,0 +1,63 @@
+import pytest
+
+import app as app_module
+
+@pytest.fixture(autouse=True)
+def no_saved_copies(monkeypatch):
+    """Keep test renders out of EXPORT_DIR"""
+    monkeypatch.setattr(app_module, 'EXPORT_SAVE_TO_DISK', False)
+
+@pytest.mark.parametrize('body', [
+    [{'name': 'Resistor', 'price': 1.5}],
+    {'components': {'name': 'Resistor'}},
+    {'components': ['Resistor']},
+    {'components': [{'price': 1.5}]},
+    {'components': [{'name': 7, 'price': 1.5}]},
+    {'components': [{'name': 'Resistor'}]},
+    {'components': [{'name': 'Resistor', 'price': '1.50'}]},
+    {'components': [{'name': 'Resistor', 'price': True}]},
+    {'components': [{'name': 'Resistor', 'price': 1.5, 'store': ['Online']}]},
+])
+def test_export_rejects_malformed_components(client, body):
+    response = client.post('/export_pdf', json=body)
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+
+def test_export_accepts_components(client):
+    body = {'components': [{'name': 'Resistor', 'store': 'Online', 'price': 1.5},
+                           {'name': 'LED', 'price': 2}]}
+    response = client.post('/export_pdf', json=body)
+    assert response.status_code == 202
+    assert response.get_json()['status_url']
+
+def test_streamed_export_rejects_malformed_components(client):
+    response = client.post('/export_pdf?stream=1', json={'components': [{'name': 'Resistor', 'price': None}]})
+    assert response.status_code == 400
+
+def test_streamed_export_returns_pdf(client):
+    response = client.post('/export_pdf?stream=1', json={'components': [{'name': 'LED', 'price': 2}]})
+    assert response.status_code == 200
+    assert response.mimetype == ('application/pdf' if app_module.REPORTLAB_AVAILABLE else 'text/plain')
+
+@pytest.mark.skipif(not app_module.REPORTLAB_AVAILABLE, reason='ReportLab is not installed')
+def test_renders_reuse_cached_styles(monkeypatch):
+    used = []
+
+    def paragraph(text, style, *args, **kwargs):
+        used.append(style)
+        return original(text, style, *args, **kwargs)
+    original = app_module.Paragraph
+    monkeypatch.setattr(app_module, 'Paragraph', paragraph)
+
+    styles = app_module.PDF_STYLES
+    components = [{'name': 'Resistor', 'store': 'Online', 'price': 1.5}]
+    first, _ = app_module.render_reservation(components, 'Test Student', 'student@example.com')
+    first_styles = list(used)
+    used.clear()
+    second, _ = app_module.render_reservation(components, 'Test Student', 'student@example.com')
+
+    assert first.startswith(b'%PDF') and second.startswith(b'%PDF')
+    assert app_module.PDF_STYLES is styles
+    assert len(used) == len(first_styles)
+    assert all(a is b for a, b in zip(used, first_styles))
+    assert app_module.PDF_TITLE_STYLE in used and styles['Normal'] in used
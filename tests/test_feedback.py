@@ -0,0 +1,55 @@
+import logging
+import sqlite3
+
+import pytest
+
+import app as app_module
+
+RATINGS = [5, 5, 4, 3, 5, 1]
+
+@pytest.fixture
+def writer(monkeypatch):
+    """The feedback writer, batching by size only, stopped again after the test"""
+    writer = app_module.feedback_writer
+    writer.close()
+    monkeypatch.setattr(writer, 'batch_size', 4)
+    monkeypatch.setattr(writer, 'interval', 30)
+    yield writer
+    writer.close()
+
+def test_submissions_are_batched_into_the_rating_counts(client, db, writer):
+    written, batches = writer.written, writer.batches
+    for rating in RATINGS:
+        response = client.post('/submit_feedback', json={'rating': rating, 'feedback': f'rated {rating}'})
+        assert response.status_code == 200
+    writer.close()
+
+    assert writer.written - written == len(RATINGS)
+    assert writer.batches - batches == 2  # A full batch of 4, then the 2 flushed on close
+    assert db.execute('SELECT COUNT(*) FROM Feedback').fetchone()[0] == len(RATINGS)
+    counts = dict(db.execute('SELECT rating, submissions FROM Feedback_rating_count').fetchall())
+    assert {rating: n for rating, n in counts.items() if n} == {5: 3, 4: 1, 3: 1, 1: 1}
+
+    stats = client.get('/api/feedback/stats').get_json()
+    assert stats['total'] == len(RATINGS)
+    assert stats['average'] == round(sum(RATINGS) / len(RATINGS), 2)
+    assert stats['distribution']['5'] == 3
+
+@pytest.mark.parametrize('body', [{'rating': 0}, {'rating': 6}, {'rating': True}, {'rating': '5'},
+                                  {'rating': 4, 'feedback': 12}, [4]])
+def test_invalid_feedback_is_rejected(client, body):
+    assert client.post('/submit_feedback', json=body).status_code == 400
+
+def test_failed_batch_is_logged_and_counted(client, writer, monkeypatch, caplog):
+    def fail(*args):
+        raise sqlite3.OperationalError('database is locked')
+    monkeypatch.setattr(app_module.db_writer, 'run', fail)
+    dropped = writer.dropped
+
+    with caplog.at_level(logging.ERROR, logger=app_module.app.logger.name):
+        assert client.post('/submit_feedback', json={'rating': 3}).status_code == 200
+        writer.close()
+
+    assert writer.dropped - dropped == 1
+    assert any('Dropped 1 feedback submissions' in record.getMessage() for record in caplog.records)
+    assert f'app_feedback_submissions_total{{outcome="dropped"}} {writer.dropped}' in client.get('/metrics').text
@@ -0,0 +1,80 @@
+import threading
+
+import pytest
+from werkzeug.security import check_password_hash, generate_password_hash
+
+import app as app_module
+
+EMAIL = 'old.hash@example.com'
+PASSWORD = 'correct horse'
+OLD_METHOD = 'pbkdf2:sha256:1000'
+
+@pytest.fixture
+def student(db):
+    """A student whose password hash predates PASSWORD_HASH_METHOD"""
+    old_hash = generate_password_hash(PASSWORD, OLD_METHOD)
+    db.execute('INSERT INTO Student (full_name, email_address, password_hash) VALUES (?, ?, ?)',
+               ('Old Hash', EMAIL, old_hash))
+    db.commit()
+    return old_hash
+
+@pytest.fixture
+def anonymous(app):
+    return app.test_client()
+
+def stored_hash(db):
+    return db.execute('SELECT password_hash FROM Student WHERE email_address = ?', (EMAIL,)).fetchone()[0]
+
+def login(client, email=EMAIL, password=PASSWORD):
+    return client.post('/login', data={'email': email, 'password': password})
+
+def test_login_upgrades_an_old_hash(anonymous, db, student):
+    assert app_module.needs_rehash(student)
+    response = login(anonymous)
+    assert response.status_code == 302 and response.location.endswith('/main')
+
+    upgraded = stored_hash(db)
+    assert upgraded != student
+    assert upgraded.split('$', 1)[0] == app_module.PASSWORD_HASH_PREFIX
+    assert check_password_hash(upgraded, PASSWORD)
+    # The upgraded hash still logs in, and is left alone from now on
+    assert login(anonymous).location.endswith('/main')
+    assert stored_hash(db) == upgraded
+
+def test_failed_login_keeps_the_old_hash(anonymous, db, student):
+    assert login(anonymous, password='wrong').location.endswith('/')
+    assert stored_hash(db) == student
+
+def test_ip_burst_is_refused_with_retry_after(anonymous, monkeypatch):
+    monkeypatch.setattr(app_module, 'login_ip_limiter', app_module.RateLimiter(3, 0.1, 100))
+    statuses = [login(anonymous, f'nobody{i}@example.com').status_code for i in range(4)]
+    assert statuses == [302, 302, 302, 429]
+
+    refused = login(anonymous, 'nobody9@example.com')
+    assert refused.status_code == 429
+    assert 1 <= int(refused.headers['Retry-After']) <= 10
+
+def test_email_burst_is_limited_per_address(anonymous, monkeypatch):
+    monkeypatch.setattr(app_module, 'login_email_limiter', app_module.RateLimiter(2, 0.01, 100))
+    assert [login(anonymous, 'target@example.com').status_code for _ in range(3)] == [302, 302, 429]
+    assert login(anonymous, 'TARGET@example.com ').status_code == 429  # Same address, differently typed
+    assert login(anonymous, 'other@example.com').status_code == 302
+
+def test_busy_hash_pool_answers_503(anonymous, student, monkeypatch):
+    monkeypatch.setattr(app_module, 'hash_pool', app_module.HashPool(1, 1, 5))
+    release = threading.Event()
+    started = threading.Event()
+
+    def occupy():
+        started.set()
+        release.wait(5)
+    blocker = threading.Thread(target=app_module.hash_pool.run, args=(occupy,))
+    blocker.start()
+    try:
+        assert started.wait(5)
+        response = login(anonymous)
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '2'
+    finally:
+        release.set()
+        blocker.join()
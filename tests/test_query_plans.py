@@ -0,0 +1,31 @@
+import sqlite3
+
+import pytest
+
+import app as app_module
+import init_db
+
+# The planner's choices depend on table sizes, so the checks run on the
+# sample data and on synthetic catalogs of several sizes
+SYNTHETIC_SCALES = [
+    (2000, 20000),
+    (5000, 50000),
+    (20000, 200000),
+]
+
+def plan_problems(path):
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    try:
+        return {r['query']: r['problems'] for r in app_module.check_query_plans(conn) if r['problems']}
+    finally:
+        conn.close()
+
+def test_plans_on_sample_data(database):
+    assert plan_problems(database) == {}
+
+@pytest.mark.parametrize('components, offers', SYNTHETIC_SCALES)
+def test_plans_on_synthetic_catalog(tmp_path, components, offers):
+    path = str(tmp_path / 'synthetic.db')
+    init_db.create_database(path, {'components': components, 'offers': offers})
+    assert plan_problems(path) == {}
@@ -0,0 +1,95 @@
+import threading
+
+import pytest
+
+COMPONENT_ID = 1
+STOCK = 50
+THREADS = 300
+
+@pytest.fixture
+def offer(db):
+    """(supplier_id) of one component offer with STOCK left"""
+    supplier_id = db.execute('SELECT supplier_id FROM Supplier_components WHERE component_id = ? LIMIT 1',
+                             (COMPONENT_ID,)).fetchone()[0]
+    db.execute('UPDATE Supplier_components SET quantity_in_stock = ? WHERE component_id = ? AND supplier_id = ?',
+               (STOCK, COMPONENT_ID, supplier_id))
+    db.commit()
+    return supplier_id
+
+def reservation(supplier_id, quantity=1):
+    return {'items': [{'part_type': 'component', 'part_id': COMPONENT_ID,
+                       'supplier_id': supplier_id, 'quantity': quantity}]}
+
+@pytest.mark.parametrize('body', [[reservation(1)], 'items', 42])
+def test_reservation_body_must_be_an_object(client, body):
+    response = client.post('/api/reservations', json=body)
+    assert response.status_code == 400
+
+@pytest.mark.parametrize('body', [['cart'], 'cart'])
+def test_complete_practical_body_must_be_an_object(client, body):
+    response = client.post('/complete_practical', json=body)
+    assert response.status_code == 400
+
+def test_concurrent_reservations_never_oversell(app, db, offer):
+    start = threading.Barrier(THREADS)
+    statuses = []
+
+    def reserve(student_id):
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['user_id'] = student_id
+        start.wait()
+        statuses.append(client.post('/api/reservations', json=reservation(offer)).status_code)
+
+    threads = [threading.Thread(target=reserve, args=(i + 1,)) for i in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stock = db.execute('SELECT quantity_in_stock FROM Supplier_components WHERE component_id = ? AND supplier_id = ?',
+                       (COMPONENT_ID, offer)).fetchone()[0]
+    assert stock == 0
+    assert sorted(statuses) == [201] * STOCK + [409] * (THREADS - STOCK)
+
+def test_short_item_rolls_back_the_whole_cart(client, db, offer):
+    other = db.execute('SELECT component_id, supplier_id, quantity_in_stock FROM Supplier_components '
+                       'WHERE component_id != ? AND quantity_in_stock > 0 LIMIT 1', (COMPONENT_ID,)).fetchone()
+    cart = {'items': [
+        {'part_type': 'component', 'part_id': other['component_id'], 'supplier_id': other['supplier_id'], 'quantity': 1},
+        {'part_type': 'component', 'part_id': COMPONENT_ID, 'supplier_id': offer, 'quantity': STOCK + 1},
+    ]}
+
+    response = client.post('/api/reservations', json=cart)
+    assert response.status_code == 409
+    assert response.get_json()['available'] == STOCK
+
+    stock = 'SELECT quantity_in_stock FROM Supplier_components WHERE component_id = ? AND supplier_id = ?'
+    assert db.execute(stock, (other['component_id'], other['supplier_id'])).fetchone()[0] == other['quantity_in_stock']
+    assert db.execute(stock, (COMPONENT_ID, offer)).fetchone()[0] == STOCK
+    assert db.execute('SELECT COUNT(*) FROM Reservation').fetchone()[0] == 0
+    assert db.execute('SELECT COUNT(*) FROM Reservation_item').fetchone()[0] == 0
+
+def test_resubmitted_cart_is_reserved_once(client, db, offer):
+    headers = {'Idempotency-Key': 'cart-1'}
+    body = {'cart': reservation(offer, quantity=2)['items'], 'practical': 1}
+    first = client.post('/complete_practical', json=body, headers=headers)
+    second = client.post('/complete_practical', json=body, headers=headers)
+    assert first.status_code == second.status_code == 200
+
+    assert db.execute('SELECT COUNT(*) FROM Reservation').fetchone()[0] == 1
+    assert db.execute('SELECT quantity_in_stock FROM Supplier_components WHERE component_id = ? AND supplier_id = ?',
+                      (COMPONENT_ID, offer)).fetchone()[0] == STOCK - 2
+
+def test_idempotency_key_returns_the_same_reservation(client, offer):
+    headers = {'Idempotency-Key': 'retry-1'}
+    first = client.post('/api/reservations', json=reservation(offer), headers=headers)
+    repeat = client.post('/api/reservations', json=reservation(offer), headers=headers)
+    other = client.post('/api/reservations', json=reservation(offer), headers={'Idempotency-Key': 'retry-2'})
+    assert (first.status_code, repeat.status_code, other.status_code) == (201, 200, 201)
+    assert first.get_json()['reservation'] == repeat.get_json()['reservation']
+    assert other.get_json()['reservation']['reservation_id'] != first.get_json()['reservation']['reservation_id']
+
+def test_idempotency_key_is_validated(client, offer):
+    response = client.post('/api/reservations', json=reservation(offer), headers={'Idempotency-Key': 'k' * 65})
+    assert response.status_code == 400
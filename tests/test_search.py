@@ -0,0 +1,46 @@
+import pytest
+
+def search(client, query, **params):
+    response = client.get('/api/search', query_string={'q': query, **params})
+    assert response.status_code == 200
+    return response.get_json()
+
+def hit_ids(hits):
+    return {(hit['part_type'], hit['part_id']) for hit in hits}
+
+def test_rename_updates_the_index(client, db):
+    component_id, old_name = db.execute('SELECT component_id, component_name FROM Components LIMIT 1').fetchone()
+    assert ('component', component_id) in hit_ids(search(client, old_name, limit=50))
+
+    db.execute("UPDATE Components SET component_name = 'Qwzx Flux Capacitor' WHERE component_id = ?", (component_id,))
+    db.commit()
+    hits = search(client, 'qwz flux')
+    assert [(hit['part_type'], hit['part_id'], hit['name']) for hit in hits] == [
+        ('component', component_id, 'Qwzx Flux Capacitor')]
+    assert ('component', component_id) not in hit_ids(search(client, old_name, limit=50))
+
+def test_new_and_deleted_alternatives(client, db):
+    alt_id = db.execute("INSERT INTO Alt_components (alt_component_name) VALUES ('Vrrb Jumper Kit')").lastrowid
+    db.commit()
+    hits = search(client, 'vrrb')
+    assert hit_ids(hits) == {('alternative', alt_id)}
+    assert hits[0]['cheapest_offer'] is None  # No supplier stocks it yet
+
+    db.execute('DELETE FROM Alt_components WHERE alt_component_id = ?', (alt_id,))
+    db.commit()
+    assert search(client, 'vrrb') == []
+
+@pytest.mark.parametrize('query', ['"', '"unterminated', '*', 'res*', 'NEAR(resistor led)', 'resistor NEAR led',
+                                   'AND', 'OR resistor', 'NOT', '^resistor', '-led', 'part_name:led',
+                                   '(', ')', "'", '{led}', '+', 'res" OR "x'])
+def test_fts_syntax_in_the_query_is_escaped(client, query):
+    search(client, query)
+
+def test_words_are_matched_as_prefixes(client, db):
+    name = db.execute('SELECT component_name FROM Components WHERE component_name GLOB "*[a-z][a-z][a-z]*" LIMIT 1').fetchone()[0]
+    word = max(name.split(), key=len)
+    hits = search(client, f'"{word[:3].upper()}*', limit=50)
+    assert name in {hit['name'] for hit in hits}
+
+def test_limit_must_be_a_whole_number(client):
+    assert client.get('/api/search?q=led&limit=ten').status_code == 400
@@ -0,0 +1,78 @@
+import time
+
+import app as app_module
+
+def read_until(chunks, marker, timeout=10):
+    """Stream text up to and including the first chunk containing marker"""
+    deadline = time.monotonic() + timeout
+    text = ''
+    for chunk in chunks:
+        text += chunk.decode() if isinstance(chunk, bytes) else chunk
+        if marker in text or time.monotonic() > deadline:
+            break
+    return text
+
+def test_writer_commit_reaches_open_stream(client, db, monkeypatch):
+    monkeypatch.setattr(app_module.change_notifier, 'interval', 0.05)
+    monkeypatch.setattr(app_module, 'SSE_HEARTBEAT', 0.2)
+    supplier_id = db.execute('SELECT supplier_id FROM Supplier_components WHERE component_id = 1 LIMIT 1').fetchone()[0]
+
+    response = client.get('/api/stream', buffered=False)
+    assert response.status_code == 200
+    chunks = response.response
+    assert 'retry:' in read_until(chunks, 'retry:')
+
+    # The request that opened the stream has been torn down, so its pooled
+    # connection may now be the one the writer commits on
+    app_module.db_writer.run(
+        app_module.write_statement,
+        'UPDATE Supplier_components SET quantity_in_stock = quantity_in_stock + 7 '
+        'WHERE component_id = 1 AND supplier_id = ?', (supplier_id,)
+    )
+    try:
+        assert 'event: offers' in read_until(chunks, 'event: offers')
+    finally:
+        response.close()
+
+def in_flight(client, endpoint):
+    with client.get('/metrics') as response:
+        text = response.text
+    for line in text.splitlines():
+        if line.startswith(f'app_requests_in_flight{{endpoint="{endpoint}"}} '):
+            return int(line.split()[-1])
+    return 0
+
+def test_open_stream_counts_as_in_flight_until_closed(client, monkeypatch):
+    monkeypatch.setattr(app_module, 'SSE_HEARTBEAT', 0.2)
+    before = in_flight(client, 'stream_changes')
+
+    response = client.get('/api/stream', buffered=False)
+    assert 'retry:' in read_until(response.response, 'retry:')
+    assert in_flight(client, 'stream_changes') == before + 1
+
+    response.close()
+    assert in_flight(client, 'stream_changes') == before
+
+def test_streams_past_the_cap_get_503_and_leave_threads_for_requests(client, monkeypatch):
+    monkeypatch.setattr(app_module, 'SSE_HEARTBEAT', 0.2)
+    monkeypatch.setattr(app_module, 'SSE_MAX_SUBSCRIBERS', len(app_module.change_notifier.subscribers) + 1)
+
+    first = client.get('/api/stream', buffered=False)
+    assert 'retry:' in read_until(first.response, 'retry:')
+    try:
+        refused = client.get('/api/stream')
+        assert refused.status_code == 503
+        assert int(refused.headers['Retry-After']) > 0
+        assert client.get('/api/practical/1/catalog').status_code == 200
+    finally:
+        first.close()
+
+    second = client.get('/api/stream', buffered=False)
+    assert second.status_code == 200
+    second.close()
+
+def test_serve_leaves_threads_free_of_streams():
+    import serve
+    assert serve.stream_limit(64) == 64 - serve.REQUEST_THREADS
+    assert serve.stream_limit(20) == 10
+    assert serve.stream_limit(1) == 0